@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Integer, String, DateTime, ForeignKey, JSON, Index, UniqueConstraint
 
 class Base(DeclarativeBase):
     pass
@@ -62,9 +62,43 @@ class WorkflowDef(Base):
     name: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     agent_id: Mapped[int] = mapped_column(Integer, ForeignKey("agents.id"), nullable=False)
     recipe_id: Mapped[int] = mapped_column(Integer, ForeignKey("recipes.id"), nullable=False)
-    trigger_type: Mapped[str] = mapped_column(String, default="manual")  # manual|interval
+    trigger_type: Mapped[str] = mapped_column(String, default="manual")  # manual|interval|cron
     trigger_value: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # minutes
+    cron: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # "0 6 * * *" for trigger_type cron
+    timezone: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # IANA name; None = UTC
+    misfire_policy: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # run_once|run_all|skip
     status: Mapped[str] = mapped_column(String, default="yellow")  # green|yellow|red
     enabled: Mapped[int] = mapped_column(Integer, default=1)  # 1 true, 0 false
     last_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     next_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+class ScheduleState(Base):
+    """Next slot of schedules that have no WorkflowDef row (graph definitions)."""
+    __tablename__ = "schedule_state"
+    key: Mapped[str] = mapped_column(String, primary_key=True)  # e.g. "graph:daily-room-health.json"
+    last_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    next_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+class WorkflowSlot(Base):
+    """
+    One scheduled execution of a job (see core/workflow/scheduler.py).
+    (job_key, slot_at) is unique, so a slot is dispatched once however many
+    schedulers see it come due; the lease columns say which one is running it.
+    """
+    __tablename__ = "workflow_slots"
+    __table_args__ = (
+        UniqueConstraint("job_key", "slot_at", name="uq_workflow_slots_job_slot"),
+        Index("ix_workflow_slots_status_slot", "status", "slot_at"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    job_key: Mapped[str] = mapped_column(String, nullable=False)  # "wf:<id>" | "graph:<file>"
+    slot_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    status: Mapped[str] = mapped_column(String, default="pending")  # pending|running|done|failed
+    owner: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    run_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
@@ -1,6 +1,7 @@
 
 from __future__ import annotations
 import os, json
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 from .session import engine, get_session
 from .models import Base, Agent, Recipe, Tool
@@ -14,6 +15,24 @@ REGISTRY = {
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+def add_missing_columns(bind) -> list[str]:
+    """`create_all` never alters existing tables: add nullable columns declared since."""
+    added = []
+    insp = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name not in existing and col.nullable:
+                with bind.begin() as conn:
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(bind.dialect)}"
+                    )
+                added.append(f"{table.name}.{col.name}")
+    return added
 
 def seed_demo():
     init_db()
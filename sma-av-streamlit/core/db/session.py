@@ -5,8 +5,11 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 import os
 
+from .sqlite_profile import apply_sqlite_profile
+
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///sma_av_ai_ops.db")
 engine = create_engine(DB_URL, connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {})
+apply_sqlite_profile(engine)  # WAL + AVOPS_SQLITE_PROFILE pragmas; no-op for other databases
 SessionLocal = sessionmaker(
     bind=engine,
     autocommit=False,
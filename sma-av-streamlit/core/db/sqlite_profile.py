@@ -0,0 +1,75 @@
+"""
+core/db/sqlite_profile.py
+-------------------------
+
+Connection setup shared by every SQLite engine in the app (the app database
+in core/db/session.py and the RunStore in core/runs_store.py).  Each new
+DBAPI connection gets WAL journaling plus the pragmas of a profile, so
+Dashboard reads no longer wait on `tick()` writes and writers wait
+`busy_timeout` ms for each other instead of failing with "database is
+locked".
+
+Profiles:
+  - ``durable`` (default): ``synchronous=FULL``; every commit survives power loss.
+  - ``fast``: ``synchronous=NORMAL``; in WAL mode a power loss can drop the
+    last commits but never corrupts the file.  Larger cache and mmap.
+  - ``off``: leave SQLite's defaults alone (rollback journal); benchmarks only.
+
+Select with ``AVOPS_SQLITE_PROFILE`` or the ``profile`` argument.
+"""
+from __future__ import annotations
+
+import os
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQLITE_PROFILES: Dict[str, Dict[str, object]] = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,  # KiB, i.e. 16 MB per connection
+        "mmap_size": 128 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "off": {},
+}
+
+
+def apply_sqlite_profile(
+    engine: Engine, profile: Optional[str] = None, *, auto_vacuum: Optional[str] = None
+) -> str:
+    """
+    Run the profile's pragmas on every new connection of `engine`; returns the
+    profile name.  `auto_vacuum` is issued before `journal_mode`: a new file
+    switched to WAL first keeps auto_vacuum=NONE for good.
+    """
+    profile = (profile or os.getenv("AVOPS_SQLITE_PROFILE") or "durable").lower()
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {profile!r} (expected one of {', '.join(SQLITE_PROFILES)})")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    if auto_vacuum:
+        pragmas = {"auto_vacuum": auto_vacuum, **pragmas}
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return profile
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _record) -> None:
+        cur = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
+
+    return profile
@@ -0,0 +1,339 @@
+"""
+core/runs_export.py
+-------------------
+
+Columnar export of the RunStore for offline analytics.  Runs, steps and
+artifacts are streamed out in keyset chunks of ``chunk_runs`` runs (steps
+and artifacts in record batches of ``chunk_rows``), so memory stays bounded
+however large the run log is.  Files are partitioned by the run's start
+date, the same layout the retention archive uses:
+
+    <out_dir>/<table>/date=YYYY-MM-DD/part-<first_run_id>-<last_run_id>.parquet
+
+with ``<table>`` one of ``runs``, ``steps`` and ``artifacts`` (``.arrow``
+files in Arrow IPC format with ``fmt="arrow"``).  A step or artifact lands
+in its run's partition, so one date directory holds complete runs.
+
+The common ``meta`` keys (``META_COLUMNS``) become typed columns on the
+runs table; the full meta dict stays available as ``meta_json``.  JSON
+fields (payload, result, data) are written as JSON strings with blob refs
+resolved.
+
+Incremental export keeps a high-water mark (the last exported run id) in
+``<out_dir>/_export_state.json``.  It only advances past runs that are
+finished, stopping at the oldest run still running within
+``running_grace``, so a slow run is exported once, complete, rather than
+missed.  Runs archived by retention before they were exported are not
+included; run the export more often than the retention job.
+
+Usage:
+    from core.runs_export import export_runs
+    export_runs(store, Path("exports"), incremental=True)
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Text, func, select, type_coerce
+
+from .runs_store import BLOB_REF_KEY, Artifact, RunStore, StepEvent, WorkflowRun, _is_blob_ref
+
+UTC = timezone.utc
+
+STATE_FILE = "_export_state.json"
+FORMATS = ("parquet", "arrow")
+
+# meta key -> column type ("string", "int", "float" or "bool").
+META_COLUMNS: Dict[str, str] = {
+    "workflow_name": "string",
+    "room_id": "string",
+    "site": "string",
+    "severity": "string",
+}
+
+_RUN_COLUMNS = (
+    WorkflowRun.id, WorkflowRun.parent_id, WorkflowRun.workflow_id, WorkflowRun.name,
+    WorkflowRun.agent_id, WorkflowRun.recipe_id, WorkflowRun.trigger, WorkflowRun.status,
+    WorkflowRun.started_at, WorkflowRun.finished_at, WorkflowRun.duration_ms, WorkflowRun.error,
+    WorkflowRun.children_total, WorkflowRun.children_success, WorkflowRun.children_failed,
+    WorkflowRun.meta,
+)
+_STEP_COLUMNS = (
+    StepEvent.id, StepEvent.run_id, StepEvent.ts, StepEvent.phase, StepEvent.level,
+    StepEvent.status, StepEvent.message, StepEvent.step_id, StepEvent.tool,
+    StepEvent.started_at, StepEvent.finished_at, StepEvent.duration_ms,
+    type_coerce(StepEvent.payload, Text), type_coerce(StepEvent.result, Text),
+)
+_ARTIFACT_COLUMNS = (
+    Artifact.id, Artifact.run_id, Artifact.kind, Artifact.external_id, Artifact.url,
+    Artifact.title, type_coerce(Artifact.data, Text),
+)
+# JSON fields are copied as stored; only blob refs are decoded and replaced.
+_BLOB_PREFIX = json.dumps({BLOB_REF_KEY: ""})[:-3]
+
+
+def export_runs(
+    store: RunStore,
+    out_dir: Path,
+    *,
+    fmt: str = "parquet",
+    since: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    incremental: bool = False,
+    chunk_runs: int = 2000,
+    chunk_rows: int = 50_000,
+    meta_columns: Optional[Dict[str, str]] = None,
+    running_grace: timedelta = timedelta(hours=24),
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Write runs with id > `after_id` (or the saved mark) under `out_dir`; returns a summary.
+
+    `since` limits the export to runs started at or after it.  With
+    `incremental`, the mark is read from and saved to ``STATE_FILE``.
+    """
+    pa = _pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r} (expected one of {', '.join(FORMATS)})")
+    out_dir = Path(out_dir)
+    state_path = out_dir / STATE_FILE
+    if incremental and after_id is None:
+        after_id = _read_state(state_path)
+    meta_columns = dict(META_COLUMNS if meta_columns is None else meta_columns)
+    schemas = _schemas(pa, meta_columns)
+    summary: Dict[str, Any] = {
+        "runs": 0, "steps": 0, "artifacts": 0, "files": [], "high_water_mark": after_id,
+    }
+
+    with store.Session() as s:
+        cap = None
+        if incremental:
+            cutoff = (now or datetime.now(UTC)) - running_grace
+            cap = s.execute(
+                select(func.min(WorkflowRun.id))
+                .where(WorkflowRun.status == "running", WorkflowRun.started_at >= cutoff)
+            ).scalar()
+        cursor = after_id or 0
+        while True:
+            q = select(*_RUN_COLUMNS).where(WorkflowRun.id > cursor)
+            if cap is not None:
+                q = q.where(WorkflowRun.id < cap)
+            if since is not None:
+                q = q.where(WorkflowRun.started_at >= since)
+            runs = s.execute(q.order_by(WorkflowRun.id).limit(chunk_runs)).all()
+            if not runs:
+                break
+            lo, hi = runs[0].id, runs[-1].id
+            days = {r.id: r.started_at.strftime("%Y-%m-%d") for r in runs}
+            part = f"part-{lo}-{hi}.{'parquet' if fmt == 'parquet' else 'arrow'}"
+
+            with _PartitionWriter(pa, fmt, out_dir / "runs", part, schemas["runs"]) as w:
+                for r in runs:
+                    w.add(days[r.id], _run_row(r, meta_columns))
+                summary["runs"] += len(runs)
+
+            # Steps and artifacts are fetched by run id range (index scan on
+            # run_id) and streamed; rows of runs outside the chunk are skipped.
+            load = lambda digests: store.load_blobs(digests, session=s)  # noqa: E731
+            for table, columns, model in (
+                ("steps", _STEP_COLUMNS, StepEvent),
+                ("artifacts", _ARTIFACT_COLUMNS, Artifact),
+            ):
+                rows = s.execute(
+                    select(*columns)
+                    .where(model.run_id.between(lo, hi))
+                    .order_by(model.run_id, model.id)
+                    .execution_options(yield_per=chunk_rows)
+                )
+                with _PartitionWriter(
+                    pa, fmt, out_dir / table, part, schemas[table], chunk_rows=chunk_rows, load_blobs=load,
+                ) as w:
+                    for row in rows:
+                        day = days.get(row.run_id)
+                        if day is not None:
+                            w.add(day, row)
+                            summary[table] += 1
+            summary["files"].extend(str(p) for p in _written(out_dir, part))
+            cursor = hi
+            summary["high_water_mark"] = hi
+
+    if incremental and summary["high_water_mark"] is not None:
+        _write_state(state_path, summary["high_water_mark"])
+    return summary
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:  # pragma: no cover - optional dependency
+        raise ImportError("Run export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _schemas(pa, meta_columns: Dict[str, str]) -> Dict[str, Any]:
+    types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_()}
+    ts = pa.timestamp("us", tz="UTC")
+    unknown = sorted(t for t in meta_columns.values() if t not in types)
+    if unknown:
+        raise ValueError(f"Unknown meta column type(s): {', '.join(unknown)}")
+    clash = sorted(k for k in meta_columns if k in {c.key for c in _RUN_COLUMNS} | {"meta_json"})
+    if clash:
+        raise ValueError(f"Meta column(s) clash with run columns: {', '.join(clash)}")
+    return {
+        "runs": pa.schema(
+            [
+                ("id", pa.int64()), ("parent_id", pa.int64()), ("workflow_id", pa.string()),
+                ("name", pa.string()), ("agent_id", pa.int64()), ("recipe_id", pa.int64()),
+                ("trigger", pa.string()), ("status", pa.string()), ("started_at", ts),
+                ("finished_at", ts), ("duration_ms", pa.float64()), ("error", pa.string()),
+                ("children_total", pa.int64()), ("children_success", pa.int64()),
+                ("children_failed", pa.int64()),
+            ]
+            + [(k, types[t]) for k, t in meta_columns.items()]
+            + [("meta_json", pa.string())]
+        ),
+        "steps": pa.schema([
+            ("id", pa.int64()), ("run_id", pa.int64()), ("ts", ts), ("phase", pa.string()),
+            ("level", pa.string()), ("status", pa.string()), ("message", pa.string()),
+            ("step_id", pa.string()), ("tool", pa.string()), ("started_at", ts),
+            ("finished_at", ts), ("duration_ms", pa.float64()),
+            ("payload_json", pa.string()), ("result_json", pa.string()),
+        ]),
+        "artifacts": pa.schema([
+            ("id", pa.int64()), ("run_id", pa.int64()), ("kind", pa.string()),
+            ("external_id", pa.string()), ("url", pa.string()), ("title", pa.string()),
+            ("data_json", pa.string()),
+        ]),
+    }
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    try:
+        if kind == "string":
+            return value if isinstance(value, str) else json.dumps(value, default=str)
+        if kind == "bool":
+            if isinstance(value, str):
+                return {"true": True, "false": False}.get(value.strip().lower())
+            return bool(value)
+        if isinstance(value, bool):
+            return None  # a flag is not a number
+        return int(value) if kind == "int" else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _run_row(r, meta_columns: Dict[str, str]) -> Tuple[Any, ...]:
+    meta = r.meta or {}
+    return (
+        tuple(r[:-1])
+        + tuple(_coerce(meta.get(key), kind) for key, kind in meta_columns.items())
+        + (json.dumps(meta, default=str),)
+    )
+
+
+def _json_texts(values: Iterable[Any], load_blobs) -> List[Optional[str]]:
+    """Stored JSON text per value (None for SQL/JSON null) with blob refs resolved."""
+    out: List[Optional[str]] = []
+    refs: Dict[int, str] = {}
+    for v in values:
+        if v is not None and not isinstance(v, str):
+            v = json.dumps(v, default=str)  # drivers that decode JSON columns themselves
+        if v is None or v == "null":
+            out.append(None)
+            continue
+        if v.startswith(_BLOB_PREFIX):
+            ref = json.loads(v)
+            if _is_blob_ref(ref):
+                refs[len(out)] = ref[BLOB_REF_KEY]
+        out.append(v)
+    if refs:
+        blobs = load_blobs(refs.values())
+        for i, digest in refs.items():
+            if digest in blobs:
+                out[i] = json.dumps(blobs[digest], default=str)
+    return out
+
+
+class _PartitionWriter:
+    """One open file per date partition; rows (tuples in schema order) are written in record batches."""
+
+    def __init__(self, pa, fmt: str, table_dir: Path, part: str, schema, *,
+                 chunk_rows: int = 50_000, load_blobs=None):
+        self.pa, self.fmt, self.table_dir, self.part, self.schema = pa, fmt, table_dir, part, schema
+        self.chunk_rows = chunk_rows
+        self.load_blobs = load_blobs
+        self.json_cols = [i for i, name in enumerate(schema.names) if name.endswith("_json")]
+        self.buffers: Dict[str, List[Tuple[Any, ...]]] = {}
+        self.writers: Dict[str, Tuple[Any, Path]] = {}
+
+    def __enter__(self) -> "_PartitionWriter":
+        return self
+
+    def add(self, day: str, row: Tuple[Any, ...]) -> None:
+        buf = self.buffers.setdefault(day, [])
+        buf.append(row)
+        if len(buf) >= self.chunk_rows:
+            self._flush(day)
+
+    def _flush(self, day: str) -> None:
+        rows = self.buffers.pop(day, [])
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        if self.load_blobs is not None:
+            for i in self.json_cols:
+                columns[i] = _json_texts(columns[i], self.load_blobs)
+        batch = self.pa.RecordBatch.from_arrays(
+            [self.pa.array(c, type=f.type) for c, f in zip(columns, self.schema)], schema=self.schema
+        )
+        if day not in self.writers:
+            path = self.table_dir / f"date={day}" / self.part
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            if self.fmt == "parquet":
+                writer = self.pa.parquet.ParquetWriter(tmp, self.schema, compression="zstd")
+            else:
+                writer = self.pa.ipc.new_file(str(tmp), self.schema)
+            self.writers[day] = (writer, path)
+        writer = self.writers[day][0]
+        if self.fmt == "parquet":
+            writer.write_batch(batch)
+        else:
+            writer.write(batch)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            for day in list(self.buffers):
+                self._flush(day)
+        for writer, path in self.writers.values():
+            writer.close()
+            tmp = path.with_name(path.name + ".tmp")
+            if exc_type is None:
+                os.replace(tmp, path)  # readers never see a half-written part
+            else:
+                tmp.unlink(missing_ok=True)
+
+
+def _written(out_dir: Path, part: str) -> Iterable[Path]:
+    return sorted(out_dir.glob(f"*/date=*/{part}"))
+
+
+def _read_state(path: Path) -> Optional[int]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("high_water_mark")
+    except FileNotFoundError:
+        return None
+
+
+def _write_state(path: Path, mark: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"high_water_mark": mark}), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,247 @@
+"""
+core/runs_retention.py
+----------------------
+
+Retention engine for the RunStore.  Finished runs that are older than the
+age policy (or the oldest runs, while the database is above the size
+policy) are moved, together with their steps and artifacts, into
+date-partitioned gzip-compressed JSONL files:
+
+    <archive_dir>/date=YYYY-MM-DD/runs-<first_id>-<last_id>.jsonl.gz
+
+Each line is exactly what ``RunStore.run_details()`` returns (blob refs
+resolved), and an ``archived_runs`` row keeps the file location so
+``run_details()`` can still answer for archived runs.  Hourly rollups are
+left in place, so Dashboard KPIs and trends keep covering archived history.
+A fan-out parent run moves together with its children, once none of them
+is still running; a child never moves ahead of a live parent.
+After deleting, the engine runs ``PRAGMA incremental_vacuum`` so the file
+actually shrinks and the hot tables stay small enough to live in cache.
+
+Usage:
+    from core.runs_retention import RetentionPolicy, apply_retention
+    apply_retention(store, RetentionPolicy(max_age_days=90, max_db_mb=512))
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, exists, or_, select, update
+from sqlalchemy.orm import aliased
+
+from .runs_store import (
+    BLOB_REF_KEY, ArchivedRun, Artifact, Blob, RunChange, RunStore, StepEvent, WorkflowRun,
+    _is_blob_ref,
+)
+
+UTC = timezone.utc
+
+
+@dataclass
+class RetentionPolicy:
+    """Age and size limits for the live run log; None disables a limit."""
+    max_age_days: Optional[float] = 90
+    max_db_mb: Optional[float] = None
+    batch_size: int = 500
+    # Rewrite the file once with VACUUM when it was created without
+    # auto_vacuum=INCREMENTAL (databases older than the retention engine).
+    allow_full_vacuum: bool = True
+
+
+def apply_retention(
+    store: RunStore, policy: RetentionPolicy, *, now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Archive runs according to `policy` and reclaim the space; returns a summary."""
+    now = now or datetime.now(UTC)
+    archived = 0
+    if policy.max_age_days is not None:
+        cutoff = now - timedelta(days=policy.max_age_days)
+        while True:
+            ids = _oldest_finished(store, policy.batch_size, before=cutoff)
+            if not ids:
+                break
+            archived += archive_runs(store, ids)
+    vacuum = reclaim_space(store, allow_full_vacuum=policy.allow_full_vacuum)
+    if policy.max_db_mb is not None:
+        limit = policy.max_db_mb * 1024 * 1024
+        while live_db_bytes(store) > limit:
+            ids = _oldest_finished(store, policy.batch_size)
+            if not ids:
+                break
+            archived += archive_runs(store, ids)
+        vacuum = reclaim_space(store, allow_full_vacuum=policy.allow_full_vacuum)
+    return {"archived": archived, "db_bytes": live_db_bytes(store), "vacuum": vacuum}
+
+
+def archive_runs(store: RunStore, run_ids: List[int]) -> int:
+    """
+    Move the given finished runs, with their children, into the archive;
+    returns how many moved.  Runs whose family is still running, and
+    children of a parent that stays live, are left alone.
+    """
+    with store.Session() as s:
+        ids = _families(s, run_ids)
+        if not ids:
+            return 0
+        runs = s.execute(
+            select(WorkflowRun).where(WorkflowRun.id.in_(ids)).order_by(WorkflowRun.id)
+        ).scalars().all()
+        if not runs:
+            return 0
+        ids = [r.id for r in runs]
+        docs: Dict[int, Dict[str, Any]] = {}
+        for r in runs:
+            docs[r.id] = store._run_to_dict(r)
+            docs[r.id].update(steps=[], artifacts=[])
+        for ev in s.execute(
+            select(StepEvent).where(StepEvent.run_id.in_(ids)).order_by(StepEvent.id)
+        ).scalars():
+            docs[ev.run_id]["steps"].append(store._step_to_dict(ev))
+        for a in s.execute(
+            select(Artifact).where(Artifact.run_id.in_(ids)).order_by(Artifact.id)
+        ).scalars():
+            docs[a.run_id]["artifacts"].append(store._artifact_to_dict(a))
+
+        steps = [x for d in docs.values() for x in d["steps"]]
+        arts = [x for d in docs.values() for x in d["artifacts"]]
+        released = Counter(
+            x[f][BLOB_REF_KEY]
+            for items, fields in ((steps, ("payload", "result")), (arts, ("data",)))
+            for x in items for f in fields if _is_blob_ref(x.get(f))
+        )
+        store._resolve_blobs(s, steps, ("payload", "result"))
+        store._resolve_blobs(s, arts, ("data",))
+
+        # Write (and fsync) the archive files before anything is deleted.
+        started = {r.id: r.started_at for r in runs}
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for r in runs:
+            partitions.setdefault(r.started_at.strftime("%Y-%m-%d"), []).append(docs[r.id])
+        for day, items in partitions.items():
+            rel = Path(f"date={day}") / f"runs-{items[0]['id']}-{items[-1]['id']}.jsonl.gz"
+            _write_jsonl_gz(store.archive_dir / rel, items)
+            s.add_all(
+                ArchivedRun(run_id=d["id"], started_at=started[d["id"]], path=rel.as_posix())
+                for d in items
+            )
+
+        s.execute(delete(StepEvent).where(StepEvent.run_id.in_(ids)))
+        s.execute(delete(Artifact).where(Artifact.run_id.in_(ids)))
+        s.execute(delete(WorkflowRun).where(WorkflowRun.id.in_(ids)))
+        s.execute(delete(RunChange).where(RunChange.run_id.in_(ids)))
+        for digest, n in released.items():
+            s.execute(
+                update(Blob).where(Blob.digest == digest, Blob.refs.is_not(None))
+                .values(refs=Blob.refs - n)
+            )
+        if released:
+            s.execute(delete(Blob).where(Blob.digest.in_(list(released)), Blob.refs <= 0))
+        s.commit()
+        return len(ids)
+
+
+def read_archived_run(path: Path, run_id: int) -> Dict[str, Any]:
+    """Find one run in an archive file; {} when the file or run is missing."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                doc = json.loads(line)
+                if doc.get("id") == run_id:
+                    return doc
+    except FileNotFoundError:
+        pass
+    return {}
+
+
+def live_db_bytes(store: RunStore) -> int:
+    """Bytes used by live pages (file size minus the free list)."""
+    with store.engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            return int(conn.exec_driver_sql("SELECT pg_database_size(current_database())").scalar())
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return int((pages - free) * page_size)
+
+
+def reclaim_space(store: RunStore, *, allow_full_vacuum: bool = True) -> str:
+    """Return free pages to the OS; 'incremental', 'full' or 'skipped'."""
+    if store.engine.dialect.name != "sqlite":
+        return "skipped"  # server databases reclaim space with their own autovacuum
+    with store.engine.connect() as conn:
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+    # The pysqlite driver must not wrap these in a transaction.
+    with store.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if mode == 2:
+            # Each step of the statement frees one page and execute() only
+            # steps once; executescript() runs it to completion.
+            conn.connection.driver_connection.executescript("PRAGMA incremental_vacuum;")
+            result = "incremental"
+        elif not allow_full_vacuum:
+            return "skipped"
+        else:
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")  # one-time rewrite that makes the new mode stick
+            result = "full"
+        # In WAL mode the main file only shrinks once the log is checkpointed.
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        return result
+
+
+def _families(s, run_ids: List[int]) -> List[int]:
+    """`run_ids` and their children, without running families or children of live parents."""
+    wanted = set(run_ids)
+    rows = s.execute(
+        select(WorkflowRun.id, WorkflowRun.parent_id, WorkflowRun.status)
+        .where(or_(WorkflowRun.id.in_(wanted), WorkflowRun.parent_id.in_(wanted)))
+    ).all()
+    parents = {p for _, p, _ in rows if p is not None and p not in wanted}
+    live = set(s.execute(select(WorkflowRun.id).where(WorkflowRun.id.in_(parents))).scalars())
+    families: Dict[int, List[int]] = {}
+    running = set()
+    for run_id, parent_id, status in rows:
+        # A child belongs to its parent's family unless it is an orphan.
+        head = parent_id if parent_id in wanted or parent_id in live else run_id
+        families.setdefault(head, []).append(run_id)
+        if status == "running":
+            running.add(head)
+    return sorted(
+        run_id for head, members in families.items()
+        if head in wanted and head not in running for run_id in members
+    )
+
+
+def _oldest_finished(store: RunStore, limit: int, *, before: Optional[datetime] = None) -> List[int]:
+    """Oldest finished runs that can move: parents (or orphans) without running children."""
+    parent, child = aliased(WorkflowRun), aliased(WorkflowRun)
+    with store.Session() as s:
+        q = select(WorkflowRun.id).where(
+            WorkflowRun.status != "running",
+            or_(
+                WorkflowRun.parent_id.is_(None),
+                ~exists().where(parent.id == WorkflowRun.parent_id),
+            ),
+            ~exists().where(child.parent_id == WorkflowRun.id, child.status == "running"),
+        )
+        if before is not None:
+            q = q.where(WorkflowRun.started_at < before)
+        return list(s.execute(q.order_by(WorkflowRun.id).limit(limit)).scalars())
+
+
+def _write_jsonl_gz(path: Path, docs: List[Dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for d in docs:
+                gz.write((json.dumps(d, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
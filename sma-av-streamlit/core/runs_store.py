@@ -1,16 +1,26 @@
 # core/runs_store.py
 from __future__ import annotations
 import contextlib
+import hashlib
+import json
 import time
-from datetime import datetime, timezone
+import zlib
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from sqlalchemy import (
-    JSON, DateTime, Float, ForeignKey, Integer, String, create_engine, select
+    JSON, Boolean, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, MetaData, String, and_, bindparam,
+    case, create_engine, delete, func, insert, inspect, literal, or_, select, text, union_all,
+    update
 )
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
 
+from .db.sqlite_profile import apply_sqlite_profile
+from .utils.sketch import DDSketch
+
 UTC = timezone.utc
 
 
@@ -20,6 +30,18 @@ class Base(DeclarativeBase):
 
 class WorkflowRun(Base):
     __tablename__ = "workflow_runs"
+    __table_args__ = (
+        Index("ix_workflow_runs_started_status", "started_at", "status"),
+        Index("ix_workflow_runs_status_id", "status", "id"),
+        Index("ix_workflow_runs_recipe_id", "recipe_id", "id"),
+        Index("ix_workflow_runs_workflow_id", "workflow_id", "id"),
+        Index("ix_workflow_runs_parent_id", "parent_id", "id"),
+        Index("ix_workflow_runs_room_id", "room_id", "id"),
+        Index("ix_workflow_runs_site", "site", "id"),
+        Index("ix_workflow_runs_severity", "severity", "id"),
+        # Retention can delete the newest runs; ids must never be handed out again.
+        {"sqlite_autoincrement": True},
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     workflow_id: Mapped[str] = mapped_column(String(64))
     name: Mapped[str] = mapped_column(String(255))
@@ -32,6 +54,18 @@ class WorkflowRun(Base):
     duration_ms: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     error: Mapped[Optional[str]] = mapped_column(String(2000), nullable=True)
     meta: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    # Fan-out: a child run points at its parent, which keeps the children's
+    # totals so listings and KPIs never have to scan the children.
+    parent_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    children_total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    children_success: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    children_failed: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    children_duration_ms: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # Shadow columns for PROMOTED_META_KEYS, copied from `meta` when the run
+    # is created so per-room/site filters use an index instead of JSON.
+    room_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    site: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    severity: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
 
     steps: Mapped[List["StepEvent"]] = relationship(back_populates="run", cascade="all, delete-orphan")
     artifacts: Mapped[List["Artifact"]] = relationship(back_populates="run", cascade="all, delete-orphan")
@@ -39,6 +73,7 @@ class WorkflowRun(Base):
 
 class StepEvent(Base):
     __tablename__ = "step_events"
+    __table_args__ = (Index("ix_step_events_run_id", "run_id", "id"), {"sqlite_autoincrement": True})
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("workflow_runs.id", ondelete="CASCADE"))
     ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
@@ -48,12 +83,19 @@ class StepEvent(Base):
     message: Mapped[str] = mapped_column(String(2000), default="")
     payload: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
     result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    # Timing, set by Recorder.span() (or explicit started_at/finished_at).
+    step_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)  # recipe step id
+    tool: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    duration_ms: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
 
     run: Mapped[WorkflowRun] = relationship(back_populates="steps")
 
 
 class Artifact(Base):
     __tablename__ = "artifacts"
+    __table_args__ = (Index("ix_artifacts_run_id", "run_id", "id"), {"sqlite_autoincrement": True})
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("workflow_runs.id", ondelete="CASCADE"))
     kind: Mapped[str] = mapped_column(String(32))  # kb/recipe/webinar/message/file/incident/etc.
@@ -65,19 +107,187 @@ class Artifact(Base):
     run: Mapped[WorkflowRun] = relationship(back_populates="artifacts")
 
 
+class DurationSketch(Base):
+    """DDSketch of finished run durations, one row per started_at hour."""
+    __tablename__ = "duration_sketches"
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    runs: Mapped[int] = mapped_column(Integer, default=0)
+    sketch: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+
+
+class RunRollup(Base):
+    """
+    Hourly aggregates of finished runs per workflow/recipe/agent/status.
+    Child runs are kept in separate rows (`child` true) that only recipe
+    metrics read; KPIs and the trend count top-level runs.
+    """
+    __tablename__ = "run_rollups"
+    __table_args__ = (
+        Index("ix_run_rollups_key", "bucket", "workflow_id", "recipe_id", "agent_id", "status"),
+        Index("ix_run_rollups_recipe", "recipe_id", "status"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True))  # started_at hour
+    workflow_id: Mapped[str] = mapped_column(String(64))
+    recipe_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    agent_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    status: Mapped[str] = mapped_column(String(16))
+    runs: Mapped[int] = mapped_column(Integer, default=0)
+    duration_sum_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    sketch: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    child: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)  # NULL: top-level runs
+
+
+class StepRollup(Base):
+    """Hourly latency aggregates of timed steps per recipe/step id/tool."""
+    __tablename__ = "step_rollups"
+    __table_args__ = (Index("ix_step_rollups_key", "bucket", "recipe_id", "step_id", "tool"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True))  # step started_at hour
+    recipe_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    step_id: Mapped[str] = mapped_column(String(128))  # StepEvent.step_id, else its phase
+    tool: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    steps: Mapped[int] = mapped_column(Integer, default=0)
+    failures: Mapped[int] = mapped_column(Integer, default=0)
+    duration_sum_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    sketch: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+
+
+class Blob(Base):
+    """Content-addressed, zlib-compressed JSON values moved out of the hot tables."""
+    __tablename__ = "blobs"
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 of the JSON bytes
+    codec: Mapped[str] = mapped_column(String(16), default="zlib")
+    size: Mapped[int] = mapped_column(Integer)  # uncompressed bytes
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+    # Number of rows referencing the blob; NULL (rows written before refcounts
+    # existed) means unknown, and such blobs are never garbage-collected.
+    refs: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+class ArchivedRun(Base):
+    """Where a run moved by the retention engine (core/runs_retention.py) lives now."""
+    __tablename__ = "archived_runs"
+    run_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    path: Mapped[str] = mapped_column(String(1024))  # relative to RunStore.archive_dir
+
+
+class RunChange(Base):
+    """
+    Change feed: one row per transaction and run that created or updated the
+    run, its steps or its artifacts.  `seq` only grows (AUTOINCREMENT, never
+    reused), so readers poll `changes_since(last_seq)`.  On SQLite writers
+    are serialised and seq values become visible in order; on Postgres a
+    transaction can commit a lower seq after a higher one, which is why
+    `changes_since` stops at a recent hole in the numbers (FEED_SETTLE).
+    """
+    __tablename__ = "run_changes"
+    __table_args__ = ({"sqlite_autoincrement": True},)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[int] = mapped_column(Integer)
+    first_step_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # lowest new step
+    created_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=lambda: datetime.now(UTC)
+    )
+
+
+# Large StepEvent.payload/result and Artifact.data values are replaced by
+# {"$blob": "<sha256>", "bytes": <size>} and stored once in `blobs`.
+BLOB_REF_KEY = "$blob"
+# meta keys mirrored into indexed WorkflowRun columns of the same name; to
+# promote another key, add the column (and its index) and list it here.
+PROMOTED_META_KEYS = ("room_id", "site", "severity")
+# Step statuses counted as failures in step_rollups.
+_FAILED_STEP = ("error", "failed")
+_BLOB_FIELDS = {StepEvent: ("payload", "result"), Artifact: ("data",)}
+# A hole in run_changes.seq younger than this may still be filled by a
+# transaction that took the lower seq first but commits later; the change
+# feed waits for it.  Older holes are rollbacks or rows removed by retention.
+FEED_SETTLE = timedelta(seconds=30)
+
+
+# Crash-safety modes for step/artifact logging inside workflow_run():
+#   sync     - every event is committed on its own (one transaction per event)
+#   batch    - events are queued and flushed every `flush_size` events or
+#              `flush_interval_s` seconds; a crash loses at most one batch
+#   deferred - events are only written when the run finishes, in the same
+#              transaction as the final run status; a crash loses all of them
+DURABILITY_MODES = ("sync", "batch", "deferred")
+
+
 class RunStore:
     """
     Persistent run log for workflows/agents.
       - Use `with store.workflow_run(...):` to wrap an execution
-      - Call `rec.step(...)` and `rec.artifact(...)` inside the context
+      - Call `rec.step(...)` and `rec.artifact(...)` inside the context;
+        `with rec.span(...)` times a step and feeds `slowest_steps()`
+      - Pass `durability="batch"` (or "deferred") to buffer events in memory
+        and write them in a single transaction per flush
+      - Payloads larger than `blob_threshold` bytes (as JSON) are stored once,
+        compressed, in the `blobs` table; None disables this
+      - Runs moved out by the retention engine stay readable through
+        `run_details()` from the JSONL archives under `archive_dir`
+      - Pass a SQLAlchemy `url` (e.g. postgresql+psycopg://...) instead of
+        `db_path` to use a server database with a pooled engine
+      - SQLite connections use WAL and the `sqlite_profile` pragmas
+        (core/db/sqlite_profile.py; default from AVOPS_SQLITE_PROFILE)
     """
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        *,
+        url: Optional[str] = None,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        durability: str = "sync",
+        flush_size: int = 100,
+        flush_interval_s: float = 1.0,
+        blob_threshold: Optional[int] = 4096,
+        archive_dir: Optional[Path] = None,
+        sqlite_profile: Optional[str] = None,
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability!r}")
         base_dir = Path(__file__).resolve().parents[1]  # <repo>/sma-av-streamlit
-        self.db_path = Path(db_path) if db_path else base_dir / "avops.db"
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.engine = create_engine(f"sqlite:///{self.db_path}", future=True)
-        Base.metadata.create_all(self.engine)
+        engine_kwargs: Dict[str, Any] = {"future": True}
+        if url is None:
+            self.db_path: Optional[Path] = Path(db_path) if db_path else base_dir / "avops.db"
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            is_new = not self.db_path.exists() or self.db_path.stat().st_size == 0
+            url = f"sqlite:///{self.db_path}"
+        else:
+            self.db_path, is_new = None, False
+            if not url.startswith("sqlite"):
+                engine_kwargs.update(
+                    pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True
+                )
+        self.url = url
+        self.archive_dir = (
+            Path(archive_dir) if archive_dir
+            else (self.db_path.parent if self.db_path else base_dir) / "run_archive"
+        )
+        self.engine = create_engine(url, **engine_kwargs)
+        # auto_vacuum must be set before the first table exists; lets
+        # retention give pages back with `PRAGMA incremental_vacuum`.
+        self.sqlite_profile = apply_sqlite_profile(
+            self.engine, sqlite_profile, auto_vacuum="INCREMENTAL" if is_new else None
+        )
+        with self.engine.begin() as conn:
+            Base.metadata.create_all(conn)
+        created = migrate_schema(self.engine)
+        self.search_fts = ensure_search_index(self.engine)
         self.Session = sessionmaker(self.engine, expire_on_commit=False)
+        self._backfill_rollups()
+        self._backfill_promoted_meta([k for k in PROMOTED_META_KEYS if f"workflow_runs.{k}" in created])
+        self.durability = durability
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+        self.blob_threshold = blob_threshold
+
+    def close(self) -> None:
+        """Release pooled connections; the store reconnects if used again."""
+        self.engine.dispose()
 
     @contextlib.contextmanager
     def workflow_run(
@@ -89,7 +299,12 @@ class RunStore:
         recipe_id: Optional[int],
         trigger: str = "manual",
         meta: Optional[Dict[str, Any]] = None,
+        durability: Optional[str] = None,
+        parent_id: Optional[int] = None,
     ):
+        durability = durability or self.durability
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability!r}")
         start = time.perf_counter()
         with self.Session() as s:
             run = WorkflowRun(
@@ -100,27 +315,98 @@ class RunStore:
                 trigger=trigger,
                 status="running",
                 meta=meta or {},
+                parent_id=parent_id,
+                **_promoted_meta(meta),
             )
-            s.add(run); s.commit(); s.refresh(run)
+            s.add(run); s.flush()
             run_id = run.id
+            s.add(RunChange(run_id=run_id))
+            self._count_child(s, parent_id)
+            s.commit()
 
-        status, error = "success", None
+        if durability == "sync":
+            rec: Recorder = Recorder(self, run_id)
+        else:
+            rec = BufferedRecorder(
+                self, run_id,
+                flush_size=self.flush_size if durability == "batch" else None,
+                flush_interval_s=self.flush_interval_s if durability == "batch" else None,
+            )
+
+        status, error = "failed", None
         try:
-            yield Recorder(self, run_id)
+            yield rec
+            status, error = rec.status, rec.error
         except Exception as e:
-            status, error = "failed", f"{type(e).__name__}: {e}"
+            error = f"{type(e).__name__}: {e}"
             raise
         finally:
             dur_ms = (time.perf_counter() - start) * 1000.0
             with self.Session() as s:
+                # Pending buffered events land in the same transaction as the final status.
+                try:
+                    written = rec.flush(session=s)
+                    s.flush()
+                except Exception as e:
+                    # Drop them rather than leave the run "running" for good.
+                    s.rollback()
+                    written = []
+                    status, error = "failed", _with_flush_error(error, e)
                 r = s.get(WorkflowRun, run_id)
                 if r:
                     r.status = status
                     r.error = error
                     r.finished_at = datetime.now(UTC)
                     r.duration_ms = dur_ms
+                    self._add_to_rollups(s, r)
+                    s.flush()
+                    s.add(RunChange(run_id=run_id, first_step_id=_first_step_id(written)))
                     s.commit()
 
+    def record_run(
+        self,
+        *,
+        workflow_id: str,
+        name: str,
+        agent_id: Optional[int],
+        recipe_id: Optional[int],
+        trigger: str = "manual",
+        meta: Optional[Dict[str, Any]] = None,
+        status: str = "success",
+        error: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+        steps: Iterable[Dict[str, Any]] = (),
+        artifacts: Iterable[Dict[str, Any]] = (),
+        parent_id: Optional[int] = None,
+    ) -> int:
+        """
+        Persist a complete execution -- run header, final status, steps,
+        artifacts and rollups -- in a single transaction.  `steps` and
+        `artifacts` hold the keyword arguments of `log_step`/`log_artifact`.
+        Returns the new run id.
+        """
+        finished_at = finished_at or datetime.now(UTC)
+        started_at = started_at or finished_at
+        with self.Session() as s:
+            r = WorkflowRun(
+                workflow_id=workflow_id, name=name, agent_id=agent_id, recipe_id=recipe_id,
+                trigger=trigger, status=status, error=error, meta=meta or {},
+                started_at=started_at, finished_at=finished_at,
+                duration_ms=(finished_at - started_at).total_seconds() * 1000.0,
+                parent_id=parent_id, **_promoted_meta(meta),
+            )
+            s.add(r); s.flush()
+            self._count_child(s, parent_id)
+            events: List[Base] = [self._new_step(r.id, **kw) for kw in steps]
+            events += [self._new_artifact(r.id, **kw) for kw in artifacts]
+            self.write_events(events, session=s)
+            self._add_to_rollups(s, r)
+            s.flush()
+            s.add(RunChange(run_id=r.id, first_step_id=_first_step_id(events)))
+            s.commit()
+            return r.id
+
     # ---- Logging helpers ----------------------------------------------------
     def log_step(
         self,
@@ -132,13 +418,22 @@ class RunStore:
         status: str = "ok",
         payload: Optional[Dict[str, Any]] = None,
         result: Optional[Dict[str, Any]] = None,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
     ) -> int:
         with self.Session() as s:
-            ev = StepEvent(
-                run_id=run_id, phase=phase, level=level, status=status,
-                message=message, payload=payload, result=result
+            ev = self._new_step(
+                run_id, phase=phase, message=message, level=level,
+                status=status, payload=payload, result=result,
+                step_id=step_id, tool=tool, started_at=started_at, finished_at=finished_at,
             )
-            s.add(ev); s.commit(); s.refresh(ev)
+            self._externalize(s, [ev])
+            s.add(ev); s.flush()
+            self._add_to_step_rollups(s, [ev])
+            s.add(RunChange(run_id=run_id, first_step_id=ev.id))
+            s.commit()
             return ev.id
 
     def log_artifact(
@@ -152,13 +447,165 @@ class RunStore:
         data: Optional[Dict[str, Any]] = None,
     ) -> int:
         with self.Session() as s:
-            a = Artifact(
-                run_id=run_id, kind=kind, title=title,
-                external_id=external_id, url=url, data=data or {}
+            a = self._new_artifact(
+                run_id, kind=kind, title=title,
+                external_id=external_id, url=url, data=data
             )
-            s.add(a); s.commit(); s.refresh(a)
+            self._externalize(s, [a])
+            s.add(a)
+            s.add(RunChange(run_id=run_id))
+            s.commit()
             return a.id
 
+    def write_events(self, events: List[Base], *, session: Optional[Any] = None) -> None:
+        """
+        Persist a batch of StepEvent/Artifact rows in one transaction.  With
+        `session` the rows join the caller's transaction and the caller adds
+        the `run_changes` row.
+        """
+        if not events:
+            return
+        if session is not None:
+            self._externalize(session, events)
+            session.add_all(events)
+            self._add_to_step_rollups(session, events)
+            return
+        with self.Session() as s:
+            self._externalize(s, events)
+            s.add_all(events); s.flush()
+            self._add_to_step_rollups(s, events)
+            for run_id in sorted({e.run_id for e in events}):
+                first = _first_step_id(e for e in events if e.run_id == run_id)
+                s.add(RunChange(run_id=run_id, first_step_id=first))
+            s.commit()
+
+    def _archived_run(self, run_id: int, *, session: Optional[Any] = None) -> Dict[str, Any]:
+        """Full run dict from the retention archive, or {}."""
+        if session is None:
+            with self.Session() as s:
+                return self._archived_run(run_id, session=s)
+        entry = session.get(ArchivedRun, run_id)
+        if entry is None:
+            return {}
+        from .runs_retention import read_archived_run  # runs_retention imports this module
+        return read_archived_run(self.archive_dir / entry.path, run_id)
+
+    # ---- Blobs ----------------------------------------------------------------
+    def _externalize(self, s, events: Iterable[Base]) -> None:
+        """Swap large JSON values on `events` for blob refs and insert the blobs (caller commits)."""
+        if self.blob_threshold is None:
+            return
+        pending: Dict[str, bytes] = {}
+        counts: Dict[str, int] = {}
+        for ev in events:
+            for attr in _BLOB_FIELDS.get(type(ev), ()):
+                value = getattr(ev, attr)
+                if not value or _is_blob_ref(value):
+                    continue
+                try:
+                    raw = json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+                except (TypeError, ValueError):
+                    continue  # leave it to the JSON column to report
+                if len(raw) < self.blob_threshold:
+                    continue
+                digest = hashlib.sha256(raw).hexdigest()
+                pending.setdefault(digest, raw)
+                counts[digest] = counts.get(digest, 0) + 1
+                setattr(ev, attr, {BLOB_REF_KEY: digest, "bytes": len(raw)})
+        if not pending:
+            return
+        rows = [
+            {"digest": d, "codec": "zlib", "size": len(raw), "data": zlib.compress(raw),
+             "refs": counts[d]}
+            for d, raw in pending.items()
+        ]
+        dialect = s.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(Blob)
+            s.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["digest"], set_={"refs": Blob.refs + stmt.excluded.refs}
+                ),
+                rows,
+            )
+        else:
+            have = set(s.execute(select(Blob.digest).where(Blob.digest.in_(list(pending)))).scalars())
+            new_rows = [r for r in rows if r["digest"] not in have]
+            if new_rows:
+                s.execute(insert(Blob), new_rows)
+            for d in have:
+                s.execute(update(Blob).where(Blob.digest == d).values(refs=Blob.refs + counts[d]))
+
+    def load_blobs(self, digests: Iterable[str], *, session: Optional[Any] = None) -> Dict[str, Any]:
+        """Decode the JSON values stored under `digests`."""
+        digests = list(set(digests))
+        if not digests:
+            return {}
+        if session is None:
+            with self.Session() as s:
+                return self.load_blobs(digests, session=s)
+        out: Dict[str, Any] = {}
+        for b in session.execute(select(Blob).where(Blob.digest.in_(digests))).scalars():
+            out[b.digest] = json.loads(zlib.decompress(b.data).decode("utf-8"))
+        return out
+
+    def _resolve_blobs(self, s, items: List[Dict[str, Any]], fields: Iterable[str]) -> List[Dict[str, Any]]:
+        """Replace blob refs in `items[field]` with their values, one query per call."""
+        fields = tuple(fields)
+        refs = [it[f][BLOB_REF_KEY] for it in items for f in fields if _is_blob_ref(it.get(f))]
+        if not refs:
+            return items
+        values = self.load_blobs(refs, session=s)
+        for it in items:
+            for f in fields:
+                if _is_blob_ref(it.get(f)):
+                    it[f] = values.get(it[f][BLOB_REF_KEY], it[f])
+        return items
+
+    @staticmethod
+    def _new_step(
+        run_id: int,
+        *,
+        phase: str,
+        message: str,
+        level: str = "info",
+        status: str = "ok",
+        payload: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+    ) -> StepEvent:
+        duration_ms = None
+        if started_at is not None and finished_at is not None:
+            duration_ms = (finished_at - started_at).total_seconds() * 1000.0
+        return StepEvent(
+            run_id=run_id, ts=datetime.now(UTC), phase=phase, level=level,
+            status=status, message=message, payload=payload, result=result,
+            step_id=step_id, tool=tool, started_at=started_at, finished_at=finished_at,
+            duration_ms=duration_ms,
+        )
+
+    @staticmethod
+    def _new_artifact(
+        run_id: int,
+        *,
+        kind: str,
+        title: str,
+        external_id: Optional[str] = None,
+        url: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> Artifact:
+        return Artifact(
+            run_id=run_id, kind=kind, title=title,
+            external_id=external_id, url=url, data=data or {}
+        )
+
     # ---- Queries ------------------------------------------------------------
     def latest_runs(
         self,
@@ -166,21 +613,148 @@ class RunStore:
         limit: int = 50,
         status: Optional[List[str]] = None,
         since: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        parent_id: Optional[int] = None,
+        meta: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
+        """
+        Newest-first runs.  Pass the last `id` of a page as `cursor` to get the
+        next (older) page; the query seeks on the primary key instead of using
+        OFFSET, so every page costs the same.  Child runs are collapsed into
+        their parent's `children` totals; pass `parent_id` to list the
+        children of one run instead.  `meta` filters on promoted meta keys,
+        e.g. ``meta={"room_id": "ZR-101"}``.
+        """
+        clauses = _meta_clauses(meta)
         with self.Session() as s:
-            q = select(WorkflowRun)
+            q = select(WorkflowRun).where(
+                WorkflowRun.parent_id.is_(None) if parent_id is None
+                else WorkflowRun.parent_id == parent_id,
+                *clauses,
+            )
             if status:
                 q = q.filter(WorkflowRun.status.in_(status))
             if since:
                 q = q.filter(WorkflowRun.started_at >= since)
+            if cursor is not None:
+                q = q.filter(WorkflowRun.id < cursor)
             rows = s.execute(q.order_by(WorkflowRun.id.desc()).limit(limit)).scalars().all()
             return [self._run_to_dict(r) for r in rows]
 
-    def run_details(self, run_id: int) -> Dict[str, Any]:
+    def changes_since(self, seq: Optional[int] = None, *, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Runs and steps created or updated after change `seq`:
+        {"seq": <new high-water mark>, "runs": [...], "steps": [...], "more": bool}.
+        Runs are returned in their current state, newest first.  Pass the
+        returned seq on the next call; None only reports the current seq.
+        `more` means `limit` changes were read and another call is due.
+        The returned seq never passes a hole in the change numbers younger
+        than FEED_SETTLE, so a change that commits out of order is not
+        skipped.
+        """
+        with self.Session() as s:
+            if seq is None:
+                head = s.execute(select(func.max(RunChange.seq))).scalar() or 0
+                recent = s.execute(
+                    select(RunChange).where(RunChange.seq > head - limit).order_by(RunChange.seq)
+                ).scalars().all()
+                start = recent[0].seq - 1 if recent else head
+                settled = _settled(recent, start)
+                return {"seq": settled[-1].seq if settled else start, "runs": [], "steps": [], "more": False}
+            changes = s.execute(
+                select(RunChange).where(RunChange.seq > seq).order_by(RunChange.seq).limit(limit)
+            ).scalars().all()
+            more = len(changes) == limit
+            settled = _settled(changes, seq)
+            if len(settled) < len(changes):
+                changes, more = settled, False
+            if not changes:
+                return {"seq": seq, "runs": [], "steps": [], "more": False}
+            first_step: Dict[int, Optional[int]] = {}
+            for c in changes:
+                if c.first_step_id is not None:
+                    prev = first_step.get(c.run_id)
+                    first_step[c.run_id] = c.first_step_id if prev is None else min(prev, c.first_step_id)
+                else:
+                    first_step.setdefault(c.run_id, None)
+            runs = s.execute(
+                select(WorkflowRun).where(WorkflowRun.id.in_(list(first_step)))
+                .order_by(WorkflowRun.id.desc())
+            ).scalars().all()
+            step_ranges = [
+                and_(StepEvent.run_id == run_id, StepEvent.id >= first)
+                for run_id, first in first_step.items() if first is not None
+            ]
+            steps = []
+            if step_ranges:
+                steps = s.execute(
+                    select(StepEvent).where(or_(*step_ranges)).order_by(StepEvent.id)
+                ).scalars().all()
+            items = [self._step_to_dict(ev) for ev in steps]
+            self._resolve_blobs(s, items, ("payload", "result"))
+            return {
+                "seq": changes[-1].seq,
+                "runs": [self._run_to_dict(r) for r in runs],
+                "steps": items,
+                "more": more,
+            }
+
+    def get_run(self, run_id: int) -> Dict[str, Any]:
+        """Run header only (no steps/artifacts); {} when the run does not exist."""
+        with self.Session() as s:
+            r = s.get(WorkflowRun, run_id)
+            if r:
+                return self._run_to_dict(r)
+        archived = self._archived_run(run_id)
+        return {k: v for k, v in archived.items() if k not in ("steps", "artifacts")}
+
+    def run_steps(
+        self,
+        run_id: int,
+        *,
+        after_id: Optional[int] = None,
+        limit: int = 50,
+        resolve_blobs: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Oldest-first steps of a run; pass the last step `id` as `after_id` for
+        the next page.  Blob refs are resolved for this page only, or left as
+        {"$blob": ...} refs with `resolve_blobs=False` (see `load_blobs`).
+        """
+        with self.Session() as s:
+            q = select(StepEvent).where(StepEvent.run_id == run_id)
+            if after_id is not None:
+                q = q.where(StepEvent.id > after_id)
+            rows = s.execute(q.order_by(StepEvent.id).limit(limit)).scalars().all()
+            if not rows and s.get(ArchivedRun, run_id):
+                return _page_after(self._archived_run(run_id).get("steps", []), after_id, limit)
+            out = [self._step_to_dict(x) for x in rows]
+            return self._resolve_blobs(s, out, ("payload", "result")) if resolve_blobs else out
+
+    def run_artifacts(
+        self,
+        run_id: int,
+        *,
+        after_id: Optional[int] = None,
+        limit: int = 50,
+        resolve_blobs: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Oldest-first artifacts of a run; keyset-paginated like `run_steps`."""
+        with self.Session() as s:
+            q = select(Artifact).where(Artifact.run_id == run_id)
+            if after_id is not None:
+                q = q.where(Artifact.id > after_id)
+            rows = s.execute(q.order_by(Artifact.id).limit(limit)).scalars().all()
+            if not rows and s.get(ArchivedRun, run_id):
+                return _page_after(self._archived_run(run_id).get("artifacts", []), after_id, limit)
+            out = [self._artifact_to_dict(x) for x in rows]
+            return self._resolve_blobs(s, out, ("data",)) if resolve_blobs else out
+
+    def run_details(self, run_id: int, *, resolve_blobs: bool = True) -> Dict[str, Any]:
         with self.Session() as s:
             r = s.get(WorkflowRun, run_id)
             if not r:
-                return {}
+                return self._archived_run(run_id, session=s)
             steps = s.execute(
                 select(StepEvent).where(StepEvent.run_id == run_id).order_by(StepEvent.id)
             ).scalars().all()
@@ -190,20 +764,242 @@ class RunStore:
             d = self._run_to_dict(r)
             d["steps"] = [self._step_to_dict(x) for x in steps]
             d["artifacts"] = [self._artifact_to_dict(x) for x in arts]
+            if resolve_blobs:
+                self._resolve_blobs(s, d["steps"], ("payload", "result"))
+                self._resolve_blobs(s, d["artifacts"], ("data",))
             return d
 
-    def stats(self, *, since: Optional[datetime] = None) -> Dict[str, Any]:
+    def stats(
+        self, *, since: Optional[datetime] = None, meta: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Aggregate KPIs for runs started at or after `since`.
+        Whole hours are read from the run rollups and duration sketches; only
+        the partial leading hour of the window and still-running runs touch
+        `workflow_runs`, so the cost does not grow with run history.  With a
+        `meta` filter (promoted keys only) the matching runs are read through
+        the key's index instead, since the rollups are not split by meta.
+        """
+        clauses = _meta_clauses(meta)
+        window = [WorkflowRun.parent_id.is_(None), *clauses]
+        if since:
+            window.append(WorkflowRun.started_at >= since)
+        with self.Session() as s:
+            if clauses:
+                n, succ = s.execute(
+                    select(
+                        func.count(WorkflowRun.id),
+                        func.coalesce(func.sum(case((WorkflowRun.status == "success", 1), else_=0)), 0),
+                    ).where(*window)
+                ).one()
+                sk = DDSketch().extend(
+                    d for d in s.execute(select(WorkflowRun.duration_ms).where(*window)).scalars() if d
+                )
+            else:
+                n, succ = self._rollup_counts(s, since)
+                sk = self._duration_sketch(s, since)
+            last_err = s.execute(
+                select(WorkflowRun.error)
+                .where(*window, WorkflowRun.error.is_not(None), WorkflowRun.error != "")
+                .order_by(WorkflowRun.id.desc())
+                .limit(1)
+            ).scalar()
+            return {
+                "runs": n,
+                "success_rate": (succ / n) * 100.0 if n else 0.0,
+                "p50_ms": sk.quantile(0.50),
+                "p95_ms": sk.quantile(0.95),
+                "p99_ms": sk.quantile(0.99),
+                "last_error": last_err or "",
+            }
+
+    @staticmethod
+    def _rollup_counts(s, since: Optional[datetime]) -> Tuple[int, int]:
+        """(runs, successes) of top-level runs from the rollups plus the raw edge rows."""
+        edge = _ceil_hour(since) if since else None
+        n, succ = s.execute(
+            select(
+                func.coalesce(func.sum(RunRollup.runs), 0),
+                func.coalesce(
+                    func.sum(case((RunRollup.status == "success", RunRollup.runs), else_=0)), 0
+                ),
+            ).where(RunRollup.child.is_(None), *([RunRollup.bucket >= edge] if edge else []))
+        ).one()
+        raw = [WorkflowRun.parent_id.is_(None), WorkflowRun.status == "running"]
+        if since:
+            raw = [WorkflowRun.parent_id.is_(None), WorkflowRun.started_at >= since,
+                   or_(WorkflowRun.started_at < edge, WorkflowRun.status == "running")]
+        raw_n, raw_succ = s.execute(
+            select(
+                func.count(WorkflowRun.id),
+                func.coalesce(func.sum(case((WorkflowRun.status == "success", 1), else_=0)), 0),
+            ).where(*raw)
+        ).one()
+        return n + raw_n, succ + raw_succ
+
+    def trend(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        status: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-level runs per started_at hour, read from the rollups plus
+        in-flight runs (or, with a `meta` filter, from the matching runs).
+        Like `stats()`, only runs started at or after `since` count, so the
+        leading hour may be partial.
+        """
+        clauses = _meta_clauses(meta)
         with self.Session() as s:
-            q = select(WorkflowRun)
+            if clauses:
+                q = select(WorkflowRun.started_at).where(WorkflowRun.parent_id.is_(None), *clauses)
+                if since:
+                    q = q.where(WorkflowRun.started_at >= since)
+                if status:
+                    q = q.where(WorkflowRun.status.in_(status))
+                counts: Dict[datetime, int] = {}
+                for started_at in s.execute(q).scalars():
+                    b = _floor_hour(started_at)
+                    counts[b] = counts.get(b, 0) + 1
+                return [{"bucket": b.isoformat(), "runs": counts[b]} for b in sorted(counts)]
+            q = (
+                select(RunRollup.bucket, func.sum(RunRollup.runs))
+                .where(RunRollup.child.is_(None))
+                .group_by(RunRollup.bucket)
+            )
+            edge = _ceil_hour(since) if since else None
+            if edge:
+                q = q.where(RunRollup.bucket >= edge)
+            if status:
+                q = q.where(RunRollup.status.in_(status))
+            counts = {b: int(n) for b, n in s.execute(q)}
+            # In-flight runs, and every run of the partial leading hour.
+            raw = select(WorkflowRun.started_at).where(WorkflowRun.parent_id.is_(None))
             if since:
-                q = q.filter(WorkflowRun.started_at >= since)
-            rows = s.execute(q).scalars().all()
-            n = len(rows)
-            succ = sum(1 for r in rows if r.status == "success")
-            durs = sorted([r.duration_ms or 0.0 for r in rows if r.duration_ms])
-            p95 = _quantile(durs, 0.95) if durs else 0.0
-            last_err = next((r.error for r in sorted(rows, key=lambda x: x.id, reverse=True) if r.error), "")
-            return {"runs": n, "success_rate": (succ / n) * 100.0 if n else 0.0, "p95_ms": p95, "last_error": last_err or ""}
+                raw = raw.where(
+                    WorkflowRun.started_at >= since,
+                    or_(WorkflowRun.started_at < edge, WorkflowRun.status == "running"),
+                )
+            else:
+                raw = raw.where(WorkflowRun.status == "running")
+            if status:
+                raw = raw.where(WorkflowRun.status.in_(status))
+            for started_at in s.execute(raw).scalars():
+                b = _floor_hour(started_at)
+                counts[b] = counts.get(b, 0) + 1
+            return [{"bucket": b.isoformat(), "runs": counts[b]} for b in sorted(counts)]
+
+    def search(
+        self, query: str, *, since: Optional[datetime] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over run errors, step messages and artifact
+        titles/external ids, best match first.  Every whitespace-separated
+        word must match; a trailing `*` matches a prefix.  Each hit is
+        {"run_id", "kind": run|step|artifact, "item_id", "snippet", "rank",
+        "name", "status", "started_at"}.  Uses the FTS5 index on SQLite and
+        a LIKE scan elsewhere (rank 0).  When a query matches more than
+        SEARCH_CANDIDATES rows, only the newest that many are ranked.
+        """
+        words = [w for w in (query or "").split() if w.strip('"*')]
+        if not words:
+            return []
+        with self.Session() as s:
+            if self.search_fts:
+                match = " ".join(
+                    '"' + w.rstrip("*").replace('"', '""') + '"' + ("*" if w.endswith("*") else "")
+                    for w in words
+                )
+                sql = (
+                    "SELECT f.rowid, f.run_id, snippet(run_search, 0, '[', ']', '…', 12), "
+                    "bm25(run_search) AS rank FROM run_search f "
+                    "JOIN workflow_runs r ON r.id = f.run_id WHERE run_search MATCH :match "
+                    # rowid grows with the source id: rank the newest candidates only
+                    "AND f.rowid >= coalesce((SELECT rowid FROM run_search WHERE run_search MATCH :match "
+                    "ORDER BY rowid DESC LIMIT 1 OFFSET :skip), 0)"
+                )
+                params: Dict[str, Any] = {"match": match, "limit": limit, "skip": SEARCH_CANDIDATES - 1}
+                if since is not None:
+                    sql += " AND r.started_at >= :since"
+                    params["since"] = since
+                stmt = text(sql + " ORDER BY rank LIMIT :limit")
+                if since is not None:
+                    # same datetime storage format as the ORM columns
+                    stmt = stmt.bindparams(bindparam("since", type_=DateTime(timezone=True)))
+                rows = s.execute(stmt, params).all()
+                runs = {
+                    r.id: r for r in s.execute(
+                        select(WorkflowRun).where(WorkflowRun.id.in_({row[1] for row in rows}))
+                    ).scalars()
+                }
+                return [
+                    {
+                        "run_id": run_id, "kind": _SEARCH_KINDS[rowid % 4], "item_id": rowid // 4,
+                        "snippet": snip, "rank": rank, "name": runs[run_id].name,
+                        "status": runs[run_id].status,
+                        "started_at": runs[run_id].started_at.isoformat(),
+                    }
+                    for rowid, run_id, snip, rank in rows
+                ]
+            return self._search_like(s, [w.strip('"*') for w in words], since, limit)
+
+    def _search_like(self, s, words: List[str], since: Optional[datetime], limit: int) -> List[Dict[str, Any]]:
+        """Unindexed fallback for databases without FTS5."""
+        hits: List[Dict[str, Any]] = []
+        sources = (
+            ("run", WorkflowRun.id, WorkflowRun.id, (WorkflowRun.error,)),
+            ("step", StepEvent.id, StepEvent.run_id, (StepEvent.message,)),
+            ("artifact", Artifact.id, Artifact.run_id, (Artifact.title, Artifact.external_id)),
+        )
+        for kind, item_col, run_col, cols in sources:
+            q = select(item_col, run_col, *cols, WorkflowRun.name, WorkflowRun.status, WorkflowRun.started_at)
+            if kind != "run":
+                q = q.join(WorkflowRun, WorkflowRun.id == run_col)
+            for w in words:
+                pattern = "%" + w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                q = q.where(or_(*(c.ilike(pattern, escape="\\") for c in cols)))
+            if since is not None:
+                q = q.where(WorkflowRun.started_at >= since)
+            for row in s.execute(q.order_by(run_col.desc()).limit(limit)):
+                body = " ".join(str(v) for v in row[2:2 + len(cols)] if v)
+                name, status, started = row[2 + len(cols):]
+                hits.append({
+                    "run_id": row[1], "kind": kind, "item_id": row[0], "snippet": body[:200],
+                    "rank": 0.0, "name": name, "status": status, "started_at": started.isoformat(),
+                })
+        return sorted(hits, key=lambda h: h["run_id"], reverse=True)[:limit]
+
+    def slowest_steps(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        recipe_id: Optional[int] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        Latency percentiles per (recipe, step id, tool) from `step_rollups`,
+        slowest p95 first.  `since` is applied to the hour.
+        """
+        q = select(
+            StepRollup.recipe_id, StepRollup.step_id, StepRollup.tool, StepRollup.steps,
+            StepRollup.failures, StepRollup.duration_sum_ms, StepRollup.sketch,
+        )
+        if since is not None:
+            q = q.where(StepRollup.bucket >= _floor_hour(since))
+        if recipe_id is not None:
+            q = q.where(StepRollup.recipe_id == recipe_id)
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        with self.Session() as s:
+            for rid, step_id, tool, steps, failures, dur_sum, sketch in s.execute(q):
+                m = merged.setdefault((rid, step_id, tool), {
+                    "steps": 0, "failures": 0, "sum": 0.0, "sketch": DDSketch(),
+                })
+                m["steps"] += steps or 0
+                m["failures"] += failures or 0
+                m["sum"] += dur_sum or 0.0
+                m["sketch"].merge(DDSketch.from_dict(sketch))
+        return _step_latency_rows(merged, limit)
 
     def recipe_metrics(self, recipe_id: int, *, limit: int = 200) -> Dict[str, Any]:
         """Return recent success metrics for a specific recipe."""
@@ -229,6 +1025,282 @@ class RunStore:
                 "avg_ms": avg_ms,
             }
 
+    def recipe_metrics_bulk(
+        self, recipe_ids: Iterable[int], *, limit: Optional[int] = 200
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        `recipe_metrics()` for many recipes in one aggregated query, keyed by
+        recipe id.  Each recipe's last `limit` runs are cut out with one
+        (recipe_id, id) index range and `last_status` is the ROW_NUMBER() = 1
+        row of that window.  With limit=None the counts cover the whole
+        history and come from `run_rollups` (archived runs included).
+        """
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be at least 1 or None, got {limit!r}")
+        ids = sorted({int(i) for i in recipe_ids})
+        out = {
+            rid: {"runs": 0, "success_rate": 0.0, "last_status": "unknown", "avg_ms": 0.0}
+            for rid in ids
+        }
+        with self.Session() as s:
+            # SQLite allows at most 500 terms in one compound SELECT.
+            for lo in range(0, len(ids), 400):
+                chunk = ids[lo:lo + 400]
+                keys = union_all(
+                    *(select(literal(rid, Integer).label("recipe_id")) for rid in chunk)
+                ).cte("recipe_keys")
+                newest = (
+                    select(WorkflowRun.id).where(WorkflowRun.recipe_id == keys.c.recipe_id)
+                    .order_by(WorkflowRun.id.desc())
+                )
+                if limit is None:
+                    rows = s.execute(
+                        select(
+                            RunRollup.recipe_id,
+                            func.sum(RunRollup.runs),
+                            func.sum(case((RunRollup.status == "success", RunRollup.runs), else_=0)),
+                            func.sum(RunRollup.duration_sum_ms),
+                        ).where(RunRollup.recipe_id.in_(chunk)).group_by(RunRollup.recipe_id)
+                    ).all()
+                    for rid, runs, success, dur_sum in rows:
+                        out[rid].update(
+                            runs=int(runs or 0),
+                            success_rate=(success / runs) * 100.0 if runs else 0.0,
+                            avg_ms=(dur_sum or 0.0) / runs if runs else 0.0,
+                        )
+                    last = select(
+                        keys.c.recipe_id,
+                        select(WorkflowRun.status).where(WorkflowRun.recipe_id == keys.c.recipe_id)
+                        .order_by(WorkflowRun.id.desc()).limit(1).scalar_subquery(),
+                    )
+                    for rid, status in s.execute(last):
+                        if status is not None:
+                            out[rid]["last_status"] = status
+                    continue
+
+                # id of each recipe's limit-th newest run; NULL when it has fewer
+                cut = select(
+                    keys.c.recipe_id,
+                    newest.offset(limit - 1).limit(1).scalar_subquery().label("min_id"),
+                ).cte("recipe_cut")
+                recent = (
+                    select(
+                        WorkflowRun.recipe_id, WorkflowRun.status, WorkflowRun.duration_ms,
+                        func.row_number().over(
+                            partition_by=WorkflowRun.recipe_id, order_by=WorkflowRun.id.desc()
+                        ).label("rn"),
+                    )
+                    .join(cut, and_(
+                        WorkflowRun.recipe_id == cut.c.recipe_id,
+                        WorkflowRun.id >= func.coalesce(cut.c.min_id, 0),
+                    ))
+                    .subquery()
+                )
+                rows = s.execute(
+                    select(
+                        recent.c.recipe_id,
+                        func.count(),
+                        func.sum(case((recent.c.status == "success", 1), else_=0)),
+                        func.avg(func.coalesce(recent.c.duration_ms, 0.0)),
+                        func.max(case((recent.c.rn == 1, recent.c.status))),
+                    ).group_by(recent.c.recipe_id)
+                ).all()
+                for rid, runs, success, avg_ms, last_status in rows:
+                    out[rid] = {
+                        "runs": runs,
+                        "success_rate": (success / runs) * 100.0 if runs else 0.0,
+                        "last_status": last_status or "unknown",
+                        "avg_ms": float(avg_ms or 0.0),
+                    }
+        return out
+
+    # ---- Rollups -------------------------------------------------------------
+    @staticmethod
+    def _add_to_rollups(s, r: WorkflowRun) -> None:
+        """
+        Fold a finished run into its hourly rollup and sketch rows, and a
+        child run into its parent's totals (caller commits).
+        """
+        bucket = _floor_hour(r.started_at)
+        durations = [r.duration_ms] if r.duration_ms else []
+        key = {
+            "bucket": bucket, "workflow_id": r.workflow_id, "recipe_id": r.recipe_id,
+            "agent_id": r.agent_id, "status": r.status,
+            "child": True if r.parent_id is not None else None,
+        }
+        _fold_rollup(
+            s, RunRollup, key, {"runs": 1, "duration_sum_ms": r.duration_ms or 0.0}, durations
+        )
+        if r.parent_id is not None:
+            RunStore._finish_child(s, r)
+            return  # the p50/p95/p99 KPIs cover top-level runs
+        if durations:
+            _fold_rollup(s, DurationSketch, {"bucket": bucket}, {"runs": 1}, durations)
+
+    @staticmethod
+    def _count_child(s, parent_id: Optional[int]) -> None:
+        """Count a new child run on its parent (caller commits)."""
+        if parent_id is None:
+            return
+        s.execute(
+            update(WorkflowRun).where(WorkflowRun.id == parent_id)
+            .values(children_total=func.coalesce(WorkflowRun.children_total, 0) + 1)
+        )
+        s.add(RunChange(run_id=parent_id))
+
+    @staticmethod
+    def _finish_child(s, r: WorkflowRun) -> None:
+        """Add a finished child's status and duration to its parent's totals."""
+        values: Dict[str, Any] = {
+            "children_duration_ms": func.coalesce(WorkflowRun.children_duration_ms, 0.0) + (r.duration_ms or 0.0),
+        }
+        if r.status == "success":
+            values["children_success"] = func.coalesce(WorkflowRun.children_success, 0) + 1
+        else:
+            values["children_failed"] = func.coalesce(WorkflowRun.children_failed, 0) + 1
+        s.execute(update(WorkflowRun).where(WorkflowRun.id == r.parent_id).values(**values))
+        s.add(RunChange(run_id=r.parent_id))
+
+    @staticmethod
+    def _add_to_step_rollups(s, events: Iterable[Base]) -> None:
+        """Fold timed steps into their hourly step_rollups rows (caller commits)."""
+        timed = [e for e in events if isinstance(e, StepEvent) and e.duration_ms is not None]
+        if not timed:
+            return
+        recipes = dict(s.execute(
+            select(WorkflowRun.id, WorkflowRun.recipe_id)
+            .where(WorkflowRun.id.in_({e.run_id for e in timed}))
+        ).all())
+        groups: Dict[tuple, List[StepEvent]] = {}
+        for e in timed:
+            key = (_utc(_floor_hour(e.started_at)), recipes.get(e.run_id), e.step_id or e.phase, e.tool)
+            groups.setdefault(key, []).append(e)
+        # One fold per touched row, in key order so concurrent writers lock
+        # rows in the same order.
+        for key in sorted(groups, key=lambda k: tuple((v is None, v) for v in k)):
+            bucket, recipe_id, step_id, tool = key
+            evs = groups[key]
+            _fold_rollup(
+                s, StepRollup,
+                {"bucket": bucket, "recipe_id": recipe_id, "step_id": step_id, "tool": tool},
+                {
+                    "steps": len(evs),
+                    "failures": sum(1 for e in evs if e.status in _FAILED_STEP),
+                    "duration_sum_ms": sum(e.duration_ms for e in evs),
+                },
+                [e.duration_ms for e in evs],
+            )
+
+    @staticmethod
+    def _duration_sketch(s, since: Optional[datetime]) -> DDSketch:
+        sk = DDSketch()
+        q = select(DurationSketch.sketch)
+        if since:
+            # Whole hours come from the sketches; the leading partial hour from raw rows.
+            edge = _ceil_hour(since)
+            q = q.where(DurationSketch.bucket >= edge)
+            sk.extend(
+                d for d in s.execute(
+                    select(WorkflowRun.duration_ms).where(
+                        WorkflowRun.started_at >= since, WorkflowRun.started_at < edge,
+                        WorkflowRun.parent_id.is_(None),
+                    )
+                ).scalars() if d
+            )
+        for blob in s.execute(q).scalars():
+            sk.merge(DDSketch.from_dict(blob))
+        return sk
+
+    def rebuild_rollups(self) -> None:
+        """Recompute run_rollups, duration_sketches and step_rollups from the raw rows."""
+        with self.Session() as s:
+            s.execute(delete(RunRollup))
+            s.execute(delete(DurationSketch))
+            rows = s.execute(
+                select(
+                    WorkflowRun.started_at, WorkflowRun.workflow_id, WorkflowRun.recipe_id,
+                    WorkflowRun.agent_id, WorkflowRun.status, WorkflowRun.duration_ms,
+                    WorkflowRun.parent_id,
+                )
+                .where(WorkflowRun.status != "running")
+                .execution_options(yield_per=5000)
+            )
+            rollups: Dict[tuple, RunRollup] = {}
+            sketches: Dict[datetime, DDSketch] = {}
+            roll_sketches: Dict[tuple, DDSketch] = {}
+            for started_at, wf_id, recipe_id, agent_id, status, dur, parent_id in rows:
+                bucket = _floor_hour(started_at)
+                child = True if parent_id is not None else None
+                key = (bucket, wf_id, recipe_id, agent_id, status, child)
+                roll = rollups.get(key)
+                if roll is None:
+                    roll = rollups[key] = RunRollup(
+                        bucket=bucket, workflow_id=wf_id, recipe_id=recipe_id,
+                        agent_id=agent_id, status=status, runs=0, duration_sum_ms=0.0, child=child,
+                    )
+                roll.runs += 1
+                roll.duration_sum_ms += dur or 0.0
+                if dur:
+                    roll_sketches.setdefault(key, DDSketch()).add(dur)
+                    if child is None:
+                        sketches.setdefault(bucket, DDSketch()).add(dur)
+            for key, roll in rollups.items():
+                roll.sketch = roll_sketches[key].to_dict() if key in roll_sketches else {}
+            s.add_all(rollups.values())
+            s.add_all(
+                DurationSketch(bucket=b, runs=sk.count, sketch=sk.to_dict())
+                for b, sk in sketches.items()
+            )
+            s.execute(delete(StepRollup))
+            step_rows = s.execute(
+                select(
+                    StepEvent.started_at, WorkflowRun.recipe_id,
+                    func.coalesce(StepEvent.step_id, StepEvent.phase), StepEvent.tool,
+                    StepEvent.status, StepEvent.duration_ms,
+                )
+                .join(WorkflowRun, WorkflowRun.id == StepEvent.run_id)
+                .where(StepEvent.duration_ms.is_not(None))
+                .execution_options(yield_per=5000)
+            )
+            step_rollups: Dict[tuple, StepRollup] = {}
+            step_sketches: Dict[tuple, DDSketch] = {}
+            for started_at, recipe_id, step_id, tool, status, dur in step_rows:
+                key = (_floor_hour(started_at), recipe_id, step_id, tool)
+                roll = step_rollups.get(key)
+                if roll is None:
+                    roll = step_rollups[key] = StepRollup(
+                        bucket=key[0], recipe_id=recipe_id, step_id=step_id, tool=tool,
+                        steps=0, failures=0, duration_sum_ms=0.0,
+                    )
+                roll.steps += 1
+                roll.failures += status in _FAILED_STEP
+                roll.duration_sum_ms += dur
+                step_sketches.setdefault(key, DDSketch()).add(dur)
+            for key, roll in step_rollups.items():
+                roll.sketch = step_sketches[key].to_dict()
+            s.add_all(step_rollups.values())
+            s.commit()
+
+    def _backfill_rollups(self) -> None:
+        """Build rollups once for databases created before they existed."""
+        with self.Session() as s:
+            if s.execute(select(RunRollup.id).limit(1)).first() is not None:
+                return
+            if s.execute(
+                select(WorkflowRun.id).where(WorkflowRun.status != "running").limit(1)
+            ).first() is None:
+                return
+        self.rebuild_rollups()
+
+    def _backfill_promoted_meta(self, keys: List[str]) -> None:
+        """Fill newly added promoted columns from the `meta` of existing runs."""
+        if not keys:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(update(WorkflowRun).values({
+                k: func.substr(func.nullif(WorkflowRun.meta[k].as_string(), ""), 1, 128) for k in keys
+            }))
+
     # ---- Dict helpers -------------------------------------------------------
     @staticmethod
     def _run_to_dict(r: WorkflowRun) -> Dict[str, Any]:
@@ -238,6 +1310,14 @@ class RunStore:
             "status": r.status, "started_at": r.started_at.isoformat(),
             "finished_at": r.finished_at.isoformat() if r.finished_at else None,
             "duration_ms": r.duration_ms, "error": r.error, "meta": r.meta,
+            "parent_id": r.parent_id,
+            "children": None if not r.children_total else {
+                "total": r.children_total,
+                "success": r.children_success or 0,
+                "failed": r.children_failed or 0,
+                "running": r.children_total - (r.children_success or 0) - (r.children_failed or 0),
+                "duration_ms": r.children_duration_ms or 0.0,
+            },
         }
 
     @staticmethod
@@ -246,6 +1326,10 @@ class RunStore:
             "id": sv.id, "run_id": sv.run_id, "ts": sv.ts.isoformat(),
             "phase": sv.phase, "level": sv.level, "status": sv.status,
             "message": sv.message, "payload": sv.payload, "result": sv.result,
+            "step_id": sv.step_id, "tool": sv.tool,
+            "started_at": sv.started_at.isoformat() if sv.started_at else None,
+            "finished_at": sv.finished_at.isoformat() if sv.finished_at else None,
+            "duration_ms": sv.duration_ms,
         }
 
     @staticmethod
@@ -256,11 +1340,198 @@ class RunStore:
         }
 
 
+# Full-text index over run errors, step messages and artifact titles/ids.
+# The FTS rowid encodes the source row (id * 4 + kind) so the triggers can
+# update and delete entries without scanning the index.
+_SEARCH_KINDS = {0: "run", 1: "step", 2: "artifact"}
+_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE run_search USING fts5("
+    "body, run_id UNINDEXED, tokenize = 'porter unicode61')"
+)
+# IF NOT EXISTS: triggers added in later versions are created on existing indexes too.
+_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS run_search_run_ai AFTER INSERT ON workflow_runs WHEN new.error IS NOT NULL "
+    "BEGIN INSERT INTO run_search(rowid, body, run_id) VALUES (new.id * 4, new.error, new.id); END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_run_au AFTER UPDATE OF error ON workflow_runs BEGIN "
+    "DELETE FROM run_search WHERE rowid = old.id * 4; "
+    "INSERT INTO run_search(rowid, body, run_id) "
+    "SELECT new.id * 4, new.error, new.id WHERE new.error IS NOT NULL; END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_run_ad AFTER DELETE ON workflow_runs "
+    "BEGIN DELETE FROM run_search WHERE rowid = old.id * 4; END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_step_ai AFTER INSERT ON step_events "
+    "BEGIN INSERT INTO run_search(rowid, body, run_id) VALUES (new.id * 4 + 1, new.message, new.run_id); END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_step_au AFTER UPDATE OF message ON step_events BEGIN "
+    "DELETE FROM run_search WHERE rowid = old.id * 4 + 1; "
+    "INSERT INTO run_search(rowid, body, run_id) VALUES (new.id * 4 + 1, new.message, new.run_id); END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_step_ad AFTER DELETE ON step_events "
+    "BEGIN DELETE FROM run_search WHERE rowid = old.id * 4 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_artifact_ai AFTER INSERT ON artifacts "
+    "BEGIN INSERT INTO run_search(rowid, body, run_id) VALUES "
+    "(new.id * 4 + 2, coalesce(new.title, '') || ' ' || coalesce(new.external_id, ''), new.run_id); END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_artifact_au AFTER UPDATE OF title, external_id ON artifacts "
+    "BEGIN DELETE FROM run_search WHERE rowid = old.id * 4 + 2; "
+    "INSERT INTO run_search(rowid, body, run_id) VALUES "
+    "(new.id * 4 + 2, coalesce(new.title, '') || ' ' || coalesce(new.external_id, ''), new.run_id); END",
+    "CREATE TRIGGER IF NOT EXISTS run_search_artifact_ad AFTER DELETE ON artifacts "
+    "BEGIN DELETE FROM run_search WHERE rowid = old.id * 4 + 2; END",
+)
+# Index what is already there when the index is first created.
+_SEARCH_BACKFILL = (
+    "INSERT INTO run_search(rowid, body, run_id) "
+    "SELECT id * 4, error, id FROM workflow_runs WHERE error IS NOT NULL",
+    "INSERT INTO run_search(rowid, body, run_id) SELECT id * 4 + 1, message, run_id FROM step_events",
+    "INSERT INTO run_search(rowid, body, run_id) SELECT id * 4 + 2, "
+    "coalesce(title, '') || ' ' || coalesce(external_id, ''), run_id FROM artifacts",
+)
+# search() ranks at most this many of the newest matches: bm25 scores every
+# candidate, so ranking all hits of a common word cost more than a LIKE scan.
+SEARCH_CANDIDATES = 2000
+
+
+def ensure_search_index(engine) -> bool:
+    """
+    Create (and fill) the FTS5 search index and its triggers once; returns
+    whether `RunStore.search()` can use it.  False on other databases or
+    SQLite builds without FTS5, where search falls back to LIKE.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'run_search'"
+        ).first()
+        ddl = _SEARCH_TRIGGERS if exists else (_SEARCH_TABLE, *_SEARCH_TRIGGERS, *_SEARCH_BACKFILL)
+        try:
+            for stmt in ddl:
+                conn.exec_driver_sql(stmt)
+        except OperationalError:  # "no such module: fts5"
+            conn.rollback()
+            return False
+    return True
+
+
+# Read-only views with the column layout of the app database's `runs` and
+# `evidence` tables (core/db/models.py), for readers of the old schema now
+# that workflow executions are recorded only here.
+LEGACY_VIEWS = {
+    "legacy_runs": (
+        "SELECT id, agent_id, recipe_id, "
+        "CASE status WHEN 'success' THEN 'completed' ELSE status END AS status, "
+        "started_at, finished_at AS completed_at FROM workflow_runs"
+    ),
+    "legacy_evidence": (
+        "SELECT id, run_id, payload, ts AS created_at FROM step_events"
+    ),
+}
+
+
+def migrate_schema(engine) -> List[str]:
+    """
+    Bring an existing database up to the current schema in place.
+    `create_all()` only creates missing tables, so nullable columns,
+    indexes and views declared after a table was first created are added
+    here, and SQLite tables created without AUTOINCREMENT are rebuilt with
+    it.  Safe to run on every start; returns the names of the objects it
+    created.
+    """
+    created: List[str] = []
+    insp = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        columns = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in columns or not col.nullable:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}"
+            with engine.begin() as conn:
+                conn.exec_driver_sql(ddl)
+            created.append(f"{table.name}.{col.name}")
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for ix in table.indexes:
+            if ix.name not in existing:
+                ix.create(engine, checkfirst=True)
+                created.append(ix.name)
+    views = set(insp.get_view_names())
+    for view, select_sql in LEGACY_VIEWS.items():
+        if view not in views:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"CREATE VIEW {view} AS {select_sql}")
+            created.append(view)
+    if engine.dialect.name == "sqlite":
+        created += _sqlite_add_autoincrement(engine)
+    if created and engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")  # refresh planner statistics for the new indexes
+    return created
+
+
+def _sqlite_add_autoincrement(engine) -> List[str]:
+    """
+    Rebuild tables declared with sqlite_autoincrement whose existing DDL
+    lacks it: without AUTOINCREMENT SQLite reuses the ids of deleted
+    (archived) rows.  Rows keep their ids; the workflow_runs sequence also
+    starts above every archived run.
+    """
+    declared = [t for t in Base.metadata.sorted_tables if t.dialect_options["sqlite"]["autoincrement"]]
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")  # DROP TABLE must not cascade into steps
+        # pysqlite does not open transactions for DDL; one explicit transaction keeps the rebuild atomic.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            tables = dict(conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'table'").all())
+            todo = [t for t in declared if t.name in tables and "AUTOINCREMENT" not in (tables[t.name] or "").upper()]
+            if todo:
+                # Views and triggers are re-created afterwards, so no rename rewrites them.
+                dependents = conn.exec_driver_sql(
+                    "SELECT type, name, sql FROM sqlite_master WHERE type IN ('view', 'trigger') "
+                    "AND sql IS NOT NULL ORDER BY rowid"
+                ).all()
+                for kind, name, _ in dependents:
+                    conn.exec_driver_sql(f'DROP {kind.upper()} IF EXISTS "{name}"')
+                for t in todo:
+                    existing = {r[1] for r in conn.exec_driver_sql(f'PRAGMA table_info("{t.name}")')}
+                    cols = ", ".join(f'"{c.name}"' for c in t.columns if c.name in existing)
+                    md = MetaData()  # holds the tables the copy's foreign keys point at
+                    for fk in t.foreign_keys:
+                        fk.column.table.to_metadata(md)
+                    new = t.to_metadata(md, name=f"{t.name}__new")
+                    conn.execute(CreateTable(new))
+                    conn.exec_driver_sql(f'INSERT INTO "{new.name}" ({cols}) SELECT {cols} FROM "{t.name}"')
+                    conn.exec_driver_sql(f'DROP TABLE "{t.name}"')
+                    conn.exec_driver_sql(f'ALTER TABLE "{new.name}" RENAME TO "{t.name}"')
+                    for ix in t.indexes:
+                        ix.create(conn)
+                if WorkflowRun.__table__ in todo and "archived_runs" in tables:
+                    archived = conn.exec_driver_sql("SELECT coalesce(max(run_id), 0) FROM archived_runs").scalar()
+                    if not conn.exec_driver_sql(
+                        "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'workflow_runs'", (archived,)
+                    ).rowcount:
+                        conn.exec_driver_sql(
+                            "INSERT INTO sqlite_sequence (name, seq) VALUES ('workflow_runs', ?)", (archived,)
+                        )
+                for _, _, sql in dependents:
+                    conn.exec_driver_sql(sql)
+            conn.exec_driver_sql("COMMIT")
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        finally:
+            conn.exec_driver_sql(f"PRAGMA foreign_keys={int(foreign_keys or 0)}")
+    return [f"{t.name} AUTOINCREMENT" for t in todo]
+
+
 class Recorder:
     """Use inside the workflow_run() context manager."""
     def __init__(self, store: RunStore, run_id: int):
         self.store = store
         self.run_id = run_id
+        self.status, self.error = "success", None
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """Final status for a block that exits normally (e.g. "partial"); an exception still means "failed"."""
+        self.status, self.error = status, error
 
     def step(
         self,
@@ -271,12 +1542,50 @@ class Recorder:
         status: str = "ok",
         payload: Optional[Dict[str, Any]] = None,
         result: Optional[Dict[str, Any]] = None,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
     ):
         self.store.log_step(
             self.run_id, phase=phase, message=message, level=level,
-            status=status, payload=payload, result=result
+            status=status, payload=payload, result=result,
+            step_id=step_id, tool=tool, started_at=started_at, finished_at=finished_at,
         )
 
+    @contextlib.contextmanager
+    def span(
+        self,
+        phase: str,
+        message: str,
+        *,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Time the block and log it as one step with started_at/finished_at/
+        duration_ms.  Yields a dict; set its "result", "status" or "message"
+        inside the block.  If the block raises, the step is logged with
+        status "error" and the exception propagates.
+        """
+        out: Dict[str, Any] = {"message": message, "status": "ok", "result": None}
+        level = "info"
+        started = datetime.now(UTC)
+        t0 = time.perf_counter()
+        try:
+            yield out
+        except Exception as e:
+            level, out["status"] = "error", "error"
+            out["result"] = out["result"] or {"error": f"{type(e).__name__}: {e}"}
+            raise
+        finally:
+            self.step(
+                phase, out["message"], level=level, status=out["status"], payload=payload,
+                result=out["result"], step_id=step_id, tool=tool, started_at=started,
+                finished_at=started + timedelta(seconds=time.perf_counter() - t0),
+            )
+
     def artifact(
         self,
         kind: str,
@@ -291,16 +1600,222 @@ class Recorder:
             external_id=external_id, url=url, data=data
         )
 
+    def flush(self, *, session: Optional[Any] = None) -> List[Base]:
+        """No-op for the unbuffered recorder; every event is already committed."""
+        return []
+
+
+class BufferedRecorder(Recorder):
+    """
+    Write-behind recorder: queues steps/artifacts in memory and writes them in
+    one transaction once `flush_size` events are pending or `flush_interval_s`
+    seconds passed since the last flush (checked when an event is queued).
+    With both thresholds set to None events are only written by `flush()`,
+    which `workflow_run()` calls on exit.
+    """
+    def __init__(
+        self,
+        store: RunStore,
+        run_id: int,
+        *,
+        flush_size: Optional[int] = 100,
+        flush_interval_s: Optional[float] = 1.0,
+    ):
+        super().__init__(store, run_id)
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+        self._pending: List[Base] = []
+        self._last_flush = time.monotonic()
+
+    def step(
+        self,
+        phase: str,
+        message: str,
+        *,
+        level: str = "info",
+        status: str = "ok",
+        payload: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+    ):
+        self._enqueue(self.store._new_step(
+            self.run_id, phase=phase, message=message, level=level,
+            status=status, payload=payload, result=result,
+            step_id=step_id, tool=tool, started_at=started_at, finished_at=finished_at,
+        ))
+
+    def artifact(
+        self,
+        kind: str,
+        title: str,
+        *,
+        external_id: Optional[str] = None,
+        url: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ):
+        self._enqueue(self.store._new_artifact(
+            self.run_id, kind=kind, title=title,
+            external_id=external_id, url=url, data=data
+        ))
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self, *, session: Optional[Any] = None) -> List[Base]:
+        """
+        Write all queued events and return them; joins `session`'s
+        transaction when given (the caller then records the change).
+        """
+        events, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        self.store.write_events(events, session=session)
+        return events
+
+    def _enqueue(self, ev: Base) -> None:
+        self._pending.append(ev)
+        if self.flush_size is not None and len(self._pending) >= self.flush_size:
+            self.flush()
+        elif (
+            self.flush_interval_s is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval_s
+        ):
+            self.flush()
+
+
+def _fold_rollup(
+    s, model, key: Dict[str, Any], counts: Dict[str, float], durations: List[float]
+) -> None:
+    """
+    Add `counts` to the `model` row matching `key` and fold `durations` into
+    its sketch, creating the row if needed (caller commits).
+
+    Concurrent folds never overwrite each other: the row is read FOR UPDATE
+    (a row lock on Postgres; SQLite serialises writers anyway) and written
+    back only if its first counter -- which every fold increases, so it
+    doubles as a version -- is unchanged since the read; otherwise the fold
+    re-reads and tries again.  Two writers that create the same key at once
+    may leave two rows for it: readers sum rows, and folds go to the oldest.
+    """
+    pk = inspect(model).primary_key[0]
+    version = getattr(model, next(iter(counts)))
+    match = [getattr(model, k).is_(None) if v is None else getattr(model, k) == v for k, v in key.items()]
+    while True:
+        row = s.execute(
+            select(pk, version, model.sketch).where(*match).order_by(pk).limit(1).with_for_update()
+        ).first()
+        if row is None:
+            s.execute(_insert_ignore(s, model).values(**key, **{c: 0 for c in counts}, sketch={}))
+            continue
+        row_id, seen, sketch = row
+        values: Dict[str, Any] = {c: func.coalesce(getattr(model, c), 0) + n for c, n in counts.items()}
+        if durations:
+            values["sketch"] = DDSketch.from_dict(sketch).extend(durations).to_dict()
+        written = s.execute(
+            update(model).where(pk == row_id, version.is_not_distinct_from(seen))
+            .values(**values).execution_options(synchronize_session=False)
+        ).rowcount
+        if written:
+            return
+
+
+def _insert_ignore(s, model):
+    """INSERT that skips rows conflicting with a unique key, where the dialect has it."""
+    dialect = s.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing()
+
+
+def _step_latency_rows(merged: Dict[tuple, Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """`slowest_steps()` rows from per-(recipe, step, tool) totals and sketches."""
+    rows = [
+        {
+            "recipe_id": recipe_id, "step_id": step_id, "tool": tool,
+            "steps": m["steps"], "failures": m["failures"],
+            "avg_ms": m["sum"] / m["steps"] if m["steps"] else 0.0,
+            "p50_ms": m["sketch"].quantile(0.50),
+            "p95_ms": m["sketch"].quantile(0.95),
+            "p99_ms": m["sketch"].quantile(0.99),
+        }
+        for (recipe_id, step_id, tool), m in merged.items()
+    ]
+    rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _promoted_meta(meta: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """Values of PROMOTED_META_KEYS in `meta`, as stored in their columns."""
+    meta = meta or {}
+    return {k: None if meta.get(k) in (None, "") else str(meta[k])[:128] for k in PROMOTED_META_KEYS}
+
+
+def _meta_filter(meta: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Validate a `meta` query filter; only promoted (indexed) keys are allowed."""
+    unknown = sorted(set(meta or {}) - set(PROMOTED_META_KEYS))
+    if unknown:
+        raise ValueError(
+            f"Cannot filter on meta key(s) {', '.join(unknown)}; "
+            f"promoted keys are {', '.join(PROMOTED_META_KEYS)}"
+        )
+    where = {k: v for k, v in _promoted_meta(meta).items() if k in (meta or {})}
+    empty = sorted(k for k, v in where.items() if v is None)
+    if empty:
+        # Empty values are stored as NULL, so they can never match a run.
+        raise ValueError(f"Empty value for meta filter key(s) {', '.join(empty)}; omit the key to match every run")
+    return where
+
+
+def _with_flush_error(error: Optional[str], e: Exception) -> str:
+    flush_error = f"writing buffered events failed: {type(e).__name__}: {e}"
+    return f"{error}; {flush_error}" if error else flush_error
+
+
+def _meta_clauses(meta: Optional[Dict[str, Any]]) -> List[Any]:
+    return [getattr(WorkflowRun, k) == v for k, v in _meta_filter(meta).items()]
+
+
+def _settled(changes: List[RunChange], seq: int) -> List[RunChange]:
+    """`changes` (ordered, all after `seq`) up to the first hole that may still fill."""
+    now = datetime.now(UTC)
+    prev = seq
+    for i, c in enumerate(changes):
+        if c.seq != prev + 1 and c.created_at is not None and now - _utc(c.created_at) < FEED_SETTLE:
+            return changes[:i]
+        prev = c.seq
+    return changes
+
+
+def _page_after(items: List[Dict[str, Any]], after_id: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    if after_id is not None:
+        items = [x for x in items if (x.get("id") or 0) > after_id]
+    return items[:limit]
+
+
+def _first_step_id(events: Iterable[Base]) -> Optional[int]:
+    return min((e.id for e in events if isinstance(e, StepEvent)), default=None)
+
+
+def _is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_REF_KEY in value and len(value) <= 2
+
+
+def _floor_hour(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _utc(dt: datetime) -> datetime:
+    """Aware UTC datetime; SQLite hands DateTime(timezone=True) values back naive."""
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt.astimezone(UTC)
+
 
-def _quantile(xs: List[float], q: float) -> float:
-    if not xs:
-        return 0.0
-    xs = sorted(xs)
-    if q <= 0:
-        return xs[0]
-    if q >= 1:
-        return xs[-1]
-    idx = (len(xs) - 1) * q
-    lo, hi = int(idx), min(int(idx) + 1, len(xs) - 1)
-    frac = idx - lo
-    return xs[lo] * (1 - frac) + xs[hi] * frac
+def _ceil_hour(dt: datetime) -> datetime:
+    floor = _floor_hour(dt)
+    return floor if floor == dt else floor + timedelta(hours=1)
@@ -0,0 +1,377 @@
+# core/runs_store_async.py
+"""
+asyncio flavour of RunStore for executors that run recipe steps as
+coroutines.  Same tables, same dict shapes, same arguments -- every method is
+awaited instead of blocking the event loop:
+
+    store = AsyncRunStore()
+    async with store.workflow_run(workflow_id="wf", name="Reboot", agent_id=1, recipe_id=2) as rec:
+        await rec.step("act", "rebooting codec")
+    runs = await store.latest_runs(limit=10)
+
+Runs on SQLAlchemy's async engine: ``aiosqlite`` for SQLite files,
+``asyncpg`` for Postgres (``pip install aiosqlite`` / ``asyncpg``).  Schema
+setup -- tables, migrations, the search index, rollup backfill -- is done
+once by a regular ``RunStore`` on the same database, and the query code is
+shared with it (run on the async connection through ``run_sync``), so the
+two stores always return the same results.
+
+SQLite allows one writer at a time; writes from concurrent tasks queue on an
+``asyncio.Lock`` instead of on SQLite's busy timeout, which would hold an
+aiosqlite worker thread per waiting task.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import copy
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .db.sqlite_profile import apply_sqlite_profile
+from .runs_store import (
+    DURABILITY_MODES, UTC, Base, RunChange, RunStore, WorkflowRun, _first_step_id, _promoted_meta,
+    _with_flush_error,
+)
+
+# Async DBAPI driver per database; sync URLs are switched to these.
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+class AsyncRunStore:
+    """
+    Awaitable run log with RunStore's API.
+      - Use `async with store.workflow_run(...) as rec:` to wrap an execution
+      - Await `rec.step(...)` and `rec.artifact(...)` inside the context
+      - `durability`, `blob_threshold`, `archive_dir` and `sqlite_profile`
+        behave as in RunStore
+      - `url` may be a sync URL (sqlite:///..., postgresql://...) or an
+        async one (sqlite+aiosqlite:///..., postgresql+asyncpg://...)
+    """
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        *,
+        url: Optional[str] = None,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        durability: str = "sync",
+        flush_size: int = 100,
+        flush_interval_s: float = 1.0,
+        blob_threshold: Optional[int] = 4096,
+        archive_dir: Optional[Path] = None,
+        sqlite_profile: Optional[str] = None,
+    ):
+        # The sync store creates/migrates the schema and supplies the query
+        # code; its own engine is only used for that setup.
+        self._sync = RunStore(
+            db_path, url=_sync_url(url) if url else None, pool_size=pool_size,
+            max_overflow=max_overflow, durability=durability, flush_size=flush_size,
+            flush_interval_s=flush_interval_s, blob_threshold=blob_threshold,
+            archive_dir=archive_dir, sqlite_profile=sqlite_profile,
+        )
+        self._sync.close()
+        self.url = _async_url(self._sync.url)
+        engine_kwargs: Dict[str, Any] = {"pool_size": pool_size, "max_overflow": max_overflow}
+        if self.url.startswith("sqlite"):
+            # aiosqlite defaults to NullPool: a new connection and worker thread per call.
+            engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+        else:
+            engine_kwargs["pool_pre_ping"] = True
+        try:
+            self.engine = create_async_engine(self.url, **engine_kwargs)
+        except ModuleNotFoundError as e:
+            raise ModuleNotFoundError(
+                f"AsyncRunStore needs the {make_url(self.url).get_driver_name()} driver "
+                f"for {self.url.split(':', 1)[0]} URLs: {e}"
+            ) from e
+        self.sqlite_profile = apply_sqlite_profile(self.engine.sync_engine, self._sync.sqlite_profile)
+        self.Session = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.single_writer = self.engine.dialect.name == "sqlite"
+        self._write_lock = asyncio.Lock()
+        self.durability = durability
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+
+    async def close(self) -> None:
+        """Release pooled connections; the store reconnects if used again."""
+        await self.engine.dispose()
+
+    async def _run(self, fn: Callable[[Any], Any], *, write: bool = False) -> Any:
+        """Run `fn(session)` (sync ORM code) on an async connection."""
+        lock = self._write_lock if write and self.single_writer else contextlib.nullcontext()
+        async with lock:
+            async with self.Session() as s:
+                return await s.run_sync(fn)
+
+    def _bound(self, session) -> RunStore:
+        """The sync store with every `self.Session()` resolving to `session`."""
+        store = copy.copy(self._sync)
+        store.Session = lambda: contextlib.nullcontext(session)
+        return store
+
+    async def _call(self, method: str, *args: Any, write: bool = False, **kwargs: Any) -> Any:
+        return await self._run(lambda s: getattr(self._bound(s), method)(*args, **kwargs), write=write)
+
+    @contextlib.asynccontextmanager
+    async def workflow_run(
+        self,
+        *,
+        workflow_id: str,
+        name: str,
+        agent_id: Optional[int],
+        recipe_id: Optional[int],
+        trigger: str = "manual",
+        meta: Optional[Dict[str, Any]] = None,
+        durability: Optional[str] = None,
+        parent_id: Optional[int] = None,
+    ):
+        durability = durability or self.durability
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability!r}")
+        start = time.perf_counter()
+
+        def _open(s) -> int:
+            run = WorkflowRun(
+                workflow_id=workflow_id, name=name, agent_id=agent_id, recipe_id=recipe_id,
+                trigger=trigger, status="running", meta=meta or {}, parent_id=parent_id,
+                **_promoted_meta(meta),
+            )
+            s.add(run); s.flush()
+            s.add(RunChange(run_id=run.id))
+            RunStore._count_child(s, parent_id)
+            s.commit()
+            return run.id
+
+        run_id = await self._run(_open, write=True)
+        rec = AsyncRecorder(
+            self, run_id, buffered=durability != "sync",
+            flush_size=self.flush_size if durability == "batch" else None,
+            flush_interval_s=self.flush_interval_s if durability == "batch" else None,
+        )
+
+        status, error = "failed", None
+        try:
+            yield rec
+            status, error = rec.status, rec.error
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            dur_ms = (time.perf_counter() - start) * 1000.0
+            events, rec._pending = rec._pending, []
+
+            def _finish(s) -> None:
+                final, final_error, written = status, error, events
+                # Pending buffered events land in the same transaction as the final status.
+                try:
+                    self._bound(s).write_events(events, session=s)
+                    s.flush()
+                except Exception as e:
+                    s.rollback()
+                    final, final_error, written = "failed", _with_flush_error(error, e), []
+                r = s.get(WorkflowRun, run_id)
+                if r:
+                    r.status = final
+                    r.error = final_error
+                    r.finished_at = datetime.now(UTC)
+                    r.duration_ms = dur_ms
+                    RunStore._add_to_rollups(s, r)
+                    s.flush()
+                    s.add(RunChange(run_id=run_id, first_step_id=_first_step_id(written)))
+                    s.commit()
+
+            await self._run(_finish, write=True)
+
+    # ---- Writes ---------------------------------------------------------------
+    async def record_run(self, **kwargs: Any) -> int:
+        """See RunStore.record_run; one transaction per execution."""
+        return await self._call("record_run", write=True, **kwargs)
+
+    async def log_step(self, run_id: int, **kwargs: Any) -> int:
+        return await self._call("log_step", run_id, write=True, **kwargs)
+
+    async def log_artifact(self, run_id: int, **kwargs: Any) -> int:
+        return await self._call("log_artifact", run_id, write=True, **kwargs)
+
+    async def write_events(self, events: List[Base]) -> None:
+        if events:
+            await self._call("write_events", events, write=True)
+
+    # ---- Queries ----------------------------------------------------------------
+    async def latest_runs(self, **kwargs: Any) -> List[Dict[str, Any]]:
+        return await self._call("latest_runs", **kwargs)
+
+    async def changes_since(self, seq: Optional[int] = None, *, limit: int = 1000) -> Dict[str, Any]:
+        return await self._call("changes_since", seq, limit=limit)
+
+    async def get_run(self, run_id: int) -> Dict[str, Any]:
+        return await self._call("get_run", run_id)
+
+    async def run_steps(self, run_id: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        return await self._call("run_steps", run_id, **kwargs)
+
+    async def run_artifacts(self, run_id: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        return await self._call("run_artifacts", run_id, **kwargs)
+
+    async def run_details(self, run_id: int, **kwargs: Any) -> Dict[str, Any]:
+        return await self._call("run_details", run_id, **kwargs)
+
+    async def load_blobs(self, digests: Iterable[str]) -> Dict[str, Any]:
+        return await self._call("load_blobs", list(digests))
+
+    async def stats(
+        self, *, since: Optional[datetime] = None, meta: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        return await self._call("stats", since=since, meta=meta)
+
+    async def trend(self, **kwargs: Any) -> List[Dict[str, Any]]:
+        return await self._call("trend", **kwargs)
+
+    async def search(self, query: str, **kwargs: Any) -> List[Dict[str, Any]]:
+        return await self._call("search", query, **kwargs)
+
+    async def slowest_steps(self, **kwargs: Any) -> List[Dict[str, Any]]:
+        return await self._call("slowest_steps", **kwargs)
+
+    async def recipe_metrics(self, recipe_id: int, *, limit: int = 200) -> Dict[str, Any]:
+        return await self._call("recipe_metrics", recipe_id, limit=limit)
+
+    async def recipe_metrics_bulk(
+        self, recipe_ids: Iterable[int], *, limit: Optional[int] = 200
+    ) -> Dict[int, Dict[str, Any]]:
+        return await self._call("recipe_metrics_bulk", list(recipe_ids), limit=limit)
+
+
+class AsyncRecorder:
+    """Use inside the AsyncRunStore.workflow_run() context manager."""
+    def __init__(
+        self,
+        store: AsyncRunStore,
+        run_id: int,
+        *,
+        buffered: bool = False,
+        flush_size: Optional[int] = None,
+        flush_interval_s: Optional[float] = None,
+    ):
+        self.store = store
+        self.run_id = run_id
+        self.buffered = buffered
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+        self._pending: List[Base] = []
+        self._last_flush = time.monotonic()
+        self.status, self.error = "success", None
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """See Recorder.finish."""
+        self.status, self.error = status, error
+
+    async def step(
+        self,
+        phase: str,
+        message: str,
+        *,
+        level: str = "info",
+        status: str = "ok",
+        payload: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+    ):
+        kwargs = dict(
+            phase=phase, message=message, level=level, status=status, payload=payload, result=result,
+            step_id=step_id, tool=tool, started_at=started_at, finished_at=finished_at,
+        )
+        if not self.buffered:
+            await self.store.log_step(self.run_id, **kwargs)
+        else:
+            await self._enqueue(RunStore._new_step(self.run_id, **kwargs))
+
+    @contextlib.asynccontextmanager
+    async def span(
+        self,
+        phase: str,
+        message: str,
+        *,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+    ):
+        """See Recorder.span."""
+        out: Dict[str, Any] = {"message": message, "status": "ok", "result": None}
+        level = "info"
+        started = datetime.now(UTC)
+        t0 = time.perf_counter()
+        try:
+            yield out
+        except Exception as e:
+            level, out["status"] = "error", "error"
+            out["result"] = out["result"] or {"error": f"{type(e).__name__}: {e}"}
+            raise
+        finally:
+            await self.step(
+                phase, out["message"], level=level, status=out["status"], payload=payload,
+                result=out["result"], step_id=step_id, tool=tool, started_at=started,
+                finished_at=started + timedelta(seconds=time.perf_counter() - t0),
+            )
+
+    async def artifact(
+        self,
+        kind: str,
+        title: str,
+        *,
+        external_id: Optional[str] = None,
+        url: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ):
+        kwargs = dict(kind=kind, title=title, external_id=external_id, url=url, data=data)
+        if not self.buffered:
+            await self.store.log_artifact(self.run_id, **kwargs)
+        else:
+            await self._enqueue(RunStore._new_artifact(self.run_id, **kwargs))
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> None:
+        """Write all queued events in one transaction."""
+        events, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        await self.store.write_events(events)
+
+    async def _enqueue(self, ev: Base) -> None:
+        self._pending.append(ev)
+        if self.flush_size is not None and len(self._pending) >= self.flush_size:
+            await self.flush()
+        elif (
+            self.flush_interval_s is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval_s
+        ):
+            await self.flush()
+
+
+def _async_url(url: str) -> str:
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver for {backend!r} databases (expected one of {', '.join(ASYNC_DRIVERS)})")
+    if u.get_driver_name() == ASYNC_DRIVERS[backend]:
+        return url
+    return u.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def _sync_url(url: str) -> str:
+    u = make_url(url)
+    if u.get_driver_name() != ASYNC_DRIVERS.get(u.get_backend_name()):
+        return url
+    return u.set(drivername=u.get_backend_name()).render_as_string(hide_password=False)
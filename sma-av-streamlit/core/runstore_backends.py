@@ -0,0 +1,521 @@
+"""
+core/runstore_backends.py
+-------------------------
+
+Non-SQL run log backends that ``make_runstore`` can select instead of the
+SQLAlchemy ``RunStore``:
+
+  - ``MemoryRunStore``: process-local dictionaries.  Nothing survives a
+    restart; meant for tests, benchmarks and throwaway demos.
+  - ``SegmentLogRunStore``: an append-only log of JSON events split into
+    fixed-size segment files.  The log is replayed into memory on open, so
+    writes are a single sequential append and reads never touch disk.
+
+Both return exactly the dict shapes of ``RunStore`` (``_run_to_dict`` and
+friends) so the Dashboard cannot tell the backends apart.  Every mutation is
+expressed as an event dict applied by ``_apply``; the log backend only adds
+"write the event first".
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .runs_store import (
+    DURABILITY_MODES, _FAILED_STEP, Recorder, _floor_hour, _meta_filter, _promoted_meta, _step_latency_rows,
+)
+from .utils.sketch import DDSketch
+
+UTC = timezone.utc
+
+
+class MemoryRunStore:
+    """In-memory RunStore backend.  Thread-safe; `durability` is accepted and ignored."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._runs: Dict[int, Dict[str, Any]] = {}
+        self._started: Dict[int, datetime] = {}
+        self._steps: Dict[int, List[Dict[str, Any]]] = {}
+        self._artifacts: Dict[int, List[Dict[str, Any]]] = {}
+        self._ids = {"run": 0, "step": 0, "artifact": 0}
+        self._changes: List[tuple] = []  # (seq, run_id, step_id or None)
+
+    # ---- Writes -------------------------------------------------------------
+    @contextlib.contextmanager
+    def workflow_run(
+        self,
+        *,
+        workflow_id: str,
+        name: str,
+        agent_id: Optional[int],
+        recipe_id: Optional[int],
+        trigger: str = "manual",
+        meta: Optional[Dict[str, Any]] = None,
+        durability: Optional[str] = None,
+        parent_id: Optional[int] = None,
+    ) -> Iterator[Recorder]:
+        if durability is not None and durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability!r}")
+        start = time.perf_counter()
+        run_id = self._record("run", {
+            "workflow_id": workflow_id, "name": name, "agent_id": agent_id,
+            "recipe_id": recipe_id, "trigger": trigger, "status": "running",
+            "started_at": datetime.now(UTC).isoformat(), "meta": meta or {},
+            "parent_id": parent_id,
+        })
+        rec = Recorder(self, run_id)
+        status, error = "failed", None
+        try:
+            yield rec
+            status, error = rec.status, rec.error
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._apply({
+                "op": "finish", "id": run_id, "status": status, "error": error,
+                "finished_at": datetime.now(UTC).isoformat(),
+                "duration_ms": (time.perf_counter() - start) * 1000.0,
+            })
+
+    def record_run(
+        self,
+        *,
+        workflow_id: str,
+        name: str,
+        agent_id: Optional[int],
+        recipe_id: Optional[int],
+        trigger: str = "manual",
+        meta: Optional[Dict[str, Any]] = None,
+        status: str = "success",
+        error: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+        steps: Iterable[Dict[str, Any]] = (),
+        artifacts: Iterable[Dict[str, Any]] = (),
+        parent_id: Optional[int] = None,
+    ) -> int:
+        finished_at = _aware(finished_at) or datetime.now(UTC)
+        started_at = _aware(started_at) or finished_at
+        with self._lock:
+            run_id = self._record("run", {
+                "workflow_id": workflow_id, "name": name, "agent_id": agent_id,
+                "recipe_id": recipe_id, "trigger": trigger, "status": "running",
+                "started_at": started_at.isoformat(), "meta": meta or {},
+                "parent_id": parent_id,
+            })
+            for kw in steps:
+                self.log_step(run_id, **kw)
+            for kw in artifacts:
+                self.log_artifact(run_id, **kw)
+            self._apply({
+                "op": "finish", "id": run_id, "status": status, "error": error,
+                "finished_at": finished_at.isoformat(),
+                "duration_ms": (finished_at - started_at).total_seconds() * 1000.0,
+            })
+        return run_id
+
+    def log_step(
+        self,
+        run_id: int,
+        *,
+        phase: str,
+        message: str,
+        level: str = "info",
+        status: str = "ok",
+        payload: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        step_id: Optional[str] = None,
+        tool: Optional[str] = None,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+    ) -> int:
+        started_at, finished_at = _aware(started_at), _aware(finished_at)
+        duration_ms = None
+        if started_at is not None and finished_at is not None:
+            duration_ms = (finished_at - started_at).total_seconds() * 1000.0
+        return self._record("step", {
+            "run_id": run_id, "ts": datetime.now(UTC).isoformat(), "phase": phase,
+            "level": level, "status": status, "message": message,
+            "payload": payload, "result": result, "step_id": step_id, "tool": tool,
+            "started_at": started_at.isoformat() if started_at else None,
+            "finished_at": finished_at.isoformat() if finished_at else None,
+            "duration_ms": duration_ms,
+        })
+
+    def log_artifact(
+        self,
+        run_id: int,
+        *,
+        kind: str,
+        title: str,
+        external_id: Optional[str] = None,
+        url: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        return self._record("artifact", {
+            "run_id": run_id, "kind": kind, "external_id": external_id,
+            "url": url, "title": title, "data": data or {},
+        })
+
+    def _record(self, op: str, fields: Dict[str, Any]) -> int:
+        """Assign the next id for `op` and apply the event atomically."""
+        with self._lock:
+            new_id = self._ids[op] + 1
+            self._apply({"op": op, "id": new_id, **fields})
+            return new_id
+
+    def _apply(self, ev: Dict[str, Any]) -> None:
+        with self._lock:
+            op, fields = ev["op"], {k: v for k, v in ev.items() if k != "op"}
+            parent = None
+            if op == "run":
+                self._runs[ev["id"]] = {
+                    "parent_id": None, **fields, "finished_at": None, "duration_ms": None, "error": None,
+                    "children_total": 0, "children_success": 0, "children_failed": 0,
+                    "children_duration_ms": 0.0,
+                }
+                self._started[ev["id"]] = _parse_dt(ev["started_at"])
+                self._steps[ev["id"]], self._artifacts[ev["id"]] = [], []
+                parent = self._runs.get(fields.get("parent_id"))
+                if parent is not None:
+                    parent["children_total"] += 1
+            elif op == "finish":
+                run = self._runs.get(ev["id"])
+                if run is not None:
+                    run.update(fields)
+                    parent = self._runs.get(run["parent_id"])
+                    if parent is not None:
+                        parent["children_success" if run["status"] == "success" else "children_failed"] += 1
+                        parent["children_duration_ms"] += run["duration_ms"] or 0.0
+            elif op == "step":
+                self._steps.setdefault(ev["run_id"], []).append(fields)
+            elif op == "artifact":
+                self._artifacts.setdefault(ev["run_id"], []).append(fields)
+            else:
+                raise ValueError(f"Unknown run log event: {op!r}")
+            if op in self._ids:
+                self._ids[op] = max(self._ids[op], ev["id"])
+            run_id = ev["run_id"] if op in ("step", "artifact") else ev["id"]
+            self._changes.append((len(self._changes) + 1, run_id, ev["id"] if op == "step" else None))
+            if parent is not None:
+                self._changes.append((len(self._changes) + 1, parent["id"], None))
+
+    # ---- Queries ------------------------------------------------------------
+    def latest_runs(
+        self,
+        *,
+        limit: int = 50,
+        status: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        parent_id: Optional[int] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        since = _aware(since)
+        where = _meta_filter(meta)
+        out: List[Dict[str, Any]] = []
+        with self._lock:
+            for run_id in reversed(self._runs):
+                if cursor is not None and run_id >= cursor:
+                    continue
+                r = self._runs[run_id]
+                if r["parent_id"] != parent_id:
+                    continue
+                if status and r["status"] not in status:
+                    continue
+                if since and self._started[run_id] < since:
+                    continue
+                if where and not _meta_matches(r, where):
+                    continue
+                out.append(_run_dict(r))
+                if len(out) >= limit:
+                    break
+        return out
+
+    def changes_since(self, seq: Optional[int] = None, *, limit: int = 1000) -> Dict[str, Any]:
+        with self._lock:
+            if seq is None:
+                return {"seq": len(self._changes), "runs": [], "steps": [], "more": False}
+            changes = self._changes[seq:seq + limit]
+            if not changes:
+                return {"seq": seq, "runs": [], "steps": [], "more": False}
+            run_ids = sorted({c[1] for c in changes}, reverse=True)
+            step_ids = {c[2] for c in changes if c[2] is not None}
+            steps = [
+                dict(x) for run_id in sorted(run_ids)
+                for x in self._steps.get(run_id, []) if x["id"] in step_ids
+            ]
+            return {
+                "seq": changes[-1][0],
+                "runs": [_run_dict(self._runs[r]) for r in run_ids if r in self._runs],
+                "steps": sorted(steps, key=lambda x: x["id"]),
+                "more": len(changes) == limit,
+            }
+
+    def get_run(self, run_id: int) -> Dict[str, Any]:
+        with self._lock:
+            r = self._runs.get(run_id)
+            return _run_dict(r) if r else {}
+
+    def run_steps(
+        self, run_id: int, *, after_id: Optional[int] = None, limit: int = 50, **_: Any
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            return _page(self._steps.get(run_id, []), after_id, limit)
+
+    def run_artifacts(
+        self, run_id: int, *, after_id: Optional[int] = None, limit: int = 50, **_: Any
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            return _page(self._artifacts.get(run_id, []), after_id, limit)
+
+    def run_details(self, run_id: int, **_: Any) -> Dict[str, Any]:
+        with self._lock:
+            r = self._runs.get(run_id)
+            if not r:
+                return {}
+            d = _run_dict(r)
+            d["steps"] = [dict(x) for x in self._steps[run_id]]
+            d["artifacts"] = [dict(x) for x in self._artifacts[run_id]]
+            return d
+
+    def stats(
+        self, *, since: Optional[datetime] = None, meta: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        runs = self._window(since, meta)
+        n = len(runs)
+        succ = sum(1 for r in runs if r["status"] == "success")
+        sk = DDSketch().extend(r["duration_ms"] for r in runs if r["duration_ms"])
+        last_err = next((r["error"] for r in reversed(runs) if r["error"]), "")
+        return {
+            "runs": n,
+            "success_rate": (succ / n) * 100.0 if n else 0.0,
+            "p50_ms": sk.quantile(0.50),
+            "p95_ms": sk.quantile(0.95),
+            "p99_ms": sk.quantile(0.99),
+            "last_error": last_err or "",
+        }
+
+    def trend(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        status: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        since = _floor_hour(_aware(since)) if since else None
+        where = _meta_filter(meta)
+        counts: Dict[datetime, int] = {}
+        with self._lock:
+            for run_id, r in self._runs.items():
+                if r["parent_id"] is not None or (status and r["status"] not in status):
+                    continue
+                if where and not _meta_matches(r, where):
+                    continue
+                bucket = _floor_hour(self._started[run_id])
+                if since and bucket < since:
+                    continue
+                counts[bucket] = counts.get(bucket, 0) + 1
+        return [{"bucket": b.isoformat(), "runs": counts[b]} for b in sorted(counts)]
+
+    def search(
+        self, query: str, *, since: Optional[datetime] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Case-insensitive substring match of every word; no ranking (rank 0)."""
+        words = [w.strip('"*').lower() for w in (query or "").split() if w.strip('"*')]
+        if not words:
+            return []
+        since = _aware(since)
+        hits: List[Dict[str, Any]] = []
+        with self._lock:
+            for run_id in reversed(self._runs):
+                r = self._runs[run_id]
+                if since and self._started[run_id] < since:
+                    continue
+                sources = [("run", run_id, r["error"] or "")]
+                sources += [("step", x["id"], x["message"] or "") for x in self._steps[run_id]]
+                sources += [
+                    ("artifact", x["id"], f"{x['title'] or ''} {x['external_id'] or ''}")
+                    for x in self._artifacts[run_id]
+                ]
+                for kind, item_id, body in sources:
+                    if all(w in body.lower() for w in words):
+                        hits.append({
+                            "run_id": run_id, "kind": kind, "item_id": item_id,
+                            "snippet": body[:200], "rank": 0.0, "name": r["name"],
+                            "status": r["status"], "started_at": r["started_at"],
+                        })
+                if len(hits) >= limit:
+                    break
+        return hits[:limit]
+
+    def slowest_steps(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        recipe_id: Optional[int] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        since = _floor_hour(_aware(since)) if since else None
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        with self._lock:
+            for run_id, steps in self._steps.items():
+                rid = self._runs[run_id]["recipe_id"] if run_id in self._runs else None
+                if recipe_id is not None and rid != recipe_id:
+                    continue
+                for x in steps:
+                    if x.get("duration_ms") is None or (since and _parse_dt(x["started_at"]) < since):
+                        continue
+                    m = merged.setdefault((rid, x["step_id"] or x["phase"], x["tool"]), {
+                        "steps": 0, "failures": 0, "sum": 0.0, "sketch": DDSketch(),
+                    })
+                    m["steps"] += 1
+                    m["failures"] += x["status"] in _FAILED_STEP
+                    m["sum"] += x["duration_ms"]
+                    m["sketch"].add(x["duration_ms"])
+        return _step_latency_rows(merged, limit)
+
+    def recipe_metrics(self, recipe_id: int, *, limit: int = 200) -> Dict[str, Any]:
+        with self._lock:
+            rows = [r for r in reversed(self._runs.values()) if r["recipe_id"] == recipe_id][:limit]
+        total = len(rows)
+        success = sum(1 for r in rows if r["status"] == "success")
+        return {
+            "runs": total,
+            "success_rate": (success / total) * 100.0 if total else 0.0,
+            "last_status": rows[0]["status"] if rows else "unknown",
+            "avg_ms": sum(r["duration_ms"] or 0.0 for r in rows) / total if total else 0.0,
+        }
+
+    def recipe_metrics_bulk(
+        self, recipe_ids: Iterable[int], *, limit: Optional[int] = 200
+    ) -> Dict[int, Dict[str, Any]]:
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be at least 1 or None, got {limit!r}")
+        return {
+            rid: self.recipe_metrics(rid, limit=limit if limit is not None else len(self._runs))
+            for rid in sorted({int(i) for i in recipe_ids})
+        }
+
+    def _window(self, since: Optional[datetime], meta: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        since = _aware(since)
+        where = _meta_filter(meta)
+        with self._lock:
+            return [
+                dict(r) for run_id, r in self._runs.items()
+                if r["parent_id"] is None and (not since or self._started[run_id] >= since)
+                and (not where or _meta_matches(r, where))
+            ]
+
+
+class SegmentLogRunStore(MemoryRunStore):
+    """
+    Append-only segment log backend.  Each event is one JSON line appended to
+    the newest `segment-NNNNNN.jsonl` under `path`; a new segment starts once
+    the current one reaches `segment_bytes`.  With `fsync=True` every event is
+    forced to disk before the call returns (otherwise the OS decides).
+    An event only counts once its newline is on disk: on open, a torn last
+    line left by a crash is cut off so new events start on a fresh line.
+    """
+
+    def __init__(self, path: Path, *, segment_bytes: int = 16 * 1024 * 1024, fsync: bool = False):
+        super().__init__()
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        segments = sorted(self.path.glob("segment-*.jsonl"))
+        for seg in segments:
+            complete = 0
+            with open(seg, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final write from a crash
+                    complete += len(line)
+                    if line.strip():
+                        try:
+                            ev = json.loads(line)
+                        except ValueError:
+                            continue  # garbled line; later events are still whole
+                        MemoryRunStore._apply(self, ev)
+            if complete < seg.stat().st_size:
+                with open(seg, "r+b") as f:
+                    f.truncate(complete)
+        self._segment_no = int(segments[-1].stem.split("-")[1]) if segments else 1
+        self._fh = open(self._segment_path(self._segment_no), "a", encoding="utf-8")
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+
+    def _apply(self, ev: Dict[str, Any]) -> None:
+        with self._lock:
+            self._fh.write(json.dumps(ev, ensure_ascii=False, default=str) + "\n")
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+            if self._fh.tell() >= self.segment_bytes:
+                self._fh.close()
+                self._segment_no += 1
+                self._fh = open(self._segment_path(self._segment_no), "a", encoding="utf-8")
+            super()._apply(ev)
+
+    def _segment_path(self, n: int) -> Path:
+        return self.path / f"segment-{n:06d}.jsonl"
+
+
+# ---- Helpers ----------------------------------------------------------------
+def _run_dict(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": r["id"], "workflow_id": r["workflow_id"], "name": r["name"],
+        "agent_id": r["agent_id"], "recipe_id": r["recipe_id"], "trigger": r["trigger"],
+        "status": r["status"], "started_at": r["started_at"], "finished_at": r["finished_at"],
+        "duration_ms": r["duration_ms"], "error": r["error"], "meta": r["meta"],
+        "parent_id": r["parent_id"],
+        "children": None if not r["children_total"] else {
+            "total": r["children_total"],
+            "success": r["children_success"],
+            "failed": r["children_failed"],
+            "running": r["children_total"] - r["children_success"] - r["children_failed"],
+            "duration_ms": r["children_duration_ms"],
+        },
+    }
+
+
+def _meta_matches(r: Dict[str, Any], where: Dict[str, str]) -> bool:
+    promoted = _promoted_meta(r["meta"])
+    return all(promoted[k] == v for k, v in where.items())
+
+
+def _page(items: List[Dict[str, Any]], after_id: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    start = 0
+    if after_id is not None:
+        # ids within a run are increasing, so bisect on them
+        lo, hi = 0, len(items)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if items[mid]["id"] <= after_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+    return [dict(x) for x in items[start:start + limit]]
+
+
+def _parse_dt(value: str) -> datetime:
+    return _aware(datetime.fromisoformat(value))
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=UTC)
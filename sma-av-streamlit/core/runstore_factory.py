@@ -3,40 +3,192 @@ core/runstore_factory.py
 ----------------------------------
 
 This module exposes a factory function for constructing a run log store.
-In a small, self‑contained deployment we simply return an instance of
-``RunStore`` backed by the SQLite database located at the repository root.
-Future versions could detect configuration options or environment
-variables to select between different backends (e.g. SQL vs. Redis vs.
-external API).  Centralising the factory logic here decouples the
-Dashboard from a specific storage implementation and makes it easier to
-introduce alternative stores without touching the UI code.
+The backend is chosen by argument or environment so the Dashboard, the
+workflow service and the tests never depend on a specific implementation:
+
+  - ``sqlite`` (default): ``RunStore`` on ``avops.db`` in the repository root.
+  - ``postgres``: ``RunStore`` on ``AVOPS_RUNSTORE_URL`` with a pooled engine.
+  - ``memory``: one process-wide ``MemoryRunStore`` (tests, benchmarks, demos).
+  - ``log``: ``SegmentLogRunStore`` under ``AVOPS_RUNSTORE_LOG_DIR``
+    (default ``run_log/`` in the repository root).
+
+Environment variables:
+    AVOPS_RUNSTORE_BACKEND   sqlite | postgres | memory | log
+    AVOPS_RUNSTORE_URL       SQLAlchemy URL for the postgres backend, or a
+                             sqlite:/// URL (e.g. the app's DATABASE_URL)
+                             to keep runs in that file instead of avops.db
+    AVOPS_RUNSTORE_LOG_DIR   segment directory for the log backend
+
+Every backend satisfies ``RunStoreBackend``, the subset of the store API the
+pages and the workflow service actually call.
+
+Stores are cached per process, keyed by backend and database path/URL, so a
+Dashboard rerun or a ``run_now()`` reuses the same engine and connection pool
+and schema setup (``create_all``, migrations, rollup backfill) runs once.
+``close_runstores()`` disposes all of them; tests call it to start clean.
 """
 
 from __future__ import annotations
 
+import atexit
+import os
+import threading
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Protocol, Tuple, runtime_checkable
+
+from .runs_store import Recorder, RunStore
+from .runstore_backends import MemoryRunStore, SegmentLogRunStore
+
+BACKENDS = ("sqlite", "postgres", "memory", "log")
+
+_registry: Dict[Tuple[str, str], "RunStoreBackend"] = {}
+_registry_lock = threading.Lock()
+
+
+@runtime_checkable
+class RunStoreBackend(Protocol):
+    """Methods every run log backend provides, with RunStore's dict shapes."""
+
+    def workflow_run(
+        self,
+        *,
+        workflow_id: str,
+        name: str,
+        agent_id: Optional[int],
+        recipe_id: Optional[int],
+        trigger: str = "manual",
+        meta: Optional[Dict[str, Any]] = None,
+        durability: Optional[str] = None,
+        parent_id: Optional[int] = None,
+    ) -> ContextManager[Recorder]: ...
+
+    def record_run(self, *, workflow_id: str, name: str, agent_id: Optional[int], recipe_id: Optional[int], **kwargs: Any) -> int: ...
+
+    def log_step(self, run_id: int, *, phase: str, message: str, **kwargs: Any) -> Any: ...
+
+    def log_artifact(self, run_id: int, *, kind: str, title: str, **kwargs: Any) -> Any: ...
+
+    def latest_runs(
+        self,
+        *,
+        limit: int = 50,
+        status: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        cursor: Optional[int] = None,
+        parent_id: Optional[int] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]: ...
+
+    def changes_since(self, seq: Optional[int] = None, *, limit: int = 1000) -> Dict[str, Any]: ...
+
+    def get_run(self, run_id: int) -> Dict[str, Any]: ...
 
-from .runs_store import RunStore
+    def run_steps(self, run_id: int, *, after_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]: ...
 
+    def run_artifacts(self, run_id: int, *, after_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]: ...
 
-def make_runstore(db_path: Optional[Path] = None) -> RunStore:
-    """Instantiate and return a ``RunStore``.
+    def run_details(self, run_id: int) -> Dict[str, Any]: ...
+
+    def stats(self, *, since: Optional[datetime] = None, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]: ...
+
+    def trend(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        status: Optional[List[str]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]: ...
+
+    def search(self, query: str, *, since: Optional[datetime] = None, limit: int = 50) -> List[Dict[str, Any]]: ...
+
+    def slowest_steps(
+        self, *, since: Optional[datetime] = None, recipe_id: Optional[int] = None, limit: int = 10
+    ) -> List[Dict[str, Any]]: ...
+
+    def recipe_metrics(self, recipe_id: int, *, limit: int = 200) -> Dict[str, Any]: ...
+
+    def recipe_metrics_bulk(self, recipe_ids: Iterable[int], *, limit: Optional[int] = 200) -> Dict[int, Dict[str, Any]]: ...
+
+
+def make_runstore(
+    db_path: Optional[Path] = None,
+    *,
+    backend: Optional[str] = None,
+    url: Optional[str] = None,
+) -> RunStoreBackend:
+    """Instantiate and return a run log store.
 
     Parameters
     ----------
     db_path : Optional[Path], optional
-        An explicit path to the SQLite file.  If not provided, the default
-        ``avops.db`` in the repository root will be used.  This argument
-        exists primarily for testing or advanced deployments.
+        An explicit path to the SQLite file (or the segment directory for the
+        ``log`` backend).  If not provided, ``avops.db`` in the repository
+        root will be used.  This argument exists primarily for testing or
+        advanced deployments.
+    backend : Optional[str], optional
+        One of ``BACKENDS``; defaults to ``AVOPS_RUNSTORE_BACKEND`` or
+        ``sqlite``.
+    url : Optional[str], optional
+        SQLAlchemy URL for the ``postgres`` backend, or a ``sqlite:///`` URL
+        for the ``sqlite`` backend (ignored when ``db_path`` is given);
+        defaults to ``AVOPS_RUNSTORE_URL``.
 
     Returns
     -------
-    RunStore
-        A new run store bound to the specified or default database.
+    RunStoreBackend
+        The process-wide run store for the selected backend and target.
     """
-    if db_path is None:
-        # Base directory of the repo (sma-av-streamlit)
-        base_dir = Path(__file__).resolve().parents[1]
-        db_path = base_dir / "avops.db"
-    return RunStore(db_path=db_path)
\ No newline at end of file
+    backend = (backend or os.getenv("AVOPS_RUNSTORE_BACKEND") or "sqlite").lower()
+    # Base directory of the repo (sma-av-streamlit)
+    base_dir = Path(__file__).resolve().parents[1]
+    if backend == "sqlite":
+        url = url or os.getenv("AVOPS_RUNSTORE_URL")
+        if url and url.startswith("sqlite") and db_path is None:
+            target = url  # e.g. the app's DATABASE_URL, to keep one database
+        else:
+            target = str(Path(db_path or base_dir / "avops.db").resolve())
+    elif backend == "postgres":
+        target = url or os.getenv("AVOPS_RUNSTORE_URL") or ""
+        if not target:
+            raise ValueError("The postgres run store backend needs AVOPS_RUNSTORE_URL")
+    elif backend == "memory":
+        target = ""
+    elif backend == "log":
+        log_dir = db_path or os.getenv("AVOPS_RUNSTORE_LOG_DIR") or base_dir / "run_log"
+        target = str(Path(log_dir).resolve())
+    else:
+        raise ValueError(f"Unknown run store backend: {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+    key = (backend, target)
+    with _registry_lock:
+        store = _registry.get(key)
+        if store is None:
+            store = _registry[key] = _open(backend, target)
+        return store
+
+
+def close_runstores() -> None:
+    """Dispose every cached store (engines, pools, log files) and empty the registry."""
+    with _registry_lock:
+        stores = list(_registry.values())
+        _registry.clear()
+    for store in stores:
+        close = getattr(store, "close", None)
+        if close is not None:
+            close()
+
+
+atexit.register(close_runstores)
+
+
+def _open(backend: str, target: str) -> RunStoreBackend:
+    if backend == "sqlite":
+        if target.startswith("sqlite"):
+            return RunStore(url=target)
+        return RunStore(db_path=Path(target))
+    if backend == "postgres":
+        return RunStore(url=target)
+    if backend == "memory":
+        return MemoryRunStore()
+    return SegmentLogRunStore(Path(target))
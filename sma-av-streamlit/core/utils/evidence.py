@@ -1,9 +1,21 @@
-
 from __future__ import annotations
+from typing import Any, Dict, Iterable, List
 from sqlalchemy.orm import Session
 from ..db.models import Evidence
 
-def attach_json(db: Session, run_id: int, payload: dict):
+def attach_json(db: Session, run_id: int, payload: dict, *, commit: bool = True):
     ev = Evidence(run_id=run_id, payload=payload)
-    db.add(ev); db.commit()
+    db.add(ev)
+    if commit:
+        db.commit()
     return ev
+
+def attach_json_batch(
+    db: Session, run_id: int, payloads: Iterable[Dict[str, Any]], *, commit: bool = True
+) -> List[Evidence]:
+    """Add one Evidence row per payload; a single commit (or none, to join the caller's transaction)."""
+    evs = [Evidence(run_id=run_id, payload=p) for p in payloads]
+    db.add_all(evs)
+    if commit:
+        db.commit()
+    return evs
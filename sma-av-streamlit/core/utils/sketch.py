@@ -0,0 +1,105 @@
+"""
+core/utils/sketch.py
+--------------------
+
+A small, dependency-free DDSketch (Masson et al., VLDB 2019) used for
+run-duration percentiles.  Values are mapped to logarithmic bins so every
+quantile estimate is within ``relative_accuracy`` of the true value, the
+sketch size is bounded by the dynamic range of the data (not the number of
+values), and two sketches with the same accuracy merge by adding bin counts.
+Sketches serialise to plain JSON so they can live in a SQLAlchemy JSON column.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, Optional
+
+
+class DDSketch:
+    """Mergeable quantile sketch for non-negative values (e.g. durations in ms)."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    # ---- Updates -------------------------------------------------------------
+    def add(self, value: float, weight: int = 1) -> "DDSketch":
+        value = float(value)
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            idx = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[idx] = self.bins.get(idx, 0) + weight
+        self.count += weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def extend(self, values: Iterable[float]) -> "DDSketch":
+        for v in values:
+            self.add(v)
+        return self
+
+    def merge(self, other: "DDSketch") -> "DDSketch":
+        if not math.isclose(other.relative_accuracy, self.relative_accuracy):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for idx, n in other.bins.items():
+            self.bins[idx] = self.bins.get(idx, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    # ---- Queries -------------------------------------------------------------
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (0 <= q <= 1); 0.0 for an empty sketch."""
+        if self.count == 0:
+            return 0.0
+        if q <= 0:
+            return float(self.min)
+        if q >= 1:
+            return float(self.max)
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for idx in sorted(self.bins):
+            seen += self.bins[idx]
+            if seen > rank:
+                estimate = 2 * self.gamma ** idx / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return float(self.max)
+
+    # ---- Serialisation -------------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "alpha": self.relative_accuracy,
+            "zero": self.zero_count,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "bins": {str(k): v for k, v in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Optional[Dict[str, Any]]) -> "DDSketch":
+        if not d:
+            return cls()
+        sk = cls(relative_accuracy=float(d.get("alpha", 0.01)))
+        sk.zero_count = int(d.get("zero", 0))
+        sk.count = int(d.get("count", 0))
+        sk.min = d.get("min")
+        sk.max = d.get("max")
+        sk.bins = {int(k): int(v) for k, v in (d.get("bins") or {}).items()}
+        return sk
@@ -0,0 +1,137 @@
+"""
+core/workflow/cron.py
+---------------------
+
+Five-field cron expressions (``minute hour day-of-month month day-of-week``)
+evaluated in an IANA timezone.  Fields take ``*``, numbers, ``a-b`` ranges,
+``/step`` and comma lists; month and weekday names (``jan``, ``mon``) and the
+``@hourly``/``@daily``/``@weekly``/``@monthly``/``@yearly`` shortcuts are
+accepted.  Weekday 0 and 7 are Sunday.  As in Vixie cron, when both
+day-of-month and day-of-week are restricted a day matching either fires.
+
+Fire times are wall-clock times in the schedule's timezone:
+
+  - a time that does not exist (the skipped hour when DST starts) is not
+    fired that day;
+  - a time that exists twice (the repeated hour when DST ends) fires once,
+    at its first occurrence.
+
+Datetimes in and out are naive UTC, like the app database's columns.
+
+Usage:
+    sched = CronSchedule.parse("0 6 * * 1-5", tz="America/New_York")
+    sched.next_after(datetime.utcnow())
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import FrozenSet, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+_DAYS = {d: i for i, d in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))}
+_ALIASES = {
+    "@hourly": "0 * * * *", "@daily": "0 0 * * *", "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0", "@monthly": "0 0 1 * *", "@yearly": "0 0 1 1 *", "@annually": "0 0 1 1 *",
+}
+# (low, high, names) per field
+_FIELDS = ((0, 59, {}), (0, 23, {}), (1, 31, {}), (1, 12, _MONTHS), (0, 7, _DAYS))
+_MAX_YEARS = 5  # "0 0 30 2 *" never fires; stop looking after this long
+
+
+class CronError(ValueError):
+    """An expression or timezone that cannot be parsed."""
+
+
+def _value(text: str, lo: int, hi: int, names: dict) -> int:
+    text = text.strip().lower()
+    n = names[text] if text in names else int(text) if text.isdigit() else None
+    if n is None or not lo <= n <= hi:
+        raise CronError(f"{text!r} is not in {lo}-{hi}")
+    return n
+
+
+def _field(text: str, lo: int, hi: int, names: dict) -> Tuple[FrozenSet[int], bool]:
+    """Allowed values, and whether the field is restricted (not `*`)."""
+    values = set()
+    for part in text.split(","):
+        rng, _, step_text = part.partition("/")
+        step = int(step_text) if step_text.isdigit() and int(step_text) > 0 else None
+        if step_text and step is None:
+            raise CronError(f"Bad step in {part!r}")
+        if rng == "*":
+            start, end = lo, hi
+        elif "-" in rng:
+            a, b = rng.split("-", 1)
+            start, end = _value(a, lo, hi, names), _value(b, lo, hi, names)
+            if start > end:
+                raise CronError(f"Empty range {rng!r}")
+        else:
+            start = _value(rng, lo, hi, names)
+            end = hi if step else start
+        values.update(range(start, end + 1, step or 1))
+    return frozenset(values), text != "*"
+
+
+def zone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        raise CronError(f"Unknown timezone {name!r}") from None
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    expr: str
+    tz: ZoneInfo
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]  # 0 = Sunday
+    day_or: bool  # both day fields restricted: either may match
+
+    @classmethod
+    def parse(cls, expr: str, tz: Optional[str] = None) -> "CronSchedule":
+        text = _ALIASES.get(expr.strip().lower(), expr)
+        parts = text.split()
+        if len(parts) != 5:
+            raise CronError(f"Cron needs 5 fields, got {expr!r}")
+        (mi, _), (hr, _), (dom, dom_r), (mon, _), (dow, dow_r) = (
+            _field(p, lo, hi, names) for p, (lo, hi, names) in zip(parts, _FIELDS)
+        )
+        dow = frozenset(d % 7 for d in dow)
+        return cls(expr, zone(tz), mi, hr, dom, mon, dow, dom_r and dow_r)
+
+    def _day_matches(self, d: date) -> bool:
+        if d.month not in self.months:
+            return False
+        dom, dow = d.day in self.days, (d.isoweekday() % 7) in self.weekdays
+        return (dom or dow) if self.day_or else (dom and dow)
+
+    def next_after(self, after: datetime) -> datetime:
+        """First fire time strictly after `after` (naive UTC), as naive UTC."""
+        local = after.replace(tzinfo=timezone.utc).astimezone(self.tz).replace(tzinfo=None)
+        start = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.date()
+        for _ in range(366 * _MAX_YEARS):
+            if self._day_matches(day):
+                first = start.time() if day == start.date() else time(0, 0)
+                for h in sorted(x for x in self.hours if x >= first.hour):
+                    for m in sorted(self.minutes):
+                        if h == first.hour and m < first.minute:
+                            continue
+                        fire = self._to_utc(datetime.combine(day, time(h, m)))
+                        if fire is not None and fire > after:
+                            return fire
+            day += timedelta(days=1)
+        raise CronError(f"{self.expr!r} has no fire time in {_MAX_YEARS} years")
+
+    def _to_utc(self, wall: datetime) -> Optional[datetime]:
+        aware = wall.replace(tzinfo=self.tz, fold=0)
+        utc = aware.astimezone(timezone.utc)
+        if utc.astimezone(self.tz).replace(tzinfo=None) != wall:
+            return None  # skipped by a DST jump
+        return utc.replace(tzinfo=None)
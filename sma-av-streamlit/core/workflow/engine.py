@@ -1,17 +1,30 @@
-
 from __future__ import annotations
-from typing import Iterator, Dict, Any
+import logging
+from datetime import datetime, timezone
+from typing import Iterator, Dict, Any, List, Mapping, Optional
 from sqlalchemy.orm import Session
-from ..db.models import Agent, Recipe, Run
+from ..db.models import Agent, Evidence, Recipe, Run
 from ..recipes.service import load_recipe_dict
-from ..utils.evidence import attach_json
+from ..utils.evidence import attach_json, attach_json_batch
+from .interpreter import Tool, is_steps_recipe, load_plan
+
+log = logging.getLogger(__name__)
 
 def run_workflow_phases(recipe: Dict[str, Any]) -> Iterator[tuple[str, str]]:
     for phase in ["intake", "plan", "act", "verify"]:
         steps = recipe.get(phase, []) or []
         yield phase, f"{phase} steps: {len(steps)}"
 
-def execute_recipe_run(db: Session, agent_id: int, recipe_id: int) -> Run:
+def execute_recipe_run(db: Session, agent_id: int, recipe_id: int, *, batch: bool = False) -> Run:
+    """
+    Run a recipe against the app database: a Run row plus one Evidence row
+    per phase.  By default the run is committed as "running" and each piece
+    of evidence is committed as it is produced.  With `batch=True` the
+    evidence is accumulated and written together with the run and its final
+    status in one transaction (one commit instead of one per phase); if a
+    phase raises, the run is stored as "failed" with the evidence gathered
+    so far.
+    """
     agent = db.get(Agent, agent_id)
     if agent is None:
         raise ValueError(f"Agent {agent_id} not found")
@@ -20,6 +33,8 @@ def execute_recipe_run(db: Session, agent_id: int, recipe_id: int) -> Run:
     if recipe is None:
         raise ValueError(f"Recipe {recipe_id} not found")
 
+    if batch:
+        return _execute_recipe_run_batch(db, agent, recipe)
     run = Run(agent_id=agent_id, recipe_id=recipe_id, status="running")
     db.add(run); db.commit(); db.refresh(run)
     recipe_dict = load_recipe_dict(recipe.yaml_path)
@@ -27,3 +42,119 @@ def execute_recipe_run(db: Session, agent_id: int, recipe_id: int) -> Run:
         attach_json(db, run_id=run.id, payload={"phase": phase, "message": f"{agent.name}: {message}"})
     run.status = "completed"; db.commit(); db.refresh(run)
     return run
+
+def _execute_recipe_run_batch(db: Session, agent: Agent, recipe: Recipe) -> Run:
+    payloads: List[Dict[str, Any]] = []
+    try:
+        recipe_dict = load_recipe_dict(recipe.yaml_path)
+        for phase, message in run_workflow_phases(recipe_dict):
+            payloads.append({"phase": phase, "message": f"{agent.name}: {message}"})
+    except BaseException:
+        # Any exit (KeyboardInterrupt included) stores the run as failed; a
+        # database error while doing so must not replace the original one.
+        try:
+            _commit_batch_run(db, agent, recipe, "failed", payloads)
+        except Exception:
+            db.rollback()
+        raise
+    else:
+        return _commit_batch_run(db, agent, recipe, "completed", payloads)
+
+def _commit_batch_run(db: Session, agent: Agent, recipe: Recipe, status: str, payloads: List[Dict[str, Any]]) -> Run:
+    run = Run(agent_id=agent.id, recipe_id=recipe.id, status=status)
+    db.add(run); db.flush()
+    attach_json_batch(db, run.id, payloads, commit=False)
+    db.commit(); db.refresh(run)
+    return run
+
+def execute_recorded_run(
+    db: Session,
+    store,
+    *,
+    agent_id: int,
+    recipe_id: int,
+    workflow_id: Optional[str] = None,
+    name: Optional[str] = None,
+    trigger: str = "manual",
+    meta: Optional[Dict[str, Any]] = None,
+    inputs: Optional[Dict[str, Any]] = None,
+    tools: Optional[Mapping[str, Tool]] = None,
+) -> Run:
+    """
+    Execute a recipe and write a single execution record to the run store:
+    run header, final status and one step per phase (carrying the same
+    payload `execute_recipe_run` stores as Evidence) in one transaction.
+    Recipes that declare `steps:` are executed by the step interpreter
+    (core/workflow/interpreter.py) with `inputs` and `tools`, and record one
+    timed step per recipe step; a failed step marks the run failed.
+    `db` is only read (agent/recipe lookup).  Returns an unsaved `Run` with
+    its `evidence` filled in, so callers written against the app schema keep
+    working; the run store's `legacy_runs`/`legacy_evidence` views expose the
+    same columns in SQL.
+    """
+    started = datetime.now(timezone.utc)
+    steps: List[Dict[str, Any]] = []
+    record = dict(
+        workflow_id=workflow_id or f"recipe:{recipe_id}",
+        name=name or f"recipe {recipe_id}",
+        agent_id=agent_id, recipe_id=recipe_id, trigger=trigger, meta=meta,
+        started_at=started,
+    )
+    status, error = "success", None
+    try:
+        agent = db.get(Agent, agent_id)
+        if agent is None:
+            raise ValueError(f"Agent {agent_id} not found")
+        recipe = db.get(Recipe, recipe_id)
+        if recipe is None:
+            raise ValueError(f"Recipe {recipe_id} not found")
+        recipe_dict = load_recipe_dict(recipe.yaml_path)
+        if is_steps_recipe(recipe_dict):
+            result = load_plan(recipe.yaml_path).run(inputs, tools=tools)
+            steps = _interpreted_steps(agent.name, result)
+            status, error = result["status"], result["error"]
+        else:
+            for phase, message in run_workflow_phases(recipe_dict):
+                text = f"{agent.name}: {message}"
+                steps.append({"phase": phase, "message": text, "payload": {"phase": phase, "message": text}})
+    except Exception as e:
+        # As in the batch path: failing to record the failure must not replace the original error.
+        try:
+            store.record_run(**record, status="failed", error=f"{type(e).__name__}: {e}", steps=steps)
+        except Exception:
+            log.exception("could not record failed run of recipe %s", recipe_id)
+        raise
+    finished = datetime.now(timezone.utc)
+    run_id = store.record_run(**record, status=status, error=error, finished_at=finished, steps=steps)
+    run = Run(
+        id=run_id, agent_id=agent_id, recipe_id=recipe_id,
+        status="completed" if status == "success" else status,
+        started_at=started, completed_at=finished,
+    )
+    run.evidence = [Evidence(run_id=run_id, payload=st["payload"], created_at=finished) for st in steps]
+    return run
+
+def _interpreted_steps(agent_name: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Run store steps for an interpreter result: one per recipe step, plus the verify asserts."""
+    steps: List[Dict[str, Any]] = []
+    for rec in result["steps"]:
+        text = f"{agent_name}: {rec['id']} ({rec['action']} via {rec['using']}) {rec['status']}"
+        timed = rec["status"] != "skipped"
+        steps.append({
+            "phase": "act", "message": text, "status": rec["status"],
+            "level": "error" if rec["status"] == "error" else "info",
+            "payload": {"phase": "act", "message": text, "step": rec["id"], "params": rec["params"]},
+            "result": {"result": rec["result"], "error": rec.get("error")},
+            "step_id": rec["id"], "tool": rec["using"],
+            "started_at": rec["started_at"] if timed else None,
+            "finished_at": rec["finished_at"] if timed else None,
+        })
+    if result["verify"]:
+        ok = all(v["ok"] for v in result["verify"])
+        text = f"{agent_name}: verify {'passed' if ok else 'failed'}"
+        steps.append({
+            "phase": "verify", "message": text, "status": "ok" if ok else "failed",
+            "level": "info" if ok else "error",
+            "payload": {"phase": "verify", "message": text}, "result": {"asserts": result["verify"]},
+        })
+    return steps
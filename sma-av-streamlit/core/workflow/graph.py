@@ -0,0 +1,380 @@
+"""
+core/workflow/graph.py
+----------------------
+
+Runs the workflow graph definitions in ``core/workflows/*.json``:
+
+  {"id": ..., "name": ..., "params": {...},
+   "graph": [{"id": "scan", "run": {...}, "next": "done"},
+             {"id": "done", "terminal": true}]}
+
+Execution starts at the first node and follows ``next`` (or the following
+node when ``next`` is absent) until a ``terminal`` node.  ``run`` is one of
+
+  - an invocation ``{"agent": ..., "recipe": <recipe id>, "with": {...}}``:
+    the recipe (resolved by its ``id`` in RECIPES_DIR) is executed by the
+    step interpreter with ``with`` as its inputs (the graph's params when
+    ``with`` is absent, e.g. for event-triggered graphs);
+  - ``{"type": "foreach", "items": "params.roomIds", "do": <invocation>}``:
+    one invocation per item on a thread pool of ``concurrency`` workers
+    (node option, else the ``workers`` argument, else FOREACH_WORKERS);
+  - ``{"type": "verify_outputs", "expect": ["a.b", ...]}``: every dotted
+    path must be set in the previous node's outputs.
+
+``${params.x}``, ``${item}``, ``${index}`` and ``${nodes.<id>.outputs.x}``
+are substituted in ``with`` and ``items``; a value that is exactly one
+``${...}`` keeps its type.
+
+The graph is recorded as one run in the run store, with one step per node;
+every invocation is a child run (``parent_id``), so a 500-room sweep is one
+line in the Dashboard with its children's ok/failed totals.  Items are
+isolated: each gets its own inputs, and an exception in one item (the
+recipe, its tools or recording it) only fails that item.
+``on_item_failure`` decides what a failed item does to the node:
+
+  - "continue" (default): run every item; the node is "partial" when some
+    items failed, or "failed" when all did or more than ``max_failed`` did;
+  - "fail_fast": cancel items that have not started; the node is "failed".
+
+A failed node stops the graph; a partial one does not, and the graph run
+is recorded as "partial" with the partial nodes' errors.  A graph whose
+``next`` links loop is rejected before it runs.
+
+Usage:
+    result = run_graph("daily-room-health.json", store, tools={"mcp-zoom": zoom})
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+import yaml
+
+from ..recipes import service as recipes_service
+from .engine import _interpreted_steps
+from .interpreter import Tool, _get, load_plan
+
+UTC = timezone.utc
+GRAPHS_DIR = Path(__file__).resolve().parents[1] / "workflows"
+AGENTS_DIR = Path(__file__).resolve().parents[1] / "agents"
+FOREACH_WORKERS = 8
+ITEM_FAILURE_POLICIES = ("continue", "fail_fast")
+
+_REF = re.compile(r"\$\{([^}]+)\}")
+
+
+class GraphError(ValueError):
+    """A graph definition that cannot be run (bad node, unknown recipe, ...)."""
+
+
+class _NodeFailed(Exception):
+    pass
+
+
+# ---- Definitions ---------------------------------------------------------------
+def list_graphs() -> List[str]:
+    if not GRAPHS_DIR.is_dir():
+        return []
+    return sorted(p.name for p in GRAPHS_DIR.glob("*.json"))
+
+
+def load_graph(filename: str) -> Dict[str, Any]:
+    with open(GRAPHS_DIR / filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def recipe_index() -> Dict[str, str]:
+    """Recipe id -> filename for the YAML files in RECIPES_DIR."""
+    index: Dict[str, str] = {}
+    for filename in recipes_service.list_recipe_files():
+        try:
+            recipe = recipes_service.load_recipe_dict(filename)
+        except (OSError, yaml.YAMLError):
+            continue
+        if isinstance(recipe, dict) and recipe.get("id"):
+            index.setdefault(str(recipe["id"]), filename)
+    return index
+
+
+def _agent_names() -> Dict[str, str]:
+    names: Dict[str, str] = {}
+    for path in AGENTS_DIR.glob("*.json"):
+        try:
+            agent = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if isinstance(agent, dict) and agent.get("id"):
+            names[str(agent["id"])] = str(agent.get("name") or agent["id"])
+    return names
+
+
+def substitute(value: Any, ctx: Mapping[str, Any]) -> Any:
+    """Replace `${dotted.path}` references in strings anywhere inside `value`."""
+    if isinstance(value, str):
+        m = _REF.fullmatch(value.strip())
+        if m:
+            return _lookup(ctx, m.group(1))
+        return _REF.sub(lambda m: _text(_lookup(ctx, m.group(1))), value)
+    if isinstance(value, dict):
+        return {k: substitute(v, ctx) for k, v in value.items()}
+    if isinstance(value, list):
+        return [substitute(v, ctx) for v in value]
+    return value
+
+
+def _lookup(ctx: Mapping[str, Any], path: str) -> Any:
+    obj: Any = ctx
+    for key in path.strip().split("."):
+        obj = _get(obj, int(key) if key.lstrip("-").isdigit() and isinstance(obj, list) else key)
+    return obj
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _check(graph: Dict[str, Any], recipes: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Validate the graph before anything is recorded; returns nodes by id."""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for node in graph.get("graph") or []:
+        node_id = node.get("id")
+        if not node_id or node_id in nodes:
+            raise GraphError(f"Graph nodes need unique ids (got {node_id!r})")
+        nodes[node_id] = node
+    if not nodes:
+        raise GraphError(f"Graph {graph.get('id')!r} has no nodes")
+    for node_id, node in nodes.items():
+        if node.get("next") is not None and node["next"] not in nodes:
+            raise GraphError(f"Node {node_id}: next {node['next']!r} is not a node")
+        if node.get("terminal"):
+            continue
+        run = node.get("run")
+        kind = (run or {}).get("type", "invoke")
+        if kind == "foreach":
+            policy = run.get("on_item_failure", "continue")
+            if policy not in ITEM_FAILURE_POLICIES:
+                raise GraphError(f"Node {node_id}: unknown on_item_failure {policy!r}")
+            run = run.get("do")
+            kind = "invoke"
+        if kind == "invoke":
+            if not isinstance(run, dict) or not run.get("recipe"):
+                raise GraphError(f"Node {node_id}: run needs a recipe")
+            if run["recipe"] not in recipes:
+                raise GraphError(f"Node {node_id}: unknown recipe {run['recipe']!r}")
+        elif kind != "verify_outputs":
+            raise GraphError(f"Node {node_id}: unknown run type {kind!r}")
+    # Walk the path execution takes; `next` is static, so a revisit is a loop.
+    order, seen = list(nodes), set()
+    node_id: Optional[str] = order[0]
+    while node_id is not None and not nodes[node_id].get("terminal"):
+        if node_id in seen:
+            raise GraphError(f"Graph {graph.get('id')!r} loops back to node {node_id!r}")
+        seen.add(node_id)
+        node_id = nodes[node_id].get("next") or _following(order, node_id)
+    return nodes
+
+
+# ---- Execution -----------------------------------------------------------------
+def run_graph(
+    graph: Union[str, Dict[str, Any]],
+    store: Any,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    tools: Optional[Mapping[str, Tool]] = None,
+    trigger: str = "manual",
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Execute a graph (a dict or a filename in GRAPHS_DIR) and record it in
+    `store`.  `params` override the graph's own.  Returns run_id, status
+    ("success", "partial" or "failed"), error and one result per executed
+    node (status, outputs, and for foreach the per-item results in item
+    order plus succeeded/failed/skipped totals).
+    """
+    if isinstance(graph, str):
+        graph = load_graph(graph)
+    recipes = recipe_index()
+    nodes = _check(graph, recipes)
+    order = list(nodes)
+    graph_id = str(graph.get("id") or "graph")
+    name = str(graph.get("name") or graph_id)
+    ctx: Dict[str, Any] = {"params": {**(graph.get("params") or {}), **(params or {})}, "nodes": {}}
+    runner = _Runner(store, recipes, _agent_names(), tools or {}, graph_id, name, trigger, workers)
+    status, error = "success", None
+    partial: List[str] = []
+    run_id = None
+    try:
+        with store.workflow_run(
+            workflow_id=graph_id, name=name, agent_id=None, recipe_id=None, trigger=trigger,
+            meta={"workflow_name": name, "graph": graph_id},
+        ) as rec:
+            run_id = rec.run_id
+            node_id: Optional[str] = order[0]
+            previous: Optional[Dict[str, Any]] = None
+            while node_id is not None:
+                node = nodes[node_id]
+                if node.get("terminal"):
+                    break
+                started = datetime.now(UTC)
+                result = runner.node(node, ctx, previous, run_id)
+                ctx["nodes"][node_id] = previous = result
+                rec.step(
+                    "act", f"{node_id}: {result['status']}", step_id=node_id,
+                    tool=(node.get("run") or {}).get("type", "invoke"),
+                    status="ok" if result["status"] == "success" else result["status"],
+                    level="error" if result["status"] == "failed" else "info",
+                    result=_step_summary(result), started_at=started, finished_at=datetime.now(UTC),
+                )
+                if result["status"] == "failed":
+                    raise _NodeFailed(f"{node_id}: {result.get('error') or 'failed'}")
+                if result["status"] == "partial":
+                    status = "partial"
+                    partial.append(f"{node_id}: {result.get('error')}")
+                    rec.finish(status, "; ".join(partial))
+                node_id = node.get("next") or _following(order, node_id)
+    except _NodeFailed as e:
+        status, error = "failed", str(e)
+    else:
+        error = "; ".join(partial) or None
+    return {"run_id": run_id, "graph_id": graph_id, "status": status, "error": error, "nodes": ctx["nodes"]}
+
+
+def _following(order: List[str], node_id: str) -> Optional[str]:
+    i = order.index(node_id) + 1
+    return order[i] if i < len(order) else None
+
+
+def _step_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """What goes into the graph run's step: totals and failures, not every item."""
+    if "items" not in result:
+        return result
+    summary = {k: v for k, v in result.items() if k not in ("items", "outputs")}
+    summary["failures"] = [
+        {k: it.get(k) for k in ("index", "item", "run_id", "error")}
+        for it in result["items"] if it["status"] == "failed"
+    ][:50]
+    return summary
+
+
+class _Runner:
+    def __init__(
+        self, store: Any, recipes: Dict[str, str], agents: Dict[str, str], tools: Mapping[str, Tool],
+        graph_id: str, name: str, trigger: str, workers: Optional[int],
+    ):
+        self.store, self.recipes, self.agents, self.tools = store, recipes, agents, tools
+        self.graph_id, self.name, self.trigger, self.workers = graph_id, name, trigger, workers
+        # SQLite has one writer; queueing item writes here keeps a wide pool from
+        # running into busy_timeout instead of waiting its turn.
+        sqlite = str(getattr(store, "url", "")).startswith("sqlite")
+        self._record_lock = threading.Lock() if sqlite else contextlib.nullcontext()
+
+    def node(
+        self, node: Dict[str, Any], ctx: Dict[str, Any], previous: Optional[Dict[str, Any]], parent_id: int,
+    ) -> Dict[str, Any]:
+        run = node["run"]
+        kind = run.get("type", "invoke")
+        if kind == "foreach":
+            return self.foreach(node["id"], run, ctx, parent_id)
+        if kind == "verify_outputs":
+            outputs = (previous or {}).get("outputs") or {}
+            missing = [p for p in run.get("expect") or [] if _lookup(outputs, p) is None]
+            return {
+                "status": "failed" if missing else "success",
+                "error": f"missing outputs: {', '.join(missing)}" if missing else None,
+                "outputs": outputs,
+            }
+        return self.invoke(node["id"], run, ctx, parent_id)
+
+    def invoke(
+        self, node_id: str, call: Dict[str, Any], ctx: Mapping[str, Any], parent_id: int,
+        label: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        agent, recipe = str(call.get("agent") or ""), str(call["recipe"])
+        agent_name = self.agents.get(agent, agent or "graph")
+        started = datetime.now(UTC)
+        inputs: Any = {}
+        result: Optional[Dict[str, Any]] = None
+        try:
+            inputs = substitute(call["with"], ctx) if "with" in call else dict(ctx["params"])
+            result = load_plan(self.recipes[recipe]).run(inputs, tools=self.tools)
+            status, error = result["status"], result["error"]
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        meta = {"workflow_name": self.name, "node": node_id, "agent": agent, "recipe": recipe}
+        if isinstance(inputs, dict) and inputs.get("roomId") is not None:
+            meta["room_id"] = inputs["roomId"]
+        finished = datetime.now(UTC)
+        with self._record_lock:
+            run_id = self.store.record_run(
+                workflow_id=self.graph_id, name=f"{node_id}: {label or recipe}",
+                agent_id=None, recipe_id=None, trigger=self.trigger, meta=meta,
+                status=status, error=error, started_at=started, finished_at=finished,
+                steps=_interpreted_steps(agent_name, result) if result else [],
+                parent_id=parent_id,
+            )
+        return {
+            "status": "success" if status == "success" else "failed",
+            "error": error, "run_id": run_id,
+            "outputs": result["outputs"] if result else None,
+        }
+
+    def foreach(self, node_id: str, run: Dict[str, Any], ctx: Dict[str, Any], parent_id: int) -> Dict[str, Any]:
+        ref = str(run.get("items") or "")
+        items = substitute(ref if _REF.search(ref) else "${" + ref + "}", ctx)
+        if not isinstance(items, list):
+            return {"status": "failed", "error": f"items {ref!r} is not a list", "outputs": []}
+        policy = run.get("on_item_failure", "continue")
+        max_failed = run.get("max_failed")
+        workers = max(1, int(run.get("concurrency") or self.workers or FOREACH_WORKERS))
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+        def one(index: int, item: Any) -> Dict[str, Any]:
+            item_ctx = {**ctx, "item": item, "index": index}
+            try:
+                res = self.invoke(node_id, run["do"], item_ctx, parent_id, label=_text(item))
+            except Exception as e:  # recording the item failed
+                res = {"status": "failed", "error": f"{type(e).__name__}: {e}", "run_id": None, "outputs": None}
+            return {"index": index, "item": item, **res}
+
+        if items:
+            with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix="foreach") as pool:
+                futures = {pool.submit(one, i, item): i for i, item in enumerate(items)}
+                for fut in as_completed(futures):
+                    if fut.cancelled():
+                        continue
+                    res = results[futures[fut]] = fut.result()
+                    if res["status"] == "failed" and policy == "fail_fast":
+                        for f in futures:
+                            f.cancel()
+        for i, item in enumerate(items):
+            if results[i] is None:
+                results[i] = {"index": i, "item": item, "status": "skipped", "error": None,
+                              "run_id": None, "outputs": None}
+        done = [r for r in results if r is not None]
+        failed = sum(1 for r in done if r["status"] == "failed")
+        skipped = sum(1 for r in done if r["status"] == "skipped")
+        succeeded = len(done) - failed - skipped
+        if not failed:
+            status = "success"
+        elif policy == "fail_fast" or succeeded == 0 or (max_failed is not None and failed > int(max_failed)):
+            status = "failed"
+        else:
+            status = "partial"
+        return {
+            "status": status,
+            "error": f"{failed} of {len(done)} items failed" if failed else None,
+            "total": len(done), "succeeded": succeeded, "failed": failed, "skipped": skipped,
+            "workers": min(workers, len(items)) if items else 0,
+            "items": done,
+            "outputs": [r["outputs"] for r in done],
+        }
@@ -0,0 +1,556 @@
+"""
+core/workflow/interpreter.py
+----------------------------
+
+Step interpreter for recipes that declare ``steps:`` (for example
+``recipes/zoom-room-healthcheck.yaml``).  A recipe is compiled once into a
+``RecipePlan``; running the plan only evaluates what was compiled:
+
+  - ``{{ expr }}`` templates are split into literal text and expressions,
+    and every expression is compiled to a Python function;
+  - ``when:`` and ``verify: - assert:`` become compiled predicates;
+  - ``saves: {name: $.path}`` becomes a tuple of keys/indexes (a
+    non-string value, e.g. ``{preflight_ok: true}``, is saved as is).
+
+Expressions are a small, safe subset of Python/Jinja: the names ``inputs``
+and ``s`` (values saved by earlier steps), attribute or item access into
+dicts (a missing key is None), comparisons, ``and``/``or``/``not``,
+``a if cond else b``, arithmetic and literals (``null``/``true``/``false``
+are accepted too), followed by filters: ``default(v)``, ``to_json``,
+``lower``, ``upper``, ``length`` and ``slug``.  Function calls and any other name are
+rejected when the recipe is compiled.
+
+Steps call ``tools[using](action, params)``, which returns a dict; the
+``local`` tool is built in (``LOCAL_ACTIONS``).  When the tool is missing or
+raises and the step has ``fallback: {simulate: true}``, the fallback's
+``saves`` are applied as literal values and the step is "simulated";
+otherwise the run stops as failed.  ``preconditions`` and ``metrics`` are
+not evaluated.
+
+Steps run as a DAG.  A step depends on an earlier one when it reads an
+``s.<key>`` that step saves (in ``params``, ``when`` or fallback saves), when
+both save the same key, or when it saves a key the earlier step reads; a
+step that reads ``s`` as a whole depends on every earlier writer.  Steps with
+no dependency between them run concurrently on a bounded thread pool
+(``MAX_PARALLEL_STEPS``), and step records stay in recipe order.  Ordering
+that is not visible in the data (two messages to the same channel, say) is
+not inferred: ``sequential: true`` on the recipe runs every step in order,
+and on a step makes it wait for all earlier steps and block all later ones.
+After a failed step no new steps start; steps already running finish.
+
+Usage:
+    plan = load_plan("zoom-room-healthcheck.yaml")  # compiled once per file version
+    result = plan.run({"roomId": "ZR-101"}, tools={"mcp-zoom": zoom_tool})
+"""
+from __future__ import annotations
+
+import ast
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple, Union
+
+from ..recipes.service import RECIPES_DIR, load_recipe_dict
+
+UTC = timezone.utc
+MAX_PARALLEL_STEPS = 4
+
+Tool = Callable[[str, Dict[str, Any]], Optional[Dict[str, Any]]]
+# A compiled value: (inputs, saved) -> rendered value.
+Compiled = Callable[[Dict[str, Any], Dict[str, Any]], Any]
+
+_TEMPLATE = re.compile(r"\{\{(.*?)\}\}", re.S)
+_NAMES = ("inputs", "s")
+_CONSTANTS = {"null": None, "None": None, "true": True, "True": True, "false": False, "False": False}
+_ALLOWED = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Is, ast.IsNot, ast.IfExp, ast.Constant, ast.List, ast.Tuple, ast.Dict,
+    ast.Name, ast.Attribute, ast.Subscript, ast.Load,
+)
+
+
+class RecipeCompileError(ValueError):
+    """A recipe template, predicate or saves path that cannot be compiled."""
+
+
+# ---- Expressions --------------------------------------------------------------
+def _get(obj: Any, key: Any) -> Any:
+    if isinstance(obj, Mapping):
+        return obj.get(key)
+    if isinstance(obj, (list, tuple)) and isinstance(key, int) and -len(obj) <= key < len(obj):
+        return obj[key]
+    return None
+
+
+def _default(value: Any, fallback: Any = "") -> Any:
+    return fallback if value is None or value == "" else value
+
+
+FILTERS: Dict[str, Callable[..., Any]] = {
+    "default": _default,
+    "to_json": lambda v: json.dumps(v, default=str),
+    "lower": lambda v: "" if v is None else str(v).lower(),
+    "upper": lambda v: "" if v is None else str(v).upper(),
+    "length": lambda v: len(v) if v is not None else 0,
+    "slug": lambda v: re.sub(r"[^a-z0-9]+", "-", str(v or "").lower()).strip("-"),
+}
+
+
+class _Rewrite(ast.NodeTransformer):
+    """Whitelist the expression and turn `a.b` / `a[b]` into missing-tolerant _get() calls."""
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, _ALLOWED):
+            raise RecipeCompileError(f"Unsupported expression element: {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in _CONSTANTS:
+            return ast.copy_location(ast.Constant(_CONSTANTS[node.id]), node)
+        if node.id not in _NAMES:
+            raise RecipeCompileError(f"Unknown name {node.id!r} (use inputs.<key> or s.<key>)")
+        return node
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        value = self.visit(node.value)
+        return ast.copy_location(
+            ast.Call(ast.Name("_get", ast.Load()), [value, ast.Constant(node.attr)], []), node
+        )
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.AST:
+        value, key = self.visit(node.value), self.visit(node.slice)
+        return ast.copy_location(ast.Call(ast.Name("_get", ast.Load()), [value, key], []), node)
+
+
+def _split_filters(text: str) -> List[str]:
+    """Split `expr | f1 | f2(x)` on the pipes that are outside quotes and brackets."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote and text[i - 1] != "\\":
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts]
+
+
+def compile_expression(text: str) -> Compiled:
+    """Compile `expr | filter ...` into a function of (inputs, saved)."""
+    expr, *filter_texts = _split_filters(text)
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise RecipeCompileError(f"Invalid expression {expr!r}: {e.msg}") from None
+    body = _Rewrite().visit(tree).body
+    fn_tree = ast.Expression(ast.Lambda(
+        ast.arguments(
+            posonlyargs=[], args=[ast.arg("inputs"), ast.arg("s")], kwonlyargs=[],
+            kw_defaults=[], defaults=[],
+        ),
+        body,
+    ))
+    ast.fix_missing_locations(fn_tree)
+    fn = eval(compile(fn_tree, f"<recipe {expr!r}>", "eval"), {"_get": _get, "__builtins__": {}})
+
+    filters: List[Tuple[Callable[..., Any], Tuple[Any, ...]]] = []
+    for ft in filter_texts:
+        name, _, args = ft.partition("(")
+        name = name.strip()
+        if name not in FILTERS:
+            raise RecipeCompileError(f"Unknown filter {name!r} in {text!r}")
+        try:
+            values = ast.literal_eval(f"({args.rstrip()[:-1]},)") if args else ()
+        except (SyntaxError, ValueError):
+            raise RecipeCompileError(f"Filter arguments must be literals: {ft!r}") from None
+        filters.append((FILTERS[name], tuple(values)))
+    if not filters:
+        return fn
+
+    def _filtered(inputs: Dict[str, Any], s: Dict[str, Any]) -> Any:
+        value = fn(inputs, s)
+        for f, args in filters:
+            value = f(value, *args)
+        return value
+
+    return _filtered
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def compile_template(text: str) -> Compiled:
+    """A string with `{{ }}` parts; exactly one `{{ expr }}` keeps the value's type."""
+    pieces = _TEMPLATE.split(text)  # literal, expr, literal, expr, ...
+    if len(pieces) == 1:
+        return lambda inputs, s: text
+    if len(pieces) == 3 and not pieces[0].strip() and not pieces[2].strip():
+        return compile_expression(pieces[1])
+    parts: List[Union[str, Compiled]] = [
+        compile_expression(p) if i % 2 else p for i, p in enumerate(pieces) if i % 2 or p
+    ]
+
+    def _render(inputs: Dict[str, Any], s: Dict[str, Any]) -> str:
+        return "".join(p if isinstance(p, str) else _text(p(inputs, s)) for p in parts)
+
+    return _render
+
+
+def compile_value(value: Any) -> Compiled:
+    """Compile templates anywhere inside a params/outputs structure."""
+    if isinstance(value, str):
+        return compile_template(value)
+    if isinstance(value, dict):
+        items = [(k, compile_value(v)) for k, v in value.items()]
+        return lambda inputs, s: {k: f(inputs, s) for k, f in items}
+    if isinstance(value, list):
+        fns = [compile_value(v) for v in value]
+        return lambda inputs, s: [f(inputs, s) for f in fns]
+    return lambda inputs, s: value
+
+
+def compile_predicate(text: Any) -> Compiled:
+    """`when:`/`assert:` text, with or without the surrounding braces."""
+    if isinstance(text, bool):
+        return lambda inputs, s: text
+    text = str(text).strip()
+    m = _TEMPLATE.fullmatch(text)
+    fn = compile_expression(m.group(1) if m else text)
+    return lambda inputs, s: bool(fn(inputs, s))
+
+
+def expression_reads(text: str) -> Optional[FrozenSet[str]]:
+    """Keys of `s` an expression reads; None when it uses `s` as a whole or by a computed key."""
+    expr = _split_filters(text)[0]
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise RecipeCompileError(f"Invalid expression {expr!r}: {e.msg}") from None
+    keys: Set[str] = set()
+    uses = keyed = 0
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == "s":
+            uses += 1
+        elif isinstance(node, (ast.Attribute, ast.Subscript)) and isinstance(node.value, ast.Name) \
+                and node.value.id == "s":
+            key = node.attr if isinstance(node, ast.Attribute) else getattr(node.slice, "value", None)
+            if isinstance(key, str):
+                keys.add(key)
+                keyed += 1
+    return frozenset(keys) if uses == keyed else None
+
+
+def _value_reads(value: Any, predicate: bool = False) -> Optional[FrozenSet[str]]:
+    """Union of `expression_reads` over every template in a params-like structure."""
+    if isinstance(value, str):
+        m = _TEMPLATE.fullmatch(value.strip()) if predicate else None
+        exprs = [m.group(1) if m else value] if predicate else _TEMPLATE.split(value)[1::2]
+    elif isinstance(value, dict):
+        exprs, value = [], list(value.values())
+    else:
+        exprs = []
+    parts = [expression_reads(e) for e in exprs]
+    if isinstance(value, list):
+        parts += [_value_reads(v) for v in value]
+    if any(p is None for p in parts):
+        return None
+    return frozenset().union(*parts)
+
+
+_PATH_TOKEN = re.compile(r"\.([A-Za-z_][\w-]*)|\[(\d+)\]|\[['\"]([^'\"]+)['\"]\]")
+
+
+def compile_path(path: str) -> Tuple[Union[str, int], ...]:
+    """`$.a.b[0]` -> ("a", "b", 0)."""
+    if not path.startswith("$"):
+        raise RecipeCompileError(f"saves paths start with '$': {path!r}")
+    keys: List[Union[str, int]] = []
+    pos = 1
+    for m in _PATH_TOKEN.finditer(path, 1):
+        if m.start() != pos:
+            break
+        keys.append(m.group(1) or (int(m.group(2)) if m.group(2) else m.group(3)))
+        pos = m.end()
+    if pos != len(path):
+        raise RecipeCompileError(f"Unsupported saves path: {path!r}")
+    return tuple(keys)
+
+
+def _extract(result: Any, keys: Tuple[Union[str, int], ...]) -> Any:
+    for k in keys:
+        result = _get(result, k)
+    return result
+
+
+# ---- Plan ------------------------------------------------------------------------
+@dataclass(frozen=True)
+class CompiledStep:
+    id: str
+    action: str
+    using: str
+    params: Compiled
+    when: Optional[Compiled]
+    saves: Tuple[Tuple[str, Tuple[Union[str, int], ...]], ...]
+    simulate: bool
+    fallback_saves: Optional[Compiled]
+    deps: Tuple[int, ...] = ()  # indexes of the earlier steps this one waits for
+    save_literals: Tuple[Tuple[str, Any], ...] = ()
+
+
+@dataclass(frozen=True)
+class RecipePlan:
+    id: str
+    inputs: Dict[str, Dict[str, Any]]
+    steps: Tuple[CompiledStep, ...]
+    asserts: Tuple[Tuple[str, Compiled], ...]
+    outputs: Optional[Compiled]
+    parallel: bool = False  # some steps are independent and `sequential` was not set
+
+    def run(
+        self,
+        inputs: Optional[Dict[str, Any]] = None,
+        *,
+        tools: Optional[Mapping[str, Tool]] = None,
+        max_workers: int = MAX_PARALLEL_STEPS,
+    ) -> Dict[str, Any]:
+        """
+        Execute the plan; returns status ("success"/"failed"), error, saves,
+        outputs, verify results and one record per step in recipe order
+        (status ok / simulated / skipped / error, params, result, timings).
+        Tools may be called from pool threads when the plan is parallel.
+        """
+        inputs = self._bind_inputs(inputs or {})
+        tools = tools or {}
+        s: Dict[str, Any] = {}
+        if self.parallel and max_workers > 1:
+            records = self._run_parallel(inputs, s, tools, max_workers)
+        else:
+            records = []
+            for st in self.steps:
+                records.append(_run_step(st, inputs, s, tools))
+                if records[-1]["status"] == "error":
+                    break
+        failed = next((r for r in records if r["status"] == "error"), None)
+        error = f"{failed['id']}: {failed['error']}" if failed else None
+        verify = [] if error else [_check_assert(src, fn, inputs, s) for src, fn in self.asserts]
+        if not error and not all(v["ok"] for v in verify):
+            error = "verify failed: " + "; ".join(v["assert"] for v in verify if not v["ok"])
+        outputs = None
+        if self.outputs and not error:
+            try:
+                outputs = self.outputs(inputs, s)
+            except Exception as e:
+                error = f"outputs: {type(e).__name__}: {e}"
+        return {
+            "recipe_id": self.id,
+            "status": "failed" if error else "success",
+            "error": error,
+            "saves": s,
+            "outputs": outputs,
+            "verify": verify,
+            "steps": records,
+        }
+
+    def _run_parallel(
+        self, inputs: Dict[str, Any], s: Dict[str, Any], tools: Mapping[str, Tool], max_workers: int,
+    ) -> List[Dict[str, Any]]:
+        waiting = {i: set(st.deps) for i, st in enumerate(self.steps)}
+        dependents: Dict[int, List[int]] = {i: [] for i in waiting}
+        for i, st in enumerate(self.steps):
+            for d in st.deps:
+                dependents[d].append(i)
+        records: Dict[int, Dict[str, Any]] = {}
+        running: Dict[Any, int] = {}
+        failed = False
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recipe-step") as pool:
+            while True:
+                if not failed:
+                    for i in [i for i, deps in waiting.items() if not deps]:
+                        del waiting[i]
+                        running[pool.submit(_run_step, self.steps[i], inputs, s, tools)] = i
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = running.pop(fut)
+                    records[i] = fut.result()
+                    failed = failed or records[i]["status"] == "error"
+                    for j in dependents[i]:
+                        waiting[j].discard(i)
+        return [records[i] for i in sorted(records)]
+
+    def _bind_inputs(self, given: Dict[str, Any]) -> Dict[str, Any]:
+        bound = dict(given)
+        for name, spec in self.inputs.items():
+            if bound.get(name) is None:
+                if "default" in spec:
+                    bound[name] = spec["default"]
+                elif spec.get("required"):
+                    raise ValueError(f"Recipe {self.id} needs input {name!r}")
+        return bound
+
+
+def _run_step(
+    st: CompiledStep, inputs: Dict[str, Any], s: Dict[str, Any], tools: Mapping[str, Tool],
+) -> Dict[str, Any]:
+    started, t0 = datetime.now(UTC), time.perf_counter()
+    rec: Dict[str, Any] = {"id": st.id, "action": st.action, "using": st.using,
+                           "params": None, "result": None}
+    try:
+        if st.when is not None and not st.when(inputs, s):
+            rec["status"] = "skipped"
+        else:
+            rec["params"] = params = st.params(inputs, s)
+            tool = tools.get(st.using) or (_local_tool if st.using == "local" else None)
+            try:
+                if tool is None:
+                    raise LookupError(f"No tool configured for {st.using!r}")
+                result = tool(st.action, params) or {}
+                for name, keys in st.saves:
+                    s[name] = _extract(result, keys)
+                s.update(st.save_literals)
+                rec.update(status="ok", result=result)
+            except Exception as e:
+                if not st.simulate:
+                    raise
+                saved = st.fallback_saves(inputs, s) if st.fallback_saves else {}
+                s.update(saved)
+                rec.update(status="simulated", result=saved, error=f"{type(e).__name__}: {e}")
+    except Exception as e:
+        rec.update(status="error", error=f"{type(e).__name__}: {e}")
+    rec.update(started_at=started, finished_at=datetime.now(UTC),
+               duration_ms=(time.perf_counter() - t0) * 1000.0)
+    return rec
+
+
+def _check_assert(src: str, fn: Compiled, inputs: Dict[str, Any], s: Dict[str, Any]) -> Dict[str, Any]:
+    """One verify result; an assert that raises counts as failed, like a step that raises."""
+    try:
+        return {"assert": src, "ok": fn(inputs, s)}
+    except Exception as e:
+        return {"assert": src, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+_StepIO = Tuple[Optional[FrozenSet[str]], FrozenSet[str], bool]  # reads (None = all), writes, sequential
+
+
+def _step_io(raw: Dict[str, Any]) -> _StepIO:
+    fallback = raw.get("fallback") or {}
+    fallback_saves = fallback.get("saves") if isinstance(fallback.get("saves"), dict) else {}
+    parts = [_value_reads(raw.get("params") or {}), _value_reads(fallback_saves)]
+    if raw.get("when") is not None and not isinstance(raw["when"], bool):
+        parts.append(_value_reads(str(raw["when"]), predicate=True))
+    reads = None if any(p is None for p in parts) else frozenset().union(*parts)
+    writes = frozenset(raw.get("saves") or {}) | frozenset(fallback_saves)
+    return reads, writes, bool(raw.get("sequential"))
+
+
+def _conflicts(later: _StepIO, earlier: _StepIO) -> bool:
+    (r2, w2, seq2), (r1, w1, seq1) = later, earlier
+    read_after_write = bool(w1) if r2 is None else bool(r2 & w1)
+    write_after_read = bool(w2) if r1 is None else bool(r1 & w2)
+    return seq1 or seq2 or read_after_write or write_after_read or bool(w1 & w2)
+
+
+def compile_recipe(recipe: Dict[str, Any]) -> RecipePlan:
+    """Compile a steps-based recipe dict; raises RecipeCompileError on bad templates."""
+    steps: List[CompiledStep] = []
+    io: List[_StepIO] = []
+    for i, raw in enumerate(recipe.get("steps") or []):
+        step_id = str(raw.get("id") or f"step-{i + 1}")
+        try:
+            fallback = raw.get("fallback") or {}
+            saves = (raw.get("saves") or {}).items()
+            io.append(_step_io(raw))
+            steps.append(CompiledStep(
+                id=step_id,
+                action=str(raw.get("action") or ""),
+                using=str(raw.get("using") or "local"),
+                params=compile_value(raw.get("params") or {}),
+                when=compile_predicate(raw["when"]) if raw.get("when") is not None else None,
+                saves=tuple((k, compile_path(v)) for k, v in saves if isinstance(v, str)),
+                simulate=bool(fallback.get("simulate")),
+                fallback_saves=compile_value(fallback["saves"]) if fallback.get("saves") else None,
+                deps=tuple(j for j in range(i) if _conflicts(io[i], io[j])),
+                save_literals=tuple((k, v) for k, v in saves if not isinstance(v, str)),
+            ))
+        except RecipeCompileError as e:
+            raise RecipeCompileError(f"step {step_id}: {e}") from None
+    asserts = tuple(
+        (str(v["assert"]), compile_predicate(v["assert"]))
+        for v in (recipe.get("verify") or []) if isinstance(v, dict) and "assert" in v
+    )
+    inputs = {
+        k: (v if isinstance(v, dict) else {"default": v}) for k, v in (recipe.get("inputs") or {}).items()
+    }
+    return RecipePlan(
+        id=str(recipe.get("id") or recipe.get("name") or "recipe"),
+        inputs=inputs,
+        steps=tuple(steps),
+        asserts=asserts,
+        outputs=compile_value(recipe["outputs"]) if recipe.get("outputs") else None,
+        parallel=not recipe.get("sequential")
+        and any(i - 1 not in st.deps for i, st in enumerate(steps) if i),
+    )
+
+
+def is_steps_recipe(recipe: Dict[str, Any]) -> bool:
+    return bool(recipe.get("steps"))
+
+
+_plans: Dict[str, Tuple[int, RecipePlan]] = {}
+_plans_lock = threading.Lock()
+
+
+def load_plan(filename: str) -> RecipePlan:
+    """Compiled plan for a file in RECIPES_DIR, recompiled only when the file changes."""
+    mtime = os.stat(os.path.join(RECIPES_DIR, filename)).st_mtime_ns
+    with _plans_lock:
+        cached = _plans.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    plan = compile_recipe(load_recipe_dict(filename))
+    with _plans_lock:
+        _plans[filename] = (mtime, plan)
+    return plan
+
+
+# ---- Built-in local actions ----------------------------------------------------------
+def _evaluate_thresholds(params: Dict[str, Any]) -> Dict[str, Any]:
+    metrics, thresholds = params.get("metrics") or {}, params.get("thresholds") or {}
+    breaches = [
+        {"metric": k, "value": metrics[k], "threshold": limit}
+        for k, limit in thresholds.items()
+        if isinstance(metrics.get(k), (int, float)) and metrics[k] > limit
+    ]
+    return {"ok": not breaches, "breaches": breaches}
+
+
+LOCAL_ACTIONS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "evaluate_thresholds": _evaluate_thresholds,
+}
+
+
+def _local_tool(action: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    if action not in LOCAL_ACTIONS:
+        raise LookupError(f"Unknown local action {action!r}")
+    return LOCAL_ACTIONS[action](params)
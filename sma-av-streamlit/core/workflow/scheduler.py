@@ -0,0 +1,436 @@
+"""
+core/workflow/scheduler.py
+--------------------------
+
+Background scheduler for interval and cron workflows, run headless by
+``scripts/scheduler.py`` so nothing waits on a Streamlit request.
+
+Jobs are the enabled ``WorkflowDef`` rows with ``trigger_type`` "interval"
+(every ``trigger_value`` minutes) or "cron" (``cron`` in ``timezone``), plus
+the graph definitions in ``core/workflows/*.json`` whose trigger is
+``{"type": "schedule", "cron": ...}`` (optional ``"timezone"``, default
+``AVOPS_SCHEDULER_TZ`` or UTC).  The next slot of a job is persisted:
+``WorkflowDef.next_run_at`` for workflows, ``schedule_state`` for graphs.
+
+The daemon keeps a heap of (next_run_at, job) and sleeps until the
+earliest slot, the next refresh (definitions are re-read) or the next poll.
+
+Any number of schedulers (app replicas, worker nodes) can share the app
+database; each scheduled execution is dispatched once:
+
+  1. Enqueue.  A due job's ``next_run_at`` is advanced with a compare-and-set
+     ``UPDATE ... WHERE next_run_at = <value read>``; only the scheduler whose
+     update matched inserts the slot rows into ``workflow_slots``, where
+     (job_key, slot_at) is unique.
+  2. Claim.  ``UPDATE workflow_slots SET owner = me, lease_expires_at = ...
+     WHERE id IN (SELECT id ... LIMIT n FOR UPDATE SKIP LOCKED) RETURNING``
+     hands each claimable slot to exactly one scheduler; SQLite serialises
+     the statement, Postgres skips rows another claimer has locked.  Only a
+     job's oldest unfinished slot is claimable, so a job never overlaps
+     itself, across nodes too.
+  3. Heartbeat.  While a slot runs its lease is extended every third of
+     LEASE; the final status is written only while the lease is still ours.
+  4. Recovery.  A slot whose lease ran out (its scheduler died) can be
+     claimed again, up to MAX_ATTEMPTS claims; then it is marked failed.
+     Such a retry re-runs the workflow, since the first run's outcome is
+     unknown.
+
+Slots found late by more than the grace period (no scheduler was running)
+are misfires, handled by the job's policy:
+
+  - "run_once" (default): run once now for the latest missed slot;
+  - "run_all": run every missed slot in order (at most MAX_CATCHUP);
+  - "skip": drop them and wait for the next slot.
+
+Slots waiting behind a running one are queued, not re-planned.  A
+scheduler built with ``graphs=False`` claims only workflow slots.  A pass
+that fails (e.g. the database is unavailable) is logged and retried with
+backoff; the daemon keeps running.
+
+Usage:
+    Scheduler(workers=4).run_forever()     # what scripts/scheduler.py does
+    Scheduler(graphs=False).run_pending(db)  # one inline pass (service.tick)
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from ..db.models import ScheduleState, WorkflowDef, WorkflowSlot
+from ..runstore_factory import make_runstore
+from .cron import CronSchedule
+from .graph import list_graphs, load_graph, run_graph
+from .service import run_now
+
+log = logging.getLogger(__name__)
+
+MISFIRE_POLICIES = ("run_once", "run_all", "skip")
+MISFIRE_GRACE = timedelta(minutes=5)
+MAX_CATCHUP = 24
+LEASE = timedelta(seconds=60)
+MAX_ATTEMPTS = 3
+_MAX_SCAN = 10_000  # slots walked when computing a misfire; older ones are dropped
+
+
+@dataclass(frozen=True)
+class Trigger:
+    interval: Optional[timedelta] = None
+    cron: Optional[CronSchedule] = None
+    misfire: str = "run_once"
+
+    def next_after(self, t: datetime) -> datetime:
+        return t + self.interval if self.interval else self.cron.next_after(t)
+
+
+@dataclass
+class Job:
+    key: str  # "wf:<id>" or "graph:<filename>"
+    name: str
+    trigger: Trigger
+
+
+def workflow_trigger(wf: WorkflowDef) -> Optional[Trigger]:
+    misfire = wf.misfire_policy or "run_once"
+    if misfire not in MISFIRE_POLICIES:
+        raise ValueError(f"Unknown misfire policy {misfire!r}")
+    if wf.trigger_type == "interval" and wf.trigger_value:
+        return Trigger(interval=timedelta(minutes=wf.trigger_value), misfire=misfire)
+    if wf.trigger_type == "cron" and wf.cron:
+        return Trigger(cron=CronSchedule.parse(wf.cron, wf.timezone), misfire=misfire)
+    return None
+
+
+def graph_trigger(graph: Dict[str, Any], default_tz: Optional[str] = None) -> Optional[Trigger]:
+    trig = graph.get("trigger") or {}
+    if trig.get("type") != "schedule" or not trig.get("cron"):
+        return None
+    misfire = trig.get("misfire", "run_once")
+    if misfire not in MISFIRE_POLICIES:
+        raise ValueError(f"Unknown misfire policy {misfire!r}")
+    return Trigger(cron=CronSchedule.parse(trig["cron"], trig.get("timezone") or default_tz), misfire=misfire)
+
+
+def plan_slots(
+    trigger: Trigger, next_run_at: datetime, now: datetime, grace: timedelta = MISFIRE_GRACE,
+) -> Tuple[List[datetime], datetime]:
+    """Slots to run at `now` for a job due at `next_run_at`, and its new next_run_at."""
+    missed: List[datetime] = []
+    t = next_run_at
+    while t <= now and len(missed) < _MAX_SCAN:
+        missed.append(t)
+        t = trigger.next_after(t)
+    if t <= now:
+        t = trigger.next_after(now)
+    if trigger.misfire == "run_all":
+        run = missed[-MAX_CATCHUP:]
+    elif trigger.misfire == "skip":
+        run = [s for s in missed if now - s <= grace][-1:]
+    else:
+        run = missed[-1:]
+    return run, t
+
+
+def _utcnow() -> datetime:
+    return datetime.utcnow()
+
+
+class Scheduler:
+    def __init__(
+        self,
+        *,
+        session_factory: Optional[Callable[[], Session]] = None,
+        store: Any = None,
+        workers: int = 4,
+        graphs: bool = True,
+        refresh_s: float = 60.0,
+        poll_s: float = 5.0,
+        grace: timedelta = MISFIRE_GRACE,
+        lease: timedelta = LEASE,
+        max_attempts: int = MAX_ATTEMPTS,
+        owner: Optional[str] = None,
+        clock: Callable[[], datetime] = _utcnow,
+    ):
+        if session_factory is None:
+            from ..db.session import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.store = store  # None: the shared make_runstore() store
+        self.workers = workers
+        self.graphs = graphs
+        self.refresh_s = refresh_s
+        self.poll_s = poll_s
+        self.grace = grace
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.clock = clock
+        self.default_tz = os.getenv("AVOPS_SCHEDULER_TZ") or None
+        self._jobs: Dict[str, Job] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._refresh = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- Jobs --------------------------------------------------------------------
+    def load_jobs(self, db: Session) -> Dict[str, datetime]:
+        """Re-read job definitions; returns each job's next_run_at (first slots are persisted)."""
+        jobs: Dict[str, Job] = {}
+        due: Dict[str, datetime] = {}
+        now = self.clock()
+        for wf in db.query(WorkflowDef).filter(
+            WorkflowDef.enabled == 1, WorkflowDef.trigger_type.in_(("interval", "cron"))
+        ):
+            try:
+                trigger = workflow_trigger(wf)
+            except ValueError as e:  # CronError included
+                log.warning("workflow %s: %s", wf.id, e)
+                continue
+            if trigger is None:
+                continue
+            key = f"wf:{wf.id}"
+            jobs[key] = Job(key, wf.name, trigger)
+            if wf.next_run_at is None:
+                wf.next_run_at = trigger.next_after(now)
+            due[key] = wf.next_run_at
+        if self.graphs:
+            for filename in list_graphs():
+                try:
+                    graph = load_graph(filename)
+                    trigger = graph_trigger(graph, self.default_tz)
+                except (OSError, ValueError) as e:
+                    log.warning("graph %s: %s", filename, e)
+                    continue
+                if trigger is None:
+                    continue
+                key = f"graph:{filename}"
+                jobs[key] = Job(key, str(graph.get("name") or filename), trigger)
+                state = db.get(ScheduleState, key)
+                if state is None:
+                    state = ScheduleState(key=key, next_run_at=trigger.next_after(now))
+                    db.add(state)
+                due[key] = state.next_run_at
+        try:
+            db.commit()
+        except IntegrityError:  # another scheduler created the same schedule_state row
+            db.rollback()
+            return self.load_jobs(db)
+        self._jobs = jobs
+        return due
+
+    def enqueue(self, db: Session, key: str, now: datetime) -> Optional[datetime]:
+        """Turn a due job into slot rows, unless another scheduler got there first; returns next_run_at."""
+        job = self._jobs[key]
+        if key.startswith("wf:"):
+            model, where = WorkflowDef, WorkflowDef.id == int(key[3:])
+        else:
+            model, where = ScheduleState, ScheduleState.key == key
+        current = db.execute(select(model.next_run_at).where(where)).scalar()
+        if current is None or current > now:  # moved on by a UI edit, a manual run or another node
+            return current
+        slots, next_run_at = plan_slots(job.trigger, current, now, self.grace)
+        won = db.execute(
+            update(model).where(where, model.next_run_at == current).values(next_run_at=next_run_at)
+        ).rowcount
+        if not won:
+            db.rollback()
+            return db.execute(select(model.next_run_at).where(where)).scalar()
+        db.add_all(WorkflowSlot(job_key=key, slot_at=s, status="pending", attempts=0) for s in slots)
+        try:
+            db.commit()
+        except IntegrityError:  # the slot rows exist already
+            db.rollback()
+        return next_run_at
+
+    def claim(self, db: Session, limit: int, now: Optional[datetime] = None) -> List[Tuple[int, str, datetime]]:
+        """Lease up to `limit` claimable slots to this scheduler; returns (slot id, job key, slot)."""
+        now = now or self.clock()
+        S, earlier = WorkflowSlot, aliased(WorkflowSlot)
+        expired = and_(S.status == "running", S.lease_expires_at < now)
+        db.execute(
+            update(S).where(expired, S.attempts >= self.max_attempts)
+            .values(status="failed", finished_at=now, error=f"lease expired after {self.max_attempts} attempts")
+        )
+        blocked = exists().where(
+            earlier.job_key == S.job_key, earlier.id < S.id, earlier.status.in_(("pending", "running"))
+        )
+        # Without graphs, leave graph slots to a scheduler that loads them.
+        jobs = S.job_key.startswith("wf:") if not self.graphs else True
+        candidates = (
+            select(S.id).where(or_(S.status == "pending", expired), ~blocked, jobs)
+            .order_by(S.slot_at, S.id).limit(limit)
+            .with_for_update(skip_locked=True, of=S)
+        )
+        rows = db.execute(
+            update(S).where(S.id.in_(candidates), or_(S.status == "pending", expired))
+            .values(status="running", owner=self.owner, attempts=S.attempts + 1,
+                    lease_expires_at=now + self.lease, heartbeat_at=now)
+            .returning(S.id, S.job_key, S.slot_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return sorted((r.id, r.job_key, r.slot_at) for r in rows)
+
+    def _renew(self, slot_id: int, **values: Any) -> bool:
+        """Update a slot we hold; False when the lease was lost to another scheduler."""
+        db = self.session_factory()
+        try:
+            n = db.execute(
+                update(WorkflowSlot)
+                .where(WorkflowSlot.id == slot_id, WorkflowSlot.owner == self.owner,
+                       WorkflowSlot.status == "running")
+                .values(**values)
+            ).rowcount
+            db.commit()
+            return bool(n)
+        finally:
+            db.close()
+
+    def run_slot(self, slot_id: int, key: str, slot: datetime) -> Optional[int]:
+        """Execute a claimed slot, heartbeating its lease; returns the run id."""
+        stop = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop.wait(self.lease.total_seconds() / 3):
+                now = self.clock()
+                if not self._renew(slot_id, heartbeat_at=now, lease_expires_at=now + self.lease):
+                    log.warning("lost the lease on %s slot %s", key, slot.isoformat())
+                    return
+
+        beat = threading.Thread(target=heartbeat, name=f"avops-lease-{slot_id}", daemon=True)
+        beat.start()
+        run_id, error = None, None
+        try:
+            if key.startswith("wf:"):
+                db = self.session_factory()
+                try:
+                    run = run_now(db, int(key[3:]), trigger="schedule", scheduled_for=slot, store=self.store)
+                    run_id = getattr(run, "id", None)
+                finally:
+                    db.close()
+            else:
+                result = run_graph(key[6:], self.store if self.store is not None else make_runstore(),
+                                   trigger="schedule")
+                run_id, error = result["run_id"], result["error"]
+        except Exception as e:
+            log.exception("scheduled run of %s for %s failed", key, slot.isoformat())
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            stop.set()
+            beat.join()
+        now = self.clock()
+        if not self._renew(slot_id, status="failed" if error else "done", finished_at=now,
+                           run_id=run_id, error=error):
+            log.warning("%s slot %s finished after its lease was taken over", key, slot.isoformat())
+        if key.startswith("graph:"):
+            db = self.session_factory()
+            try:
+                db.execute(update(ScheduleState).where(ScheduleState.key == key).values(last_run_at=now))
+                db.commit()
+            finally:
+                db.close()
+        return run_id
+
+    def run_pending(self, db: Optional[Session] = None, *, now: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+        """One inline pass: enqueue due jobs and run every slot this scheduler can claim; returns (job key, slot)."""
+        own = db is None
+        db = db or self.session_factory()
+        try:
+            now = now or self.clock()
+            for key, next_run_at in sorted(self.load_jobs(db).items(), key=lambda kv: kv[1]):
+                if next_run_at <= now:
+                    self.enqueue(db, key, now)
+            ran: List[Tuple[str, datetime]] = []
+            while True:
+                claimed = self.claim(db, 1)  # lease from the current time, not the pass start
+                if not claimed:
+                    return ran
+                slot_id, key, slot = claimed[0]
+                self.run_slot(slot_id, key, slot)
+                ran.append((key, slot))
+        finally:
+            if own:
+                db.close()
+
+    # ---- Daemon ------------------------------------------------------------------
+    def start(self) -> threading.Thread:
+        """Run the scheduling loop on a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="avops-scheduler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self, refresh: bool = True) -> None:
+        """Re-read definitions now (e.g. after a workflow was edited)."""
+        self._refresh = self._refresh or refresh
+        self._wake.set()
+
+    def run_forever(self) -> None:
+        heap: List[Tuple[datetime, str]] = []
+        refresh_at = self.clock()
+        errors = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="avops-run") as pool:
+            while not self._stop.is_set():
+                now = self.clock()
+                db = self.session_factory()
+                claimed: List[Tuple[int, str, datetime]] = []
+                try:
+                    if self._refresh or now >= refresh_at:
+                        self._refresh = False
+                        heap = [(t, k) for k, t in self.load_jobs(db).items() if t is not None]
+                        heapq.heapify(heap)
+                        refresh_at = now + timedelta(seconds=self.refresh_s)
+                    while heap and heap[0][0] <= now:
+                        _, key = heapq.heappop(heap)
+                        next_run_at = self.enqueue(db, key, now)
+                        if next_run_at is not None:
+                            heapq.heappush(heap, (next_run_at, key))
+                    with self._lock:
+                        free = self.workers - self._active
+                    claimed = self.claim(db, free, now) if free > 0 else []
+                    errors = 0
+                except Exception:
+                    # A database error must not end the daemon: back off, then rebuild the
+                    # heap, since a job popped before the error was not pushed back.
+                    log.exception("scheduler pass failed")
+                    db.rollback()
+                    errors += 1
+                    self._refresh = True
+                    backoff = min(self.poll_s * 2 ** errors, self.refresh_s)
+                    if self._stop.wait(backoff):
+                        break
+                    continue
+                finally:
+                    db.close()
+                for slot_id, key, slot in claimed:
+                    with self._lock:
+                        self._active += 1
+                    pool.submit(self.run_slot, slot_id, key, slot).add_done_callback(self._finished)
+                poll_at = now + timedelta(seconds=self.poll_s)
+                wake_at = min(refresh_at, poll_at, heap[0][0]) if heap else min(refresh_at, poll_at)
+                self._wake.wait(max(0.0, (wake_at - self.clock()).total_seconds()))
+                self._wake.clear()
+
+    def _finished(self, _future: Any) -> None:
+        with self._lock:
+            self._active -= 1
+        self._wake.set()  # a queued slot of the same job may be claimable now
@@ -6,7 +6,8 @@ from sqlalchemy.orm import Session
 from uuid import uuid4
 
 from ..db.models import WorkflowDef
-from .engine import execute_recipe_run
+from .cron import CronSchedule
+from .engine import execute_recorded_run
 from core.runstore_factory import make_runstore  # shared store
 
 def list_workflows(db: Session):
@@ -18,8 +19,16 @@ def _workflow_name_exists(db: Session, name: str, *, exclude_id: Optional[int] =
         q = q.filter(WorkflowDef.id != exclude_id)
     return q.first() is not None
 
+def _next_cron_run(wf: WorkflowDef) -> Optional[datetime]:
+    """Next fire time of a cron workflow; raises ValueError (CronError) on a bad expression."""
+    if not wf.cron:
+        raise ValueError("Cron workflows need a cron expression.")
+    return CronSchedule.parse(wf.cron, wf.timezone).next_after(datetime.utcnow())
+
 def create_workflow(db: Session, name: str, agent_id: int, recipe_id: int,
-                    trigger_type: str = "manual", trigger_value: Optional[int] = None):
+                    trigger_type: str = "manual", trigger_value: Optional[int] = None,
+                    cron: Optional[str] = None, timezone: Optional[str] = None,
+                    misfire_policy: Optional[str] = None):
     if _workflow_name_exists(db, name):
         raise ValueError(f"Workflow '{name}' already exists.")
     wf = WorkflowDef(
@@ -28,11 +37,16 @@ def create_workflow(db: Session, name: str, agent_id: int, recipe_id: int,
         recipe_id=recipe_id,
         trigger_type=trigger_type,
         trigger_value=trigger_value,
+        cron=cron,
+        timezone=timezone,
+        misfire_policy=misfire_policy,
         status="yellow",
         enabled=1,
     )
     if trigger_type == "interval" and trigger_value:
         wf.next_run_at = datetime.utcnow() + timedelta(minutes=trigger_value)
+    if trigger_type == "cron":
+        wf.next_run_at = _next_cron_run(wf)
     db.add(wf)
     db.commit()
     db.refresh(wf)
@@ -59,6 +73,8 @@ def update_workflow(db: Session, wf_id: int, **kwargs):
             wf.next_run_at = None
         if k == "trigger_type" and v == "interval" and kwargs.get("trigger_value"):
             wf.next_run_at = datetime.utcnow() + timedelta(minutes=int(kwargs["trigger_value"]))
+    if wf.trigger_type == "cron" and any(kwargs.get(k) is not None for k in ("trigger_type", "cron", "timezone")):
+        wf.next_run_at = _next_cron_run(wf)
     if recipe_changed:
         wf.last_run_at = None
         wf.next_run_at = None
@@ -85,61 +101,52 @@ def compute_status(wf: WorkflowDef) -> str:
         return "yellow"
     return "red"
 
-def run_now(db: Session, wf_id: int):
+def run_now(db: Session, wf_id: int, *, trigger: str = "manual",
+            scheduled_for: Optional[datetime] = None, store=None):
     """
     Trigger a workflow immediately and record it in RunStore.
-    The RunStore entry will have status='running' during execution and
-    update to 'success' or 'failed' on completion.
+    The run, its phase evidence and final status are written to the run
+    store in one transaction (see engine.execute_recorded_run); the app
+    database only gets the workflow's schedule/status update.
+    Runs dispatched by the scheduler pass the slot as `scheduled_for`; the
+    scheduler owns `next_run_at` for those, so it is left alone.
     """
     wf = db.query(WorkflowDef).filter(WorkflowDef.id == wf_id).first()
     if not wf:
         return None
 
-    store = make_runstore()
+    store = store or make_runstore()
+    meta = {"workflow_name": wf.name}
+    if scheduled_for is not None:
+        meta["scheduled_for"] = scheduled_for.isoformat()
 
-    # Use workflow_run context manager to record start and finish in RunStore
     # workflow_id is stored as a string; using wf.id ensures uniqueness.
-    with store.workflow_run(
-        workflow_id=str(wf.id),
-        name=wf.name,
+    run = execute_recorded_run(
+        db,
+        store,
         agent_id=wf.agent_id,
         recipe_id=wf.recipe_id,
-        trigger="manual",
-        meta={"workflow_name": wf.name},
-    ) as rec:
-        # Execute the recipe (primary DB run)
-        run = execute_recipe_run(db, agent_id=wf.agent_id, recipe_id=wf.recipe_id)
-        # Optionally log a step summary in RunStore
-        rec.step(
-            phase="act",
-            message=f"Executed recipe {run.recipe_id}",
-            payload=None,
-            result={"status": "completed"},
-        )
+        workflow_id=str(wf.id),
+        name=wf.name,
+        trigger=trigger,
+        meta=meta,
+    )
 
     # Update workflow timestamps/status after run
     wf.last_run_at = datetime.utcnow()
     wf.status = compute_status(wf)
-    if wf.trigger_type == "interval" and wf.trigger_value:
+    if scheduled_for is None and wf.trigger_type == "interval" and wf.trigger_value:
         wf.next_run_at = datetime.utcnow() + timedelta(minutes=wf.trigger_value)
     db.commit()
     db.refresh(wf)
     return run
 
 def tick(db: Session) -> int:
-    now = datetime.utcnow()
-    due = (
-        db.query(WorkflowDef)
-        .filter(
-            WorkflowDef.enabled == 1,
-            WorkflowDef.trigger_type == "interval",
-            WorkflowDef.next_run_at != None,  # noqa: E711
-            WorkflowDef.next_run_at <= now,
-        )
-        .all()
-    )
-    count = 0
-    for wf in due:
-        run_now(db, wf.id)
-        count += 1
-    return count
+    """
+    Run the due interval/cron workflows once, inline, with the scheduler's
+    slot and misfire rules.  The scheduler daemon (scripts/scheduler.py)
+    does this continuously; this is the manual fallback.
+    """
+    from .scheduler import Scheduler  # the scheduler imports this module
+
+    return len({key for key, _ in Scheduler(graphs=False).run_pending(db)})
@@ -166,7 +166,7 @@ def _handle_sop(cmd: SlashCommand) -> tuple[str, str, list, list, str, Optional[
 
     with get_session() as db:  # type: ignore
         a, r = attach_recipe_to_agent(db, agent_name, recipe_name, yml)
-        run = execute_recipe_run(db, agent_id=a.id, recipe_id=r.id)
+        run = execute_recipe_run(db, agent_id=a.id, recipe_id=r.id, batch=True)
         return a.name, r.name, tools, created, yml, getattr(run, "id", None)
 
 def _render_bundle_for_sop(cmd: SlashCommand, orchestrator_name: str) -> None:
@@ -300,7 +300,7 @@ def _handle_agent_run(cmd: SlashCommand) -> str:
             raise SlashCommandError(f"Recipe '{recipe_name}' was not found.")
 
         with st.spinner("Running workflow..."):
-            run = execute_recipe_run(db, agent_id=agent.id, recipe_id=recipe.id)
+            run = execute_recipe_run(db, agent_id=agent.id, recipe_id=recipe.id, batch=True)
     rid = getattr(run, "id", None)
     if rid is None:
         return f"Triggered run for **{agent.name}** using recipe **{recipe.name}**."
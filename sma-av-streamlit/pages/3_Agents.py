@@ -119,7 +119,7 @@ with get_session() as db:  # type: ignore
                     else:
                         try:
                             with st.spinner("Executing run..."):
-                                run = execute_recipe_run(db, agent_id=a.id, recipe_id=rec.id)
+                                run = execute_recipe_run(db, agent_id=a.id, recipe_id=rec.id, batch=True)
                             st.toast(f"Run {getattr(run, 'id', '—')} completed.", icon="✅")
                         except Exception as e:
                             st.error(f"Run failed: {type(e).__name__}: {e}")
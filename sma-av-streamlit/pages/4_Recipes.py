@@ -17,7 +17,7 @@ from core.db.models import Recipe
 from core.db.session import get_session
 from core.recipes.service import load_recipe_dict, save_recipe_yaml
 from core.recipes.validator import validate_yaml_text
-from core.runs_store import RunStore
+from core.runstore_factory import make_runstore
 from core.ui.page_tips import show as show_tip
 import io, zipfile
 from typing import List, Dict, Any
@@ -148,14 +148,17 @@ RECIPES_DIR = os.path.join(os.getcwd(), "recipes")
 os.makedirs(RECIPES_DIR, exist_ok=True)
 
 
-def _make_store() -> RunStore:
-    """Create a RunStore instance for accessing run metrics."""
-    db_path = Path(__file__).resolve().parents[1] / "avops.db"
+def _make_store():
+    """Return the shared run store used for run metrics."""
+    return make_runstore()
+
+
+def _recipe_metrics_compat(store, recipe_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """All recipe metrics in one query when the store supports it; else one call per recipe."""
     try:
-        return RunStore(db_path=db_path)
-    except TypeError:
-        # Fall back to default in-memory store when db_path is not accepted
-        return RunStore()
+        return store.recipe_metrics_bulk(recipe_ids)
+    except AttributeError:
+        return {rid: store.recipe_metrics(rid) for rid in recipe_ids}
 
 
 def _git_commit_hint(path: str) -> str:
@@ -236,6 +239,7 @@ with get_session() as db:  # type: ignore
 
     if not recipes:
         st.info("No recipes match your filter yet.")
+    all_metrics = _recipe_metrics_compat(store, [r.id for r in recipes])
     for r in recipes:
         with st.expander(r.name):
             # Determine the on-disk path of the YAML file
@@ -247,8 +251,8 @@ with get_session() as db:  # type: ignore
                 st.error(f"Unable to read {r.yaml_path}: {e}")
                 continue
 
-            # Fetch run metrics for this recipe
-            metrics = store.recipe_metrics(r.id)
+            # Run metrics for this recipe (fetched for the whole list above)
+            metrics = all_metrics.get(r.id, {})
             success = metrics.get("success_rate", 0.0)
             dot = "🟢" if success >= 80 else ("🟡" if success >= 50 else "🔴")
             updated_at = (
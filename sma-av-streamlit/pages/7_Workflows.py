@@ -9,10 +9,12 @@ from core.workflow.service import (
     list_workflows, create_workflow, update_workflow, delete_workflow,
     run_now, compute_status, tick
 )
+from core.workflow.scheduler import MISFIRE_POLICIES
 from core.ui.page_tips import show as show_tip
 from core.io.port import export_zip, import_zip
 from datetime import datetime
 from pathlib import Path
+import threading
 
 PAGE_KEY = "Workflows"
 show_tip(PAGE_KEY)
@@ -25,9 +27,13 @@ with get_session() as db:  # keep DB open for the whole page render
     existing_names = {wf.name.lower(): wf.id for wf in wfs}
 
     colL, colR = st.columns([1, 3])
-    if colL.button("⏱️ Tick scheduler"):
-        n = tick(db)
-        st.toast(f"Ticked. Ran {n} workflow(s).")
+    if colL.button("⏱️ Tick scheduler", help="Run due workflows now in the background. "
+                   "The scheduler daemon (python scripts/scheduler.py) does this continuously."):
+        def _tick_in_background():
+            with get_session() as bg:
+                tick(bg)
+        threading.Thread(target=_tick_in_background, name="avops-tick", daemon=True).start()
+        st.toast("Dispatched due workflows in the background.")
 
     # --- New Workflow (ID-based, avoid ORM instances in widget state) ---
     st.subheader("New Workflow")
@@ -54,8 +60,15 @@ with get_session() as db:  # keep DB open for the whole page render
             ) if recipe_opts else None
         )
 
-        trig = st.selectbox("Trigger", ["manual", "interval"])
+        trig = st.selectbox("Trigger", ["manual", "interval", "cron"])
         minutes = st.number_input("Interval minutes", min_value=1, value=60) if trig == "interval" else None
+        cron = tz = misfire = None
+        if trig == "cron":
+            cron = st.text_input("Cron expression", value="0 6 * * *", help="minute hour day month weekday")
+            tz = st.text_input("Timezone", value="UTC", help="IANA name, e.g. America/New_York")
+        if trig != "manual":
+            misfire = st.selectbox("Missed runs", MISFIRE_POLICIES,
+                                   help="run_once: one catch-up run · run_all: every missed slot · skip: none")
 
         ok = st.form_submit_button("Create Workflow")
 
@@ -89,6 +102,9 @@ with get_session() as db:  # keep DB open for the whole page render
                     recipe_id=int(recipe_id),
                     trigger_type=trig,
                     trigger_value=int(minutes) if minutes else None,
+                    cron=cron,
+                    timezone=tz,
+                    misfire_policy=misfire,
                 )
                 st.success("Workflow created.")
                 st.rerun()
@@ -111,7 +127,7 @@ with get_session() as db:  # keep DB open for the whole page render
                 top[0].markdown(
                     f"""**{wf.name}**
 Agent ID: `{wf.agent_id}` · Recipe ID: `{wf.recipe_id}`
-Trigger: `{wf.trigger_type}` {wf.trigger_value or ''}"""
+Trigger: `{wf.trigger_type}` {wf.cron or wf.trigger_value or ''} {wf.timezone or ''}"""
                 )
                 top[1].markdown(
                     f"<div style='text-align:right;font-size:24px'>{color}</div>",
@@ -4,7 +4,9 @@ pages/8_Dashboard.py
 
 An enhanced dashboard for AV AI Ops that provides a live view of workflow
 runs along with interactive controls for filtering, pagination, step/artefact
-exploration and a quick summary of current workflows.  The page makes
+exploration and a quick summary of current workflows.  Store reads are kept
+in session state and reused on reruns (e.g. auto-refresh) until the store's
+change feed (`changes_since`) reports new writes.  The page makes
 minimal assumptions about the underlying run log store by delegating to a
 factory (`make_runstore`) that returns a compatible interface.  It falls
 back gracefully when optional dependencies (e.g. streamlit_autorefresh)
@@ -13,14 +15,18 @@ aren't installed.
 
 from __future__ import annotations
 
+import io
 import json
-import math
+import tempfile
+import zipfile
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import pandas as pd
 import streamlit as st
 
+from core.runs_export import export_runs
 from core.runstore_factory import make_runstore
 from core.db.session import get_session
 from core.workflow.service import list_workflows, compute_status
@@ -44,7 +50,11 @@ store = make_runstore()
 with st.sidebar:
     st.header("Filters")
     win = st.selectbox("Time window", ["24h", "7d", "30d", "All"], index=0)
-    statuses = st.multiselect("Status", ["running", "success", "failed"], default=["running", "success", "failed"])
+    statuses = st.multiselect(
+        "Status", ["running", "success", "partial", "failed"], default=["running", "success", "partial", "failed"]
+    )
+    room_filter = st.text_input("Room", placeholder="e.g. ZR-101").strip()
+    site_filter = st.text_input("Site", placeholder="e.g. HQ").strip()
     page_size = st.slider("Runs per page", min_value=5, max_value=50, value=10, step=5)
     auto = st.toggle("Auto-refresh (5s)", value=False)
     st.caption("Tip: If nothing appears, run a Workflow or /sop from Chat.")
@@ -70,6 +80,10 @@ elif win == "7d":
     since = now - timedelta(days=7)
 elif win == "30d":
     since = now - timedelta(days=30)
+# Promoted meta keys (indexed columns in the RunStore)
+meta_filter: Dict[str, str] = {
+    k: v for k, v in (("room_id", room_filter), ("site", site_filter)) if v
+}
 
 
 # ---------------------------------------------------------------------------
@@ -88,8 +102,16 @@ def _to_dt(value: Any) -> Optional[datetime]:
         return None
 
 
-def _stats_compat(store, *, hours: Optional[int] = None, since: Optional[datetime] = None) -> Dict[str, Any]:
-    """Call store.stats with an available signature."""
+def _stats_compat(
+    store, *, hours: Optional[int] = None, since: Optional[datetime] = None, meta: Optional[Dict[str, str]] = None
+) -> Optional[Dict[str, Any]]:
+    """Call store.stats with an available signature; None when the store cannot filter by `meta`."""
+    if meta:
+        # Falling back to unfiltered stats would show fleet-wide KPIs under a Room/Site filter.
+        try:
+            return store.stats(since=since, meta=meta)
+        except TypeError:
+            return None
     if hours is not None:
         try:
             return store.stats(hours=hours)
@@ -103,23 +125,37 @@ def _stats_compat(store, *, hours: Optional[int] = None, since: Optional[datetim
     return store.stats()
 
 
-def _latest_runs_compat(store, *, limit: int, statuses: List[str], since: Optional[datetime]) -> List[Dict[str, Any]]:
-    """Fetch runs from the store using whatever API it supports."""
-    # Try the current RunStore API first
+def _latest_runs_compat(
+    store,
+    *,
+    limit: int,
+    statuses: List[str],
+    since: Optional[datetime],
+    cursor: Optional[Any] = None,
+    meta: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """Fetch one page of runs (older than `cursor`) using whatever API the store supports."""
+    # Try the keyset-paginated RunStore API first
     try:
-        rows = store.latest_runs(limit=limit, status=statuses)
+        rows = store.latest_runs(
+            limit=limit, status=statuses, since=since, cursor=cursor, **({"meta": meta} if meta else {})
+        )
     except Exception:
-        # Fallback to alternative methods for other store implementations
+        # Fallback to alternative methods for other store implementations;
+        # these return a bounded window which is paged through locally below.
         try:
-            hours = None
-            if since:
-                hours = max(1, int((datetime.now(timezone.utc) - since).total_seconds() // 3600))
-            rows = store.recent(limit=limit, hours=hours or 24)
+            rows = store.latest_runs(limit=200, status=statuses)
         except Exception:
             try:
-                rows = store.list_runs()
+                hours = None
+                if since:
+                    hours = max(1, int((datetime.now(timezone.utc) - since).total_seconds() // 3600))
+                rows = store.recent(limit=200, hours=hours or 24)
             except Exception:
-                rows = []
+                try:
+                    rows = store.list_runs()
+                except Exception:
+                    rows = []
 
     out: List[Dict[str, Any]] = []
     for r in rows:
@@ -160,7 +196,26 @@ def _latest_runs_compat(store, *, limit: int, statuses: List[str], since: Option
         return "unknown"
 
     out = [r for r in out if _status_of(r) in statuses]
-    return out
+    # Filter by room/site if the store didn't handle it
+    if meta:
+        out = [r for r in out if _meta_matches(r, meta)]
+
+    # Apply the cursor locally if the store could not
+    if cursor is not None:
+        def _before_cursor(rr: Dict[str, Any]) -> bool:
+            try:
+                return int(rr.get("id") or rr.get("run_id")) < int(cursor)
+            except (TypeError, ValueError):
+                return False
+
+        out = [r for r in out if _before_cursor(r)]
+    return out[:limit]
+
+
+def _meta_matches(r: Dict[str, Any], meta: Dict[str, str]) -> bool:
+    """True when the run's meta has every filtered key with the given value."""
+    run_meta = r.get("meta") or {}
+    return all(str(run_meta.get(k)) == v for k, v in meta.items())
 
 
 def _normalize_run(r: Dict[str, Any]) -> Dict[str, Any]:
@@ -216,10 +271,47 @@ def _normalize_run(r: Dict[str, Any]) -> Dict[str, Any]:
         "started_at": started,
         "finished_at": finished,
         "error": r.get("error"),
+        "children": r.get("children"),
         "raw": r,
     }
 
 
+def _children_label(children: Optional[Dict[str, Any]]) -> str:
+    """Compact summary of a fan-out parent's child runs, e.g. "498 ✓ · 2 ✗ / 500"."""
+    if not children:
+        return ""
+    label = f"{children.get('success', 0)} ✓ · {children.get('failed', 0)} ✗"
+    if children.get("running"):
+        label += f" · {children['running']} running"
+    return f"{label} / {children.get('total', 0)}"
+
+
+def _child_runs_compat(store, parent_id: Any, *, cursor: Any, limit: int) -> List[Dict[str, Any]]:
+    """One keyset page of a parent's child runs; [] when the store has no parent/child runs."""
+    try:
+        return store.latest_runs(limit=limit, cursor=cursor, parent_id=parent_id)
+    except TypeError:
+        return []
+
+
+def _trend_compat(
+    store, *, since: Optional[datetime], statuses: List[str], df: pd.DataFrame, meta: Dict[str, str]
+) -> pd.DataFrame:
+    """Hourly run counts from the store's rollups, or from the fetched runs as a fallback."""
+    try:
+        buckets = store.trend(since=since, status=statuses, **({"meta": meta} if meta else {}))
+        trend = pd.DataFrame(buckets, columns=["bucket", "runs"])
+        trend["started_at"] = pd.to_datetime(trend["bucket"], utc=True)
+        return trend[["started_at", "runs"]]
+    except Exception:
+        return (
+            df.groupby(df["started_at"].dt.floor("H"))["id"]
+            .count()
+            .reset_index()
+            .rename(columns={"id": "runs"})
+        )
+
+
 def _run_details_compat(store, run_id: Any) -> Dict[str, Any]:
     """Fetch detailed run data from the store, with fallback."""
     try:
@@ -228,6 +320,148 @@ def _run_details_compat(store, run_id: Any) -> Dict[str, Any]:
         return {"id": run_id, "steps": [], "artifacts": []}
 
 
+def _run_header_compat(store, run_id: Any) -> Dict[str, Any]:
+    """Fetch a run without its steps/artifacts when the store supports it."""
+    try:
+        return store.get_run(run_id)
+    except Exception:
+        return _run_details_compat(store, run_id)
+
+
+def _run_items_compat(store, run_id: Any, kind: str, *, after_id: Any, limit: int) -> List[Dict[str, Any]]:
+    """Fetch one keyset page of a run's `steps` or `artifacts`, with fallback."""
+    try:
+        return getattr(store, f"run_{kind}")(run_id, after_id=after_id, limit=limit)
+    except Exception:
+        items = _run_details_compat(store, run_id).get(kind, [])
+        if after_id is not None:
+            items = [x for x in items if (x.get("id") or 0) > after_id]
+        return items[:limit]
+
+
+def _keyset_cursor(state_key: str) -> Any:
+    """Current cursor of the keyset pager stored under `state_key` (None = first page)."""
+    stack = st.session_state.setdefault(state_key, [])
+    return stack[-1] if stack else None
+
+
+def _keyset_nav(state_key: str, next_cursor: Any, *, prev_label: str, next_label: str) -> None:
+    """Prev/next buttons over the stack of cursors kept in session_state[state_key]."""
+    stack = st.session_state.setdefault(state_key, [])
+    c_prev, c_next, _ = st.columns([1, 1, 4])
+    if c_prev.button(prev_label, disabled=not stack, key=f"{state_key}_prev"):
+        stack.pop()
+        st.rerun()
+    if c_next.button(next_label, disabled=next_cursor is None, key=f"{state_key}_next"):
+        stack.append(next_cursor)
+        st.rerun()
+
+
+def _changes_compat(store, seq: Optional[int]) -> Optional[Dict[str, Any]]:
+    """All changes after `seq` from the store's change feed; None when it has none."""
+    try:
+        feed = store.changes_since(seq)
+        runs, steps = list(feed.get("runs", [])), list(feed.get("steps", []))
+        while feed.get("more"):
+            feed = store.changes_since(feed["seq"])
+            runs += feed.get("runs", [])
+            steps += feed.get("steps", [])
+        return {"seq": feed["seq"], "runs": runs, "steps": steps}
+    except Exception:
+        return None
+
+
+def _search_compat(store, query: str, *, since: Optional[datetime]) -> Optional[List[Dict[str, Any]]]:
+    """Ranked full-text hits from the store; None when it cannot search."""
+    try:
+        return store.search(query, since=since, limit=50)
+    except Exception:
+        return None
+
+
+def _slowest_steps_compat(store, *, since: Optional[datetime]) -> Optional[List[Dict[str, Any]]]:
+    """Per-(recipe, step, tool) latency percentiles; None when the store has no step timings."""
+    try:
+        return store.slowest_steps(since=since, limit=10)
+    except AttributeError:
+        return None
+
+
+def _export_zip_compat(store, *, since: Optional[datetime]) -> Optional[bytes]:
+    """Parquet export of the window (runs/steps/artifacts) as zip bytes; None when unavailable."""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            export_runs(store, Path(tmp), since=since)
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, "w") as zf:  # parquet parts are already compressed
+                for f in sorted(Path(tmp).rglob("*.parquet")):
+                    zf.write(f, f.relative_to(tmp).as_posix())
+            return buf.getvalue()
+    except (AttributeError, ImportError):  # store without SQL tables, or no pyarrow
+        return None
+
+
+def _apply_run_deltas(
+    cached: List[Dict[str, Any]],
+    changed: Dict[Any, Dict[str, Any]],
+    statuses: List[str],
+    limit: int,
+    meta: Dict[str, str],
+) -> Optional[List[Dict[str, Any]]]:
+    """Fold changed runs into a cached first page of runs; None when it has to be refetched."""
+    by_id = {r.get("id"): r for r in cached}
+    floor = min(by_id) if len(cached) >= limit and by_id else None
+    for rid, r in changed.items():
+        if r.get("parent_id") is not None:
+            continue  # child runs are listed under their parent
+        if r.get("status") in statuses and _meta_matches(r, meta):
+            if floor is None or rid in by_id or rid > floor:
+                by_id[rid] = r
+        elif rid in by_id:
+            return None  # left the filter; the page needs the next older run
+    return sorted(by_id.values(), key=lambda r: r.get("id") or 0, reverse=True)[:limit]
+
+
+def _cached_read(key: Any, fn):
+    """Store reads are reused across reruns until the change feed reports a write."""
+    reads = st.session_state["dash_view"]["reads"]
+    if key not in reads:
+        reads[key] = fn()
+    return reads[key]
+
+
+# ---------------------------------------------------------------------------
+# Change feed: skip store reads entirely when nothing was written
+# ---------------------------------------------------------------------------
+view = st.session_state.setdefault("dash_view", {"seq": None, "reads": {}})
+feed = _changes_compat(store, view["seq"])
+if feed is None or view["seq"] is None or len(view["reads"]) > 500:
+    view["reads"].clear()  # no feed (always read fresh), first visit, or cache too large
+elif feed["runs"]:
+    changed = {r.get("id"): r for r in feed["runs"]}
+    for key in list(view["reads"]):
+        kind = key[0]
+        if kind in ("stats", "trend", "search", "slow_steps"):
+            del view["reads"][key]
+        elif kind == "runs":
+            _, k_window, k_statuses, k_limit, k_cursor = key
+            merged = None
+            if k_cursor is None:
+                merged = _apply_run_deltas(
+                    view["reads"][key], changed, list(k_statuses), k_limit, dict(k_window[2])
+                )
+            if merged is None:
+                del view["reads"][key]
+            else:
+                view["reads"][key] = merged
+        elif key[1] in changed:  # header/steps/artifacts of a run that changed
+            del view["reads"][key]
+if feed is not None:
+    view["seq"] = feed["seq"]
+# Sliding windows ("24h" etc.) are re-read at least once per hour.
+window_key = (win, now.strftime("%Y%m%d%H"), tuple(sorted(meta_filter.items())))
+
+
 # ---------------------------------------------------------------------------
 # KPI section
 # ---------------------------------------------------------------------------
@@ -235,7 +469,12 @@ hours_for_stats = None
 if since:
     hours_for_stats = max(1, int((datetime.now(timezone.utc) - since).total_seconds() // 3600))
 
-stats = _stats_compat(store, hours=hours_for_stats, since=since)
+stats = _cached_read(
+    ("stats", window_key),
+    lambda: _stats_compat(store, hours=hours_for_stats, since=since, meta=meta_filter),
+)
+filter_unsupported = stats is None
+stats = stats or {}
 runs_total = stats.get("runs") or stats.get("count") or 0
 success_rate = stats.get("success_rate")
 if success_rate is None:
@@ -248,20 +487,78 @@ if p95_ms is None:
 last_error = stats.get("last_error") or ""
 
 c1, c2, c3, c4 = st.columns(4)
-c1.metric("Runs", f"{runs_total}")
-c2.metric("Success rate", f"{success_rate:.1f}%")
-c3.metric("p95 duration", f"{p95_ms:.0f} ms")
-c4.metric("Last error", last_error or "—")
+if filter_unsupported:
+    st.warning("This run store cannot filter KPIs by room or site; clear the filter to see fleet-wide numbers.")
+    for col, label in ((c1, "Runs"), (c2, "Success rate"), (c3, "p95 duration"), (c4, "Last error")):
+        col.metric(label, "—")
+else:
+    c1.metric("Runs", f"{runs_total}")
+    c2.metric("Success rate", f"{success_rate:.1f}%")
+    c3.metric("p95 duration", f"{p95_ms:.0f} ms")
+    c4.metric("Last error", last_error or "—")
 
 
 # ---------------------------------------------------------------------------
-# Recent runs table with pagination
+# Full-text search over errors, step messages and artifacts
 # ---------------------------------------------------------------------------
-rows_raw = _latest_runs_compat(store, limit=200, statuses=statuses, since=since)
+search_query = st.text_input(
+    "🔍 Search runs", placeholder="e.g. HDMI EDID reload failed", key="run_search"
+).strip()
+if search_query:
+    hits = _cached_read(
+        ("search", window_key, search_query), lambda: _search_compat(store, search_query, since=since)
+    )
+    if hits is None:
+        st.info("This run store does not support search.")
+    elif not hits:
+        st.caption("No matches in this window.")
+    else:
+        df_hits = pd.DataFrame(
+            [
+                {
+                    "run": h.get("run_id"),
+                    "name": h.get("name"),
+                    "status": h.get("status"),
+                    "match in": h.get("kind"),
+                    "snippet": h.get("snippet"),
+                    "started_at": _to_dt(h.get("started_at")),
+                    "Details": f"/Run_Detail?run_id={h.get('run_id')}",
+                }
+                for h in hits
+            ]
+        )
+        st.caption(f"{len(hits)} best match(es), most relevant first.")
+        st.dataframe(
+            df_hits,
+            use_container_width=True,
+            hide_index=True,
+            column_config={"Details": st.column_config.LinkColumn("Details", display_text="Open")},
+        )
+
+
+# ---------------------------------------------------------------------------
+# Recent runs table with keyset pagination
+# ---------------------------------------------------------------------------
+page_size = max(1, int(page_size))
+filters_key = (win, tuple(statuses), page_size, tuple(sorted(meta_filter.items())))
+if st.session_state.get("runs_filters") != filters_key:
+    st.session_state["runs_filters"] = filters_key
+    st.session_state["runs_cursors"] = []
+
+# Fetch one extra row to know whether an older page exists
+runs_cursor = _keyset_cursor("runs_cursors")
+rows_raw = _cached_read(
+    ("runs", window_key, tuple(statuses), page_size + 1, runs_cursor),
+    lambda: _latest_runs_compat(
+        store, limit=page_size + 1, statuses=statuses, since=since, cursor=runs_cursor, meta=meta_filter
+    ),
+)
 rows = [_normalize_run(r) for r in rows_raw]
 
 # Drop runs with no timestamp to avoid pandas sort errors
 rows = [r for r in rows if r["started_at"] is not None]
+has_older = len(rows) > page_size
+rows = rows[:page_size]
 
 if not rows:
     st.info("No runs in this window. Trigger a workflow from **🧩 Workflows** or use **/sop** in **💬 Chat**.")
@@ -276,40 +573,17 @@ records = [
         "agent_id": r["agent_id"],
         "recipe_id": r["recipe_id"],
         "duration (ms)": round(float(r["duration_ms"] or 0.0), 2),
+        "children": _children_label(r["children"]),
         "started_at": r["started_at"],
     }
     for r in rows
 ]
-df_all = pd.DataFrame(records)
-df_all.sort_values("started_at", ascending=False, inplace=True)
-
-total_runs = len(df_all)
-page_size = max(1, int(page_size))
-total_pages = max(1, math.ceil(total_runs / page_size))
-if "runs_page" not in st.session_state:
-    st.session_state["runs_page"] = 1
-if st.session_state["runs_page"] > total_pages:
-    st.session_state["runs_page"] = total_pages
-
-page = int(
-    st.number_input(
-        "Page",
-        min_value=1,
-        max_value=total_pages,
-        value=st.session_state["runs_page"],
-        step=1,
-        key="runs_page_widget",
-    )
-)
-st.session_state["runs_page"] = page
-
-start_idx = (page - 1) * page_size
-end_idx = min(start_idx + page_size, total_runs)
-df_page = df_all.iloc[start_idx:end_idx].copy()
+df_page = pd.DataFrame(records)
 df_page["Details"] = df_page["id"].apply(lambda rid: f"/Run_Detail?run_id={rid}")
+page = len(st.session_state["runs_cursors"]) + 1
 
 st.subheader("Recent Runs")
-st.caption(f"Showing runs {start_idx + 1}-{end_idx} of {total_runs}.")
+st.caption(f"Page {page} · showing {len(rows)} run(s), newest first.")
 st.data_editor(
     df_page,
     use_container_width=True,
@@ -319,38 +593,88 @@ st.data_editor(
         "Details": st.column_config.LinkColumn("Details", display_text="Open"),
     },
 )
+_keyset_nav(
+    "runs_cursors", rows[-1]["id"] if has_older else None, prev_label="◀ Newer", next_label="Older ▶"
+)
+
+with st.expander("⬇️ Export this window (Parquet)"):
+    st.caption("Runs, steps and artifacts partitioned by start date, for pandas/DuckDB/Spark.")
+    if st.button("Prepare export", key="export_prepare"):
+        with st.spinner("Exporting runs…"):
+            st.session_state["export_zip"] = (window_key, _export_zip_compat(store, since=since))
+    prepared = st.session_state.get("export_zip")
+    if prepared and prepared[0] == window_key:
+        if prepared[1] is None:
+            st.info("Export needs pyarrow and a SQL run store backend.")
+        else:
+            st.download_button(
+                "Download runs.zip",
+                data=prepared[1],
+                file_name=f"runs-{win}.zip",
+                mime="application/zip",
+            )
 
 
 # ---------------------------------------------------------------------------
 # Trend chart
 # ---------------------------------------------------------------------------
 st.subheader("Run Trend")
-trend = (
-    df_all.groupby(df_all["started_at"].dt.floor("H"))["id"]
-    .count()
-    .reset_index()
-    .rename(columns={"id": "runs"})
+trend = _cached_read(
+    ("trend", window_key, tuple(statuses)),
+    lambda: _trend_compat(store, since=since, statuses=statuses, df=df_page, meta=meta_filter),
 )
 st.line_chart(trend.set_index("started_at"))
 
 
+# ---------------------------------------------------------------------------
+# Slowest steps across the fleet (timed with Recorder.span)
+# ---------------------------------------------------------------------------
+slow_steps = _cached_read(("slow_steps", window_key), lambda: _slowest_steps_compat(store, since=since))
+if slow_steps:
+    st.subheader("Slowest Steps")
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {
+                    "recipe": r.get("recipe_id"),
+                    "step": r.get("step_id"),
+                    "tool": r.get("tool") or "—",
+                    "steps": r.get("steps"),
+                    "failed": r.get("failures"),
+                    "avg ms": round(r.get("avg_ms") or 0.0),
+                    "p50 ms": round(r.get("p50_ms") or 0.0),
+                    "p95 ms": round(r.get("p95_ms") or 0.0),
+                    "p99 ms": round(r.get("p99_ms") or 0.0),
+                }
+                for r in slow_steps
+            ]
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Run details explorer
 # ---------------------------------------------------------------------------
 st.subheader("Run Details")
-selected_id = st.selectbox("Select a run ID", options=df_all["id"].tolist(), index=0)
+selected_id = st.selectbox("Select a run ID", options=df_page["id"].tolist(), index=0)
 try:
     selected_id_int = int(selected_id)
 except (TypeError, ValueError):
     selected_id_int = selected_id
 
+step_state_key = f"steps_cursors_{selected_id_int}"
+art_state_key = f"artifacts_cursors_{selected_id_int}"
+
 # Reset pagination for new selection
 if st.session_state.get("current_detail_id") != selected_id_int:
     st.session_state["current_detail_id"] = selected_id_int
-    st.session_state[f"steps_page_{selected_id_int}"] = 1
-    st.session_state[f"artifacts_page_{selected_id_int}"] = 1
+    st.session_state[step_state_key] = []
+    st.session_state[art_state_key] = []
 
-detail = _run_details_compat(store, selected_id_int)
+# Only the header and the visible page of steps/artifacts are fetched.
+detail = _cached_read(("header", selected_id_int), lambda: _run_header_compat(store, selected_id_int))
 
 left, right = st.columns([2, 1], vertical_alignment="top")
 
@@ -372,35 +696,28 @@ with left:
 
     # Steps
     st.markdown("**Steps**")
-    steps = detail.get("steps", [])
-    if not steps:
+    step_page_size = 5
+    step_cursor = _keyset_cursor(step_state_key)
+    steps = _cached_read(
+        ("steps", selected_id_int, step_cursor),
+        lambda: _run_items_compat(
+            store, selected_id_int, "steps", after_id=step_cursor, limit=step_page_size + 1,
+        ),
+    )
+    if not steps and not st.session_state[step_state_key]:
         st.caption("No step events recorded yet.")
     else:
-        step_page_size = 5
-        step_total = len(steps)
-        step_pages = max(1, math.ceil(step_total / step_page_size))
-        step_state_key = f"steps_page_{selected_id_int}"
-        current_step_page = min(st.session_state.get(step_state_key, 1), step_pages)
-        current_step_page = int(
-            st.number_input(
-                "Step page",
-                min_value=1,
-                max_value=step_pages,
-                value=current_step_page,
-                step=1,
-                key=f"{step_state_key}_widget",
-            )
-        )
-        st.session_state[step_state_key] = current_step_page
-        step_start = (current_step_page - 1) * step_page_size
-        step_end = min(step_start + step_page_size, step_total)
-        st.caption(f"Showing steps {step_start + 1}-{step_end} of {step_total}.")
-        for s in steps[step_start:step_end]:
+        more_steps = len(steps) > step_page_size
+        steps = steps[:step_page_size]
+        step_page = len(st.session_state[step_state_key]) + 1
+        st.caption(f"Step page {step_page} · showing {len(steps)} step(s).")
+        for s in steps:
             phase = s.get("phase") or "—"
             msg = s.get("message") or s.get("msg") or "—"
             stts = s.get("status") or "—"
             ts = s.get("ts") or s.get("time") or "—"
-            with st.expander(f"[{phase}] {msg}  —  {stts} · {ts}", expanded=False):
+            took = f" · {s['duration_ms']:.0f} ms" if s.get("duration_ms") is not None else ""
+            with st.expander(f"[{phase}] {msg}  —  {stts} · {ts}{took}", expanded=False):
                 c1, c2 = st.columns(2)
                 with c1:
                     st.markdown("**Payload**")
@@ -408,34 +725,66 @@ with left:
                 with c2:
                     st.markdown("**Result**")
                     st.json(s.get("result") or {})
+        _keyset_nav(
+            step_state_key, steps[-1].get("id") if more_steps and steps else None,
+            prev_label="◀ Prev steps", next_label="Next steps ▶",
+        )
+
+    # Child runs of a fan-out parent, one keyset page at a time
+    children = (selected_row or {}).get("children") or detail.get("children")
+    if children:
+        st.markdown(f"**Child runs** — {_children_label(children)}")
+        child_state_key = f"children_cursors_{selected_id_int}"
+        child_page_size = 20
+        child_cursor = _keyset_cursor(child_state_key)
+        child_rows = _cached_read(
+            ("children", selected_id_int, child_cursor),
+            lambda: _child_runs_compat(store, selected_id_int, cursor=child_cursor, limit=child_page_size + 1),
+        )
+        more_children = len(child_rows) > child_page_size
+        child_rows = [_normalize_run(r) for r in child_rows[:child_page_size]]
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "id": r["id"],
+                        "name": r["name"],
+                        "status": r["status"],
+                        "duration (ms)": round(float(r["duration_ms"] or 0.0), 2),
+                        "error": r["error"] or "",
+                        "Details": f"/Run_Detail?run_id={r['id']}",
+                    }
+                    for r in child_rows
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+            column_config={"Details": st.column_config.LinkColumn("Details", display_text="Open")},
+        )
+        _keyset_nav(
+            child_state_key, child_rows[-1]["id"] if more_children and child_rows else None,
+            prev_label="◀ Prev children", next_label="Next children ▶",
+        )
 
 with right:
     st.markdown("**Artifacts**")
-    arts = detail.get("artifacts", [])
-    if not arts:
+    art_page_size = 4
+    art_cursor = _keyset_cursor(art_state_key)
+    arts = _cached_read(
+        ("artifacts", selected_id_int, art_cursor),
+        lambda: _run_items_compat(
+            store, selected_id_int, "artifacts", after_id=art_cursor, limit=art_page_size + 1,
+        ),
+    )
+    if not arts and not st.session_state[art_state_key]:
         st.caption("No artifacts captured.")
         st.write("—")
     else:
-        art_page_size = 4
-        art_total = len(arts)
-        art_pages = max(1, math.ceil(art_total / art_page_size))
-        art_state_key = f"artifacts_page_{selected_id_int}"
-        current_art_page = min(st.session_state.get(art_state_key, 1), art_pages)
-        current_art_page = int(
-            st.number_input(
-                "Artifact page",
-                min_value=1,
-                max_value=art_pages,
-                value=current_art_page,
-                step=1,
-                key=f"{art_state_key}_widget",
-            )
-        )
-        st.session_state[art_state_key] = current_art_page
-        art_start = (current_art_page - 1) * art_page_size
-        art_end = min(art_start + art_page_size, art_total)
-        st.caption(f"Showing artifacts {art_start + 1}-{art_end} of {art_total}.")
-        for a in arts[art_start:art_end]:
+        more_arts = len(arts) > art_page_size
+        arts = arts[:art_page_size]
+        art_page = len(st.session_state[art_state_key]) + 1
+        st.caption(f"Artifact page {art_page} · showing {len(arts)} artifact(s).")
+        for a in arts:
             with st.container(border=True):
                 st.write(f"**{a.get('kind','artifact')}** — {a.get('title','')}")
                 if a.get("url"):
@@ -444,6 +793,10 @@ with right:
                     st.caption(f"id: {a['external_id']}")
                 if a.get("data"):
                     st.json(a["data"])
+        _keyset_nav(
+            art_state_key, arts[-1].get("id") if more_arts and arts else None,
+            prev_label="◀ Prev", next_label="Next ▶",
+        )
 
 
 # ---------------------------------------------------------------------------
@@ -4,15 +4,16 @@ pages/Run_Detail.py
 
 Dedicated page for viewing the full details of a workflow run.  This page is
 linked from the Dashboard and accepts a ``run_id`` query parameter.  It
-retrieves the run information via the shared run store and presents all
-step events and artifacts without pagination.  If no run ID is provided or
-the run is not found, informative messages are shown instead of crashing.
+retrieves the run header via the shared run store and pages through step
+events and artifacts with keyset cursors, so a run with tens of thousands of
+steps opens as quickly as a small one.  If no run ID is provided or the run
+is not found, informative messages are shown instead of crashing.
 """
 
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import streamlit as st
 
@@ -33,13 +34,53 @@ if run_id is None:
     st.info("No run_id provided in the URL.")
     st.stop()
 
-# Instantiate run store and fetch details
+STEP_PAGE_SIZE = 50
+ARTIFACT_PAGE_SIZE = 20
+
+
+def _page(store, kind: str, after_id: Optional[int], limit: int) -> List[Dict[str, Any]]:
+    """One keyset page of `steps`/`artifacts`; falls back to slicing run_details."""
+    try:
+        return getattr(store, f"run_{kind}")(run_id, after_id=after_id, limit=limit)
+    except Exception:
+        items = (store.run_details(run_id) or {}).get(kind, [])
+        if after_id is not None:
+            items = [x for x in items if (x.get("id") or 0) > after_id]
+        return items[:limit]
+
+
+def _pager(state_key: str, items: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Render prev/next buttons for a cursor stack and return the visible items."""
+    stack = st.session_state.setdefault(state_key, [])
+    has_more = len(items) > limit
+    items = items[:limit]
+    c_prev, c_next, c_info = st.columns([1, 1, 3])
+    if c_prev.button("◀ Prev", disabled=not stack, key=f"{state_key}_prev"):
+        stack.pop()
+        st.rerun()
+    if c_next.button("Next ▶", disabled=not has_more, key=f"{state_key}_next"):
+        stack.append(items[-1]["id"])
+        st.rerun()
+    c_info.caption(f"Page {len(stack) + 1}")
+    return items
+
+
+# Instantiate run store and fetch the run header
 store = make_runstore()
 try:
-    detail = store.run_details(run_id)  # type: ignore[attr-defined]
+    detail = store.get_run(run_id)  # type: ignore[attr-defined]
+except AttributeError:
+    try:
+        detail = store.run_details(run_id)  # type: ignore[attr-defined]
+    except Exception:
+        detail = {}
 except Exception:
     detail = {}
 
+step_key, art_key = f"rd_steps_{run_id}", f"rd_artifacts_{run_id}"
+step_stack = st.session_state.setdefault(step_key, [])
+art_stack = st.session_state.setdefault(art_key, [])
+
 if not detail:
     st.warning(f"Run with ID {run_id} not found.")
     st.stop()
@@ -56,11 +97,11 @@ left, right = st.columns([2, 1], vertical_alignment="top")
 
 with left:
     st.markdown("**Steps**")
-    steps: List[Dict[str, Any]] = detail.get("steps", [])  # type: ignore[assignment]
-    if not steps:
+    steps = _page(store, "steps", step_stack[-1] if step_stack else None, STEP_PAGE_SIZE + 1)
+    if not steps and not step_stack:
         st.caption("No step events recorded.")
     else:
-        for s in steps:
+        for s in _pager(step_key, steps, STEP_PAGE_SIZE):
             phase = s.get("phase") or "—"
             msg = s.get("message") or s.get("msg") or "—"
             stts = s.get("status") or "—"
@@ -76,12 +117,12 @@ with left:
 
 with right:
     st.markdown("**Artifacts**")
-    arts: List[Dict[str, Any]] = detail.get("artifacts", [])  # type: ignore[assignment]
-    if not arts:
+    arts = _page(store, "artifacts", art_stack[-1] if art_stack else None, ARTIFACT_PAGE_SIZE + 1)
+    if not arts and not art_stack:
         st.caption("No artifacts captured.")
         st.write("—")
     else:
-        for a in arts:
+        for a in _pager(art_key, arts, ARTIFACT_PAGE_SIZE):
             with st.container(border=True):
                 st.write(f"**{a.get('kind','artifact')}** — {a.get('title','')}")
                 if a.get("url"):
@@ -0,0 +1,44 @@
+"""
+scripts/apply_retention.py
+--------------------------
+
+Archive old runs out of the RunStore and shrink the database file.
+See core/runs_retention.py for the archive layout.
+
+Usage (from the sma-av-streamlit directory):
+    python scripts/apply_retention.py --max-age-days 90 --max-db-mb 512
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runs_retention import RetentionPolicy, apply_retention
+from core.runstore_factory import make_runstore
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Apply RunStore retention policies.")
+    ap.add_argument("--db", type=Path, default=None, help="RunStore SQLite file (default: avops.db)")
+    ap.add_argument("--max-age-days", type=float, default=90, help="archive finished runs older than this")
+    ap.add_argument("--max-db-mb", type=float, default=None, help="archive oldest runs while above this size")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--no-full-vacuum", action="store_true",
+                    help="never rewrite a database that lacks auto_vacuum=INCREMENTAL")
+    args = ap.parse_args()
+    store = make_runstore(args.db)
+    summary = apply_retention(store, RetentionPolicy(
+        max_age_days=args.max_age_days, max_db_mb=args.max_db_mb,
+        batch_size=args.batch_size, allow_full_vacuum=not args.no_full_vacuum,
+    ))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
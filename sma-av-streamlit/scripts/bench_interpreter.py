@@ -0,0 +1,110 @@
+"""
+scripts/bench_interpreter.py
+----------------------------
+
+Micro-benchmark for the recipe step interpreter (core/workflow/interpreter.py):
+per-step overhead of running a compiled plan versus compiling the recipe on
+every invocation.  Tools are no-ops, so the numbers are pure interpreter cost.
+With --latency-ms every tool call sleeps instead, and the script compares
+wall time per run with `sequential: true` against the parallel DAG schedule.
+With --sweep N the daily-room-health graph (core/workflow/graph.py) fans out
+over N rooms, recorded in a temporary RunStore, once per --workers value.
+
+Usage (from the sma-av-streamlit directory):
+    python scripts/bench_interpreter.py --runs 2000
+    python scripts/bench_interpreter.py --recipe incident-triage.yaml --runs 2000
+    python scripts/bench_interpreter.py --recipe incident-triage.yaml --latency-ms 50 --runs 10
+    python scripts/bench_interpreter.py --sweep 500 --latency-ms 50 --workers 1 8 32
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runs_store import RunStore
+from core.workflow.graph import run_graph
+from core.workflow.interpreter import compile_recipe
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Step interpreter per-step overhead.")
+    ap.add_argument("--recipe", default="zoom-room-healthcheck.yaml", help="file under recipes/")
+    ap.add_argument("--runs", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="simulated tool latency")
+    ap.add_argument("--sweep", type=int, default=0, help="rooms for a daily-room-health fan-out")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    args = ap.parse_args()
+
+    recipe = yaml.safe_load((ROOT / "recipes" / args.recipe).read_text(encoding="utf-8"))
+    inputs = {"roomId": "ZR-101", "reporter": "ops@example.com", "summary": "No audio"}
+    result = {
+        "status": "online", "metrics": {"cpu_percent": 22}, "summary": {"mos": 4.4},
+        "sev": "P3", "category": "room", "confidence": 0.9, "number": "INC1", "sys_id": "x", "steps": [],
+    }
+
+    def tool(action: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if args.latency_ms:
+            time.sleep(args.latency_ms / 1000.0)
+        return result
+
+    tools = {u: tool for u in ("mcp-zoom", "mcp-slack", "mcp-servicenow", "local-llm")}
+    plan = compile_recipe(recipe)
+    steps = sum(1 for s in plan.run(inputs, tools=tools)["steps"] if s["status"] != "skipped")
+
+    if args.sweep:
+        rooms = [f"ZR-{i:04d}" for i in range(args.sweep)]
+        print(f"graph: daily-room-health, {args.sweep} rooms, tools at {args.latency_ms:g} ms")
+        with tempfile.TemporaryDirectory() as tmp:
+            store = RunStore(db_path=Path(tmp) / "runs.db")
+            for workers in args.workers:
+                start = time.perf_counter()
+                out = run_graph("daily-room-health.json", store, params={"roomIds": rooms},
+                                tools=tools, workers=workers)
+                node = out["nodes"]["for-each-room"]
+                print(f"  workers={workers:<4} {time.perf_counter() - start:8.2f} s  "
+                      f"{node['succeeded']} ok / {node['failed']} failed")
+            store.close()
+        return
+
+    if args.latency_ms:
+        sequential = compile_recipe({**recipe, "sequential": True})
+        print(f"interpreter: {args.recipe}, {steps} steps at {args.latency_ms:g} ms, {args.runs} runs")
+        for label, p in (("sequential", sequential), ("parallel DAG", plan)):
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                p.run(inputs, tools=tools)
+            print(f"  {label:16} {(time.perf_counter() - start) / args.runs * 1000:9.1f} ms/run")
+        return
+
+    def compiled() -> None:
+        for _ in range(args.runs):
+            plan.run(inputs, tools=tools)
+
+    def recompiled() -> None:
+        for _ in range(args.runs):
+            compile_recipe(recipe).run(inputs, tools=tools)
+
+    print(f"interpreter: {args.recipe}, {steps} executed steps/run, {args.runs} runs")
+    for label, fn in (("compiled once", compiled), ("compile per run", recompiled)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        per_step_us = best / (args.runs * steps) * 1e6
+        print(f"  {label:16} {best / args.runs * 1e6:9.1f} us/run  {per_step_us:8.1f} us/step")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,670 @@
+"""
+scripts/bench_runstore.py
+-------------------------
+
+Micro-benchmarks for the RunStore (core/runs_store.py).  Every scenario runs
+against a throwaway SQLite file so the app's ``avops.db`` is never touched.
+
+Usage (from the sma-av-streamlit directory):
+    python scripts/bench_runstore.py recorder --events 5000
+    python scripts/bench_runstore.py stats --runs 200000
+    python scripts/bench_runstore.py pages --events 50000
+    python scripts/bench_runstore.py indexes --runs 1000000
+    python scripts/bench_runstore.py backends --events 2000
+    python scripts/bench_runstore.py factory --runs 100000
+    python scripts/bench_runstore.py concurrency --seconds 5 --writers 2 --readers 2
+    python scripts/bench_runstore.py recipes --runs 300000
+    python scripts/bench_runstore.py feed --runs 100000
+    python scripts/bench_runstore.py search --runs 100000
+    python scripts/bench_runstore.py async --events 2000
+    python scripts/bench_runstore.py steps --events 200000
+    python scripts/bench_runstore.py children --runs 200000
+    python scripts/bench_runstore.py export --runs 100000
+    python scripts/bench_runstore.py meta --runs 300000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import func, insert, inspect
+from sqlalchemy.exc import OperationalError
+
+from core.db.sqlite_profile import SQLITE_PROFILES
+from core.runs_export import export_runs
+from core.runstore_factory import BACKENDS, close_runstores, make_runstore
+from core.runs_store import (
+    DURABILITY_MODES, Base, RunStore, StepEvent, WorkflowRun, migrate_schema,
+)
+
+
+def _timed(fn: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _seed_runs(
+    db_path: Path, n: int, *, days: int = 90, chunk: int = 50_000, in_order: bool = False,
+    sqlite_profile: str = "durable",
+) -> None:
+    """Bulk-insert `n` finished runs spread over the last `days` days (ids ascending in time with `in_order`)."""
+    rng = random.Random(42)
+    store = RunStore(db_path=db_path, sqlite_profile=sqlite_profile)
+    now = datetime.now(timezone.utc)
+    with store.engine.begin() as conn:
+        for lo in range(0, n, chunk):
+            rows = []
+            for i in range(lo, min(lo + chunk, n)):
+                if in_order:
+                    started = now - timedelta(seconds=days * 86400 * (n - i) / n)
+                else:
+                    started = now - timedelta(seconds=rng.randrange(days * 86400))
+                dur = rng.lognormvariate(7, 1)
+                failed = rng.random() < 0.1
+                rows.append({
+                    "workflow_id": str(i % 50), "name": f"wf {i % 50}",
+                    "agent_id": i % 5, "recipe_id": i % 40, "trigger": "interval",
+                    "status": "failed" if failed else "success",
+                    "started_at": started, "finished_at": started + timedelta(milliseconds=dur),
+                    "duration_ms": dur, "error": "TimeoutError: device" if failed else None,
+                    "meta": {"workflow_name": f"wf {i % 50}"},
+                })
+            conn.execute(insert(WorkflowRun), rows)
+    store.engine.dispose()
+
+
+def bench_recorder(args: argparse.Namespace) -> None:
+    """Steps/second for each Recorder durability mode."""
+    print(f"recorder: {args.events} steps + {args.events // 10} artifacts per run")
+    for mode in DURABILITY_MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = RunStore(db_path=Path(tmp) / "bench.db", flush_size=args.flush_size)
+
+            def _one_run() -> None:
+                with store.workflow_run(
+                    workflow_id="bench", name="bench", agent_id=None, recipe_id=None,
+                    durability=mode,
+                ) as rec:
+                    for i in range(args.events):
+                        rec.step("act", f"step {i}", payload={"i": i})
+                        if i % 10 == 0:
+                            rec.artifact("file", f"artifact {i}")
+
+            secs = _timed(_one_run)
+            store.engine.dispose()
+        print(f"  {mode:<9} {secs:8.3f}s  {args.events / secs:10.0f} steps/s")
+
+
+def bench_stats(args: argparse.Namespace) -> None:
+    """Latency of RunStore.stats() for the Dashboard windows."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        print(f"stats: seeding {args.runs} runs over 90 days…")
+        _seed_runs(db, args.runs)
+        store = RunStore(db_path=db)  # builds sketches for the seeded history
+        now = datetime.now(timezone.utc)
+        windows = {"24h": now - timedelta(hours=24), "7d": now - timedelta(days=7),
+                   "30d": now - timedelta(days=30), "All": None}
+        for label, since in windows.items():
+            store.stats(since=since)  # warm the page cache
+            secs = min(_timed(lambda: store.stats(since=since)) for _ in range(args.repeat))
+            print(f"  {label:<4} {secs * 1000:9.2f} ms")
+        store.engine.dispose()
+
+
+def bench_pages(args: argparse.Namespace) -> None:
+    """Opening a run: full run_details() vs one keyset page of run_steps()."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunStore(db_path=Path(tmp) / "bench.db")
+        run_ids = {}
+        for n in (5, args.events):
+            with store.workflow_run(
+                workflow_id="bench", name=f"{n} steps", agent_id=None, recipe_id=None,
+                durability="deferred",
+            ) as rec:
+                for i in range(n):
+                    rec.step("act", f"step {i}", payload={"i": i})
+            run_ids[n] = rec.run_id
+        print("pages: best of", args.repeat)
+        for n, run_id in run_ids.items():
+            full = min(_timed(lambda: store.run_details(run_id)) for _ in range(args.repeat))
+            first = min(_timed(lambda: store.run_steps(run_id, limit=50)) for _ in range(args.repeat))
+            last_id = store.run_steps(run_id, limit=n)[-1]["id"]
+            deep = min(
+                _timed(lambda: store.run_steps(run_id, after_id=last_id - 50, limit=50))
+                for _ in range(args.repeat)
+            )
+            print(f"  {n:>6} steps  run_details {full * 1000:9.2f} ms  "
+                  f"first page {first * 1000:7.2f} ms  last page {deep * 1000:7.2f} ms")
+        store.engine.dispose()
+
+
+def bench_indexes(args: argparse.Namespace) -> None:
+    """Hot Dashboard/Recipes queries before and after migrate_schema() adds the indexes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        print(f"indexes: seeding {args.runs} runs (+20 steps for every 100th run)…")
+        _seed_runs(db, args.runs)
+        store = RunStore(db_path=db)
+        with store.engine.begin() as conn:
+            conn.execute(insert(StepEvent), [
+                {"run_id": run_id, "phase": "act", "message": f"step {i}", "level": "info",
+                 "status": "ok", "ts": datetime.now(timezone.utc)}
+                for run_id in range(1, args.runs + 1, 100) for i in range(20)
+            ])
+            for table in Base.metadata.sorted_tables:
+                for ix in inspect(conn).get_indexes(table.name):
+                    conn.exec_driver_sql(f"DROP INDEX {ix['name']}")
+        probe = args.runs // 2 // 100 * 100 + 1
+        since = datetime.now(timezone.utc) - timedelta(hours=24)
+        queries = {
+            "latest_runs(failed, 24h)": lambda: store.latest_runs(status=["failed"], since=since),
+            "recipe_metrics(7)": lambda: store.recipe_metrics(7),
+            "stats(24h)": lambda: store.stats(since=since),
+            "run_steps(mid run)": lambda: store.run_steps(probe),
+        }
+
+        def _report(label: str) -> None:
+            print(f"  {label}")
+            for name, fn in queries.items():
+                fn()
+                secs = min(_timed(fn) for _ in range(args.repeat))
+                print(f"    {name:<26} {secs * 1000:9.2f} ms")
+
+        _report("without secondary indexes")
+        secs = _timed(lambda: migrate_schema(store.engine))
+        print(f"  migrate_schema() took {secs:.1f}s")
+        _report("with indexes")
+        store.engine.dispose()
+
+
+def bench_backends(args: argparse.Namespace) -> None:
+    """The same write + Dashboard read workload against every make_runstore() backend."""
+    print(f"backends: 20 runs x {args.events // 20} steps, then Dashboard reads")
+    for backend in BACKENDS:
+        if backend == "postgres" and not os.getenv("AVOPS_RUNSTORE_URL"):
+            print(f"  {backend:<9} skipped (set AVOPS_RUNSTORE_URL)")
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / ("log" if backend == "log" else "bench.db")
+            store = make_runstore(target, backend=backend)
+
+            def _write() -> None:
+                for r in range(20):
+                    with store.workflow_run(
+                        workflow_id="bench", name=f"run {r}", agent_id=None, recipe_id=r % 4,
+                        durability="batch",
+                    ) as rec:
+                        for i in range(args.events // 20):
+                            rec.step("act", f"step {i}", payload={"i": i})
+
+            def _read() -> None:
+                latest = store.latest_runs(limit=50)
+                store.stats()
+                store.trend()
+                store.run_steps(latest[0]["id"], limit=50)
+                store.recipe_metrics(1)
+
+            write = _timed(_write)
+            read = min(_timed(_read) for _ in range(args.repeat))
+            close_runstores()
+        print(f"  {backend:<9} write {args.events / write:10.0f} steps/s   reads {read * 1000:8.2f} ms")
+
+
+def bench_factory(args: argparse.Namespace) -> None:
+    """make_runstore() + latest_runs(limit=1): cold (new engine, schema setup) vs cached."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        print(f"factory: seeding {args.runs} runs…")
+        _seed_runs(db, args.runs)
+        make_runstore(db).latest_runs(limit=1)  # first open builds the rollups once
+        close_runstores()
+
+        def _cold() -> None:
+            close_runstores()
+            make_runstore(db).latest_runs(limit=1)
+
+        cold = min(_timed(_cold) for _ in range(args.repeat))
+        warm = min(_timed(lambda: make_runstore(db).latest_runs(limit=1)) for _ in range(args.repeat))
+        close_runstores()
+    print(f"  cold {cold * 1000:9.2f} ms   warm {warm * 1000:9.2f} ms")
+
+
+def _concurrency_writer(db: str, profile: str, seconds: float, out) -> None:
+    """Separate process standing in for a scheduler worker: short runs, one commit per step."""
+    store = RunStore(db_path=Path(db), sqlite_profile=profile)
+    stop, steps, errors = time.monotonic() + seconds, 0, 0
+    while time.monotonic() < stop:
+        try:
+            with store.workflow_run(workflow_id="tick", name="tick", agent_id=1, recipe_id=1) as rec:
+                for i in range(20):
+                    rec.step("act", f"step {i}", payload={"room": i})
+            steps += 20
+        except OperationalError:
+            errors += 1
+    store.close()
+    out.put(("writer", steps, errors))
+
+
+def _concurrency_reader(db: str, profile: str, seconds: float, out) -> None:
+    """
+    Separate process standing in for a Dashboard session that also runs
+    history reads (export, retention): every tenth read streams the whole
+    run table through one cursor, so it holds its read lock for the scan.
+    """
+    store = RunStore(db_path=Path(db), sqlite_profile=profile)
+    stop, reads, errors = time.monotonic() + seconds, [], 0
+
+    def _scan() -> None:
+        with store.Session() as s:
+            for _ in s.execute(WorkflowRun.__table__.select().execution_options(yield_per=500)):
+                pass
+
+    n = 0
+    while time.monotonic() < stop:
+        n += 1
+        try:
+            if n % 10:
+                reads.append(_timed(lambda: store.latest_runs(limit=50)))
+            else:
+                _scan()
+        except OperationalError:
+            errors += 1
+    store.close()
+    out.put(("reader", reads, errors))
+
+
+def bench_concurrency(args: argparse.Namespace) -> None:
+    """Writer and Dashboard reader processes on one file, per SQLite profile."""
+    print(f"concurrency: {args.writers} writer + {args.readers} reader processes, {args.seconds}s per profile")
+    for profile in SQLITE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "bench.db"
+            # journal_mode=WAL is stored in the file: seed with the profile under test.
+            _seed_runs(db, 20_000, days=2, sqlite_profile=profile)
+            RunStore(db_path=db, sqlite_profile=profile).close()  # build rollups before the clock starts
+            out: "multiprocessing.Queue" = multiprocessing.Queue()
+            procs = [
+                multiprocessing.Process(target=target, args=(str(db), profile, args.seconds, out))
+                for target, n in ((_concurrency_writer, args.writers), (_concurrency_reader, args.readers))
+                for _ in range(n)
+            ]
+            for p in procs:
+                p.start()
+            steps, reads, errors = 0, [], 0
+            for _ in procs:
+                role, value, errs = out.get()
+                if role == "writer":
+                    steps += value
+                else:
+                    reads += value
+                errors += errs
+            for p in procs:
+                p.join()
+        reads.sort()
+        pct = lambda q: reads[max(int(len(reads) * q) - 1, 0)] * 1000 if reads else float("nan")
+        print(f"  {profile:<8} steps/s {steps / args.seconds:7.0f}   reads {len(reads):5d}   "
+              f"read p50 {pct(0.5):7.2f} ms   p99 {pct(0.99):8.2f} ms   max {pct(1.0):8.2f} ms   "
+              f"lock errors {errors}")
+
+
+def bench_recipes(args: argparse.Namespace) -> None:
+    """Recipes page: recipe_metrics() per recipe vs one recipe_metrics_bulk() for 500 recipes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        print(f"recipes: seeding {args.runs} runs…")
+        _seed_runs(db, args.runs)
+        store = RunStore(db_path=db)
+        ids = list(range(500))
+        timings = {
+            "recipe_metrics x500": lambda: [store.recipe_metrics(i) for i in ids],
+            "recipe_metrics_bulk": lambda: store.recipe_metrics_bulk(ids),
+            "bulk, limit=None": lambda: store.recipe_metrics_bulk(ids, limit=None),
+        }
+        for name, fn in timings.items():
+            fn()
+            secs = min(_timed(fn) for _ in range(args.repeat))
+            print(f"  {name:<22} {secs * 1000:9.2f} ms")
+        store.close()
+
+
+def bench_feed(args: argparse.Namespace) -> None:
+    """Dashboard auto-refresh: full refetch vs polling changes_since() when idle / after one run."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        print(f"feed: seeding {args.runs} runs…")
+        _seed_runs(db, args.runs)
+        store = RunStore(db_path=db)
+        since = datetime.now(timezone.utc) - timedelta(hours=24)
+
+        def _refetch() -> None:
+            latest = store.latest_runs(limit=11, since=since)
+            store.stats(since=since)
+            store.trend(since=since)
+            store.get_run(latest[0]["id"])
+            store.run_steps(latest[0]["id"], limit=6)
+
+        seq = store.changes_since(None)["seq"]
+        full = min(_timed(_refetch) for _ in range(args.repeat))
+        idle = min(_timed(lambda: store.changes_since(seq)) for _ in range(args.repeat))
+        with store.workflow_run(workflow_id="wf", name="new", agent_id=1, recipe_id=1) as rec:
+            for i in range(5):
+                rec.step("act", f"step {i}")
+        delta = min(_timed(lambda: store.changes_since(seq)) for _ in range(args.repeat))
+        store.close()
+    print(f"  full refetch {full * 1000:9.2f} ms   idle poll {idle * 1000:7.2f} ms   "
+          f"poll after 1 run {delta * 1000:7.2f} ms")
+
+
+def bench_search(args: argparse.Namespace) -> None:
+    """Dashboard search: FTS5 MATCH + bm25 vs the LIKE scan used without FTS5."""
+    words = ["HDMI", "EDID", "reload", "Zoom", "codec", "reboot", "firmware", "DSP", "mic", "Crestron"]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        print(f"search: seeding {args.runs} runs with 3 steps each…")
+        _seed_runs(db, args.runs)
+        store = RunStore(db_path=db)
+        rng = random.Random(7)
+        with store.engine.begin() as conn:
+            ids = [r[0] for r in conn.execute(WorkflowRun.__table__.select().with_only_columns(WorkflowRun.id))]
+            now = datetime.now(timezone.utc)
+            for lo in range(0, len(ids), 50_000):
+                conn.execute(insert(StepEvent), [
+                    {"run_id": rid, "ts": now, "phase": "act", "level": "info",
+                     "message": " ".join(rng.sample(words, 3)) + f" on room {rid % 400}"}
+                    for rid in ids[lo:lo + 50_000] for _ in range(3)
+                ])
+        for query in ("hdmi edid", "crestron firmware reboot", "room 17"):
+            store.search_fts = True
+            fts = min(_timed(lambda: store.search(query, limit=50)) for _ in range(args.repeat))
+            store.search_fts = False
+            like = min(_timed(lambda: store.search(query, limit=50)) for _ in range(args.repeat))
+            print(f"  {query!r:28} fts {fts * 1000:9.2f} ms   like {like * 1000:9.2f} ms")
+        store.close()
+
+
+async def _loop_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    """Sample how late a 1 ms timer fires while the loop is busy."""
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - t - 0.001)
+
+
+def bench_async(args: argparse.Namespace) -> None:
+    """Event-loop latency while 20 tasks record runs: blocking calls vs thread pool vs AsyncRunStore."""
+    try:
+        from core.runs_store_async import AsyncRunStore
+    except ImportError as e:  # sqlalchemy[asyncio] extras
+        print(f"async: skipped ({e})")
+        return
+    tasks, steps = 20, max(1, args.events // 20)
+
+    def _sync_run(store: RunStore, i: int) -> None:
+        with store.workflow_run(workflow_id="wf", name=f"r{i}", agent_id=1, recipe_id=1) as rec:
+            for j in range(steps):
+                rec.step("act", f"step {j}")
+
+    async def _async_run(store, i: int) -> None:
+        async with store.workflow_run(workflow_id="wf", name=f"r{i}", agent_id=1, recipe_id=1) as rec:
+            for j in range(steps):
+                await rec.step("act", f"step {j}")
+
+    async def _measure(mode: str, db: Path) -> None:
+        if mode == "async":
+            try:
+                store = AsyncRunStore(db_path=db)
+            except ModuleNotFoundError as e:
+                print(f"  {mode:12} skipped ({e})")
+                return
+            job = lambda i: _async_run(store, i)
+        else:
+            store = RunStore(db_path=db)
+            loop = asyncio.get_running_loop()
+
+            async def job(i: int) -> None:
+                if mode == "blocking":
+                    _sync_run(store, i)
+                else:
+                    await loop.run_in_executor(None, _sync_run, store, i)
+
+        stop, lags = asyncio.Event(), []
+        probe = asyncio.create_task(_loop_lag(stop, lags))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(job(i) for i in range(tasks)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await probe
+        result = store.close()
+        if asyncio.iscoroutine(result):
+            await result
+        lags.sort()
+        pct = lambda q: lags[min(len(lags) - 1, int(q * len(lags)))] * 1000 if lags else float("nan")
+        print(f"  {mode:12} {tasks * steps / elapsed:8.0f} steps/s   loop lag p50 {pct(0.5):7.2f} ms   "
+              f"p99 {pct(0.99):7.2f} ms   max {lags[-1] * 1000 if lags else float('nan'):8.2f} ms")
+
+    print(f"async: {tasks} concurrent runs x {steps} steps (sync durability)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("blocking", "thread pool", "async"):
+            asyncio.run(_measure(mode, Path(tmp) / f"{mode.replace(' ', '_')}.db"))
+
+
+def bench_steps(args: argparse.Namespace) -> None:
+    """Slowest-steps panel: step_rollups sketches vs percentiles over raw step_events."""
+    from core.runs_store import StepRollup
+    from core.utils.sketch import DDSketch
+    from sqlalchemy import select
+
+    tools = [("reboot", "zoom.reboot"), ("ping", "icmp"), ("edid", "crestron"), ("ticket", "servicenow")]
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunStore(db_path=Path(tmp) / "bench.db", sqlite_profile="fast")
+        now = datetime.now(timezone.utc)
+        per_run = 10
+        t0 = time.perf_counter()
+        for i in range(max(1, args.events // per_run)):
+            steps = []
+            for j in range(per_run):
+                step_id, tool = tools[j % len(tools)]
+                start = now - timedelta(seconds=rng.randrange(7 * 86400))
+                steps.append({
+                    "phase": "act", "message": step_id, "step_id": step_id, "tool": tool,
+                    "started_at": start, "finished_at": start + timedelta(milliseconds=rng.lognormvariate(5, 1)),
+                })
+            store.record_run(workflow_id="wf", name="r", agent_id=1, recipe_id=i % 20, steps=steps)
+        write = time.perf_counter() - t0
+        since = now - timedelta(hours=24)
+
+        def _raw() -> None:
+            with store.Session() as s:
+                groups: Dict[tuple, DDSketch] = {}
+                for rid, sid, tool, dur in s.execute(
+                    select(WorkflowRun.recipe_id, StepEvent.step_id, StepEvent.tool, StepEvent.duration_ms)
+                    .join(WorkflowRun, WorkflowRun.id == StepEvent.run_id)
+                    .where(StepEvent.started_at >= since, StepEvent.duration_ms.is_not(None))
+                ):
+                    groups.setdefault((rid, sid, tool), DDSketch()).add(dur)
+                sorted(groups.items(), key=lambda kv: kv[1].quantile(0.95), reverse=True)[:10]
+
+        rollup = min(_timed(lambda: store.slowest_steps(since=since)) for _ in range(args.repeat))
+        raw = min(_timed(_raw) for _ in range(args.repeat))
+        with store.Session() as s:
+            rows = s.execute(select(func.count(StepRollup.id))).scalar()
+        store.close()
+    print(f"steps: {args.events} timed steps written at {args.events / write:8.0f} steps/s "
+          f"({rows} step_rollups rows)")
+    print(f"  slowest_steps(24h) {rollup * 1000:8.2f} ms   raw step_events scan {raw * 1000:8.2f} ms")
+
+
+def bench_children(args: argparse.Namespace) -> None:
+    """Fan-out runs: Dashboard reads with children collapsed under parents vs the same runs flat."""
+    fanout = 500
+    parents = max(1, args.runs // fanout)
+    now = datetime.now(timezone.utc)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in ("flat", "parent/child"):
+            store = RunStore(db_path=Path(tmp) / f"{layout.replace('/', '_')}.db")
+            for p in range(parents):
+                started = now - timedelta(hours=23 * p / parents)
+                parent_id = None
+                if layout != "flat":
+                    parent_id = store.record_run(
+                        workflow_id="wf-rooms", name=f"survey {p}", agent_id=1, recipe_id=None,
+                        started_at=started, finished_at=started + timedelta(seconds=30),
+                    )
+                with store.engine.begin() as conn:
+                    conn.execute(insert(WorkflowRun), [
+                        {"workflow_id": "wf-rooms", "name": f"ZR-{c}", "agent_id": 2, "recipe_id": 5,
+                         "trigger": "interval", "status": "success" if c % 50 else "failed",
+                         "started_at": started, "finished_at": started + timedelta(seconds=1),
+                         "duration_ms": 1000.0, "meta": {}, "parent_id": parent_id}
+                        for c in range(fanout)
+                    ])
+            store.rebuild_rollups()
+            since = now - timedelta(hours=24)
+
+            def _dashboard() -> None:
+                store.latest_runs(limit=11, since=since)
+                store.stats(since=since)
+                store.trend(since=since)
+
+            results[layout] = (
+                min(_timed(_dashboard) for _ in range(args.repeat)),
+                len(store.latest_runs(limit=10_000, since=since)),
+            )
+            store.close()
+    print(f"children: {parents} parents x {fanout} children")
+    for layout, (t, listed) in results.items():
+        print(f"  {layout:13} dashboard reads {t * 1000:8.2f} ms   runs in the 24h listing {listed:8d}")
+
+
+def bench_export(args: argparse.Namespace) -> None:
+    """Parquet export: streamed keyset chunks vs one chunk, and an incremental top-up."""
+    steps_per_run = 5
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        _seed_runs(db, args.runs, in_order=True)
+        store = RunStore(db_path=db)
+        with store.engine.begin() as conn:
+            ids = list(conn.execute(WorkflowRun.__table__.select().with_only_columns(WorkflowRun.id)).scalars())
+            for lo in range(0, len(ids), 10_000):
+                conn.execute(insert(StepEvent), [
+                    {"run_id": rid, "phase": "act", "message": f"step {j} on room {rid % 300}",
+                     "step_id": f"s{j}", "tool": "icmp", "duration_ms": 12.5, "result": {"ok": True}}
+                    for rid in ids[lo:lo + 10_000] for j in range(steps_per_run)
+                ])
+        out = Path(tmp) / "out"
+        print(f"export: {args.runs} runs x {steps_per_run} steps")
+        for label, chunk in (("streamed", 2000), ("one chunk", args.runs)):
+            shutil.rmtree(out, ignore_errors=True)
+            t = _timed(lambda: export_runs(store, out, chunk_runs=chunk))
+            shutil.rmtree(out, ignore_errors=True)
+            tracemalloc.start()  # separate pass: tracing slows the export down several times
+            export_runs(store, out, chunk_runs=chunk)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = sum(f.stat().st_size for f in out.rglob("*.parquet"))
+            print(f"  {label:10} {t:8.2f} s  {args.runs / t:10.0f} runs/s  "
+                  f"peak {peak / 2**20:7.1f} MiB  files {size / 2**20:7.1f} MiB")
+
+        shutil.rmtree(out, ignore_errors=True)
+        export_runs(store, out, incremental=True)
+        for i in range(max(1, args.runs // 100)):
+            store.record_run(workflow_id="wf", name=f"new {i}", agent_id=1, recipe_id=1)
+        t = _timed(lambda: export_runs(store, out, incremental=True))
+        print(f"  incremental top-up of {max(1, args.runs // 100)} runs {t * 1000:8.1f} ms")
+        store.close()
+
+
+def bench_meta(args: argparse.Namespace) -> None:
+    """Per-room listing + KPIs: promoted room_id column vs json_extract over meta."""
+    rooms = 300
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        _seed_runs(db, args.runs, days=30, in_order=True)
+        store = RunStore(db_path=db)
+        with store.engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"UPDATE workflow_runs SET room_id = 'ZR-' || (id % {rooms}), "
+                f"meta = json_set(meta, '$.room_id', 'ZR-' || (id % {rooms}))"
+            )
+            conn.exec_driver_sql("ANALYZE")
+        since = datetime.now(timezone.utc) - timedelta(days=7)
+        room = {"room_id": "ZR-7"}
+
+        def _promoted() -> None:
+            store.latest_runs(limit=50, since=since, meta=room)
+            store.stats(since=since, meta=room)
+
+        def _json() -> None:
+            with store.engine.connect() as conn:
+                for sql in (
+                    "SELECT * FROM workflow_runs WHERE parent_id IS NULL AND started_at >= ? "
+                    "AND json_extract(meta, '$.room_id') = ? ORDER BY id DESC LIMIT 50",
+                    "SELECT count(*), sum(status = 'success'), group_concat(duration_ms) FROM workflow_runs "
+                    "WHERE parent_id IS NULL AND started_at >= ? AND json_extract(meta, '$.room_id') = ?",
+                ):
+                    conn.exec_driver_sql(sql, (since.isoformat(" "), "ZR-7")).all()
+
+        print(f"meta: {args.runs} runs over {rooms} rooms, one room's last 7 days")
+        for label, fn in (("json_extract", _json), ("promoted", _promoted)):
+            t = min(_timed(fn) for _ in range(args.repeat))
+            print(f"  {label:13} {t * 1000:8.2f} ms")
+        store.close()
+
+
+SCENARIOS: Dict[str, Callable[[argparse.Namespace], None]] = {
+    "recorder": bench_recorder,
+    "stats": bench_stats,
+    "pages": bench_pages,
+    "indexes": bench_indexes,
+    "backends": bench_backends,
+    "factory": bench_factory,
+    "concurrency": bench_concurrency,
+    "recipes": bench_recipes,
+    "feed": bench_feed,
+    "search": bench_search,
+    "async": bench_async,
+    "steps": bench_steps,
+    "children": bench_children,
+    "export": bench_export,
+    "meta": bench_meta,
+}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("scenario", choices=sorted(SCENARIOS) + ["all"])
+    ap.add_argument("--events", type=int, default=2000, help="step events per run (recorder)")
+    ap.add_argument("--runs", type=int, default=100_000, help="seeded run history size")
+    ap.add_argument("--repeat", type=int, default=5, help="timed repetitions (best is reported)")
+    ap.add_argument("--seconds", type=float, default=5.0, help="duration per profile (concurrency)")
+    ap.add_argument("--writers", type=int, default=2, help="writer processes (concurrency)")
+    ap.add_argument("--readers", type=int, default=2, help="reader processes (concurrency)")
+    ap.add_argument("--flush-size", type=int, default=100, help="batch size for durability=batch")
+    args = ap.parse_args()
+    names = sorted(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    for name in names:
+        SCENARIOS[name](args)
+
+
+if __name__ == "__main__":
+    main()
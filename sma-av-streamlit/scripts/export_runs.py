@@ -0,0 +1,52 @@
+"""
+scripts/export_runs.py
+----------------------
+
+Export runs, steps and artifacts from the RunStore to partitioned Parquet
+(or Arrow IPC) files for offline analytics.  By default each call picks up
+where the previous one stopped; see core/runs_export.py for the layout.
+
+Usage (from the sma-av-streamlit directory):
+    python scripts/export_runs.py --out exports
+    python scripts/export_runs.py --out exports --full --since-days 30 --format arrow
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runs_export import FORMATS, export_runs
+from core.runstore_factory import make_runstore
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Export the RunStore to Parquet/Arrow files.")
+    ap.add_argument("--db", type=Path, default=None, help="RunStore SQLite file (default: avops.db)")
+    ap.add_argument("--out", type=Path, required=True, help="export directory")
+    ap.add_argument("--format", choices=FORMATS, default="parquet")
+    ap.add_argument("--since-days", type=float, default=None, help="only runs started in the last N days")
+    ap.add_argument("--full", action="store_true",
+                    help="export everything instead of continuing from the saved high-water mark")
+    ap.add_argument("--chunk-runs", type=int, default=2000)
+    args = ap.parse_args()
+    since = None
+    if args.since_days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=args.since_days)
+    store = make_runstore(args.db)
+    summary = export_runs(
+        store, args.out, fmt=args.format, since=since,
+        incremental=not args.full, chunk_runs=args.chunk_runs,
+    )
+    summary["files"] = len(summary["files"])
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+scripts/run_graph.py
+--------------------
+
+Run a workflow graph from core/workflows/ (see core/workflow/graph.py) and
+record it in the RunStore.  No MCP tools are wired in here, so tool steps
+use their recipe fallbacks.
+
+Usage (from the sma-av-streamlit directory):
+    python scripts/run_graph.py daily-room-health.json --workers 16
+    python scripts/run_graph.py daily-room-health.json --params '{"roomIds": ["ZR-101"]}'
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runstore_factory import make_runstore
+from core.workflow.graph import list_graphs, run_graph
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Run a workflow graph definition.")
+    ap.add_argument("graph", choices=list_graphs())
+    ap.add_argument("--db", type=Path, default=None, help="RunStore SQLite file (default: avops.db)")
+    ap.add_argument("--params", type=json.loads, default=None, help="JSON object overriding the graph params")
+    ap.add_argument("--workers", type=int, default=None, help="foreach pool size")
+    args = ap.parse_args()
+    result = run_graph(args.graph, make_runstore(args.db), params=args.params, workers=args.workers)
+    for node in result["nodes"].values():
+        node.pop("items", None)
+        node.pop("outputs", None)
+    print(json.dumps(result, indent=2, default=str))
+    sys.exit(0 if result["status"] != "failed" else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+scripts/scheduler.py
+--------------------
+
+Headless scheduler daemon: runs interval/cron workflows and scheduled
+workflow graphs when they come due (see core/workflow/scheduler.py).
+Stop it with Ctrl-C or SIGTERM; running workflows are allowed to finish.
+
+Usage (from the sma-av-streamlit directory):
+    python scripts/scheduler.py --workers 4
+    python scripts/scheduler.py --once          # one pass, then exit (cron-friendly)
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import signal
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.db.seed import init_db
+from core.workflow.scheduler import Scheduler
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Run due workflows in the background.")
+    ap.add_argument("--workers", type=int, default=4, help="workflows run at the same time")
+    ap.add_argument("--refresh-s", type=float, default=60.0, help="re-read workflow definitions this often")
+    ap.add_argument("--no-graphs", action="store_true", help="skip core/workflows/*.json schedules")
+    ap.add_argument("--once", action="store_true", help="run what is due now and exit")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    init_db()
+    sched = Scheduler(workers=args.workers, graphs=not args.no_graphs, refresh_s=args.refresh_s)
+    if args.once:
+        for key, slot in sched.run_pending():
+            logging.info("ran %s for %s", key, slot.isoformat())
+        return
+    signal.signal(signal.SIGTERM, lambda *_: sched.stop())
+    thread = sched.start()
+    try:
+        while thread.is_alive():
+            thread.join(1.0)
+    except KeyboardInterrupt:
+        sched.stop()
+
+
+if __name__ == "__main__":
+    main()
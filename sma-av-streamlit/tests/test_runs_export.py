@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.dataset as ds
+
+from core.runs_export import STATE_FILE, export_runs
+from core.runs_store import RunStore, WorkflowRun
+
+
+def _read(out_dir: Path, table: str, fmt: str = "parquet"):
+    return ds.dataset(out_dir / table, format=fmt, partitioning="hive").to_table().sort_by("id")
+
+
+def test_export_flattens_meta_and_resolves_blobs(tmp_path):
+    store = RunStore(db_path=tmp_path / "runs.db", blob_threshold=256)
+    big = {"dump": ["z" * 100] * 20}
+    with store.workflow_run(
+        workflow_id="wf", name="A", agent_id=1, recipe_id=2,
+        meta={"workflow_name": "Room check", "room_id": 101, "extra": [1, 2]},
+    ) as rec:
+        rec.step("act", "probe", step_id="probe", tool="icmp", result=big)
+        rec.artifact("ticket", "INC1", external_id="INC1", data={"ok": True})
+    with pytest.raises(RuntimeError):
+        with store.workflow_run(workflow_id="wf", name="B", agent_id=1, recipe_id=2) as failed:
+            raise RuntimeError("offline")
+    with store.Session() as s:
+        s.get(WorkflowRun, failed.run_id).started_at = datetime.now(timezone.utc) - timedelta(days=3)
+        s.commit()
+
+    for fmt in ("parquet", "arrow"):
+        out = tmp_path / fmt
+        summary = export_runs(store, out, fmt=fmt, chunk_runs=1, chunk_rows=1)
+        assert (summary["runs"], summary["steps"], summary["artifacts"]) == (2, 1, 1)
+        runs = _read(out, "runs", fmt)
+        assert runs.column("name").to_pylist() == ["A", "B"]
+        assert runs.schema.field("started_at").type == pa.timestamp("us", tz="UTC")
+        assert runs.column("room_id").to_pylist() == ["101", None]
+        assert runs.column("workflow_name").to_pylist() == ["Room check", None]
+        assert json.loads(runs.column("meta_json")[0].as_py())["extra"] == [1, 2]
+        assert len(set(runs.column("date").to_pylist())) == 2  # one partition per start day
+
+        steps = _read(out, "steps", fmt)
+        first = steps.filter(pa.compute.equal(steps.column("step_id"), "probe")).to_pylist()[0]
+        assert json.loads(first["result_json"]) == big
+        arts = _read(out, "artifacts", fmt)
+        assert json.loads(arts.column("data_json")[0].as_py()) == {"ok": True}
+    store.close()
+
+
+def test_incremental_export_waits_for_running_runs(tmp_path):
+    store = RunStore(db_path=tmp_path / "runs.db")
+    out = tmp_path / "export"
+    first = store.record_run(workflow_id="wf", name="r1", agent_id=1, recipe_id=1, status="success")
+    summary = export_runs(store, out, incremental=True)
+    assert summary["runs"] == 1 and summary["high_water_mark"] == first
+    assert json.loads((out / STATE_FILE).read_text())["high_water_mark"] == first
+
+    with store.workflow_run(workflow_id="wf", name="slow", agent_id=1, recipe_id=1) as slow:
+        slow.step("act", "working")
+        done = store.record_run(workflow_id="wf", name="r3", agent_id=1, recipe_id=1, status="success")
+        summary = export_runs(store, out, incremental=True)
+        assert summary["runs"] == 0 and summary["high_water_mark"] == first
+
+    summary = export_runs(store, out, incremental=True)
+    assert summary["runs"] == 2 and summary["steps"] == 1 and summary["high_water_mark"] == done
+    assert export_runs(store, out, incremental=True)["runs"] == 0
+    assert _read(out, "runs").column("id").to_pylist() == [first, slow.run_id, done]
+    store.close()
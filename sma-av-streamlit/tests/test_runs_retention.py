@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import shutil
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runs_retention import RetentionPolicy, apply_retention, archive_runs, live_db_bytes
+from core.runs_store import Blob, RunStore, StepEvent, WorkflowRun
+
+
+def _backdate(store: RunStore, run_id: int, days: int) -> None:
+    with store.Session() as s:
+        s.get(WorkflowRun, run_id).started_at = datetime.now(timezone.utc) - timedelta(days=days)
+        s.commit()
+
+
+def test_old_runs_move_to_archive_and_stay_readable(tmp_path):
+    store = RunStore(db_path=tmp_path / "runs.db")
+    big = {"dump": ["y" * 100] * 100}
+    ids = []
+    for age in (200, 120, 1):
+        with store.workflow_run(workflow_id="wf", name=f"age {age}", agent_id=1, recipe_id=1) as rec:
+            rec.step("act", "dump", result=big)
+            rec.artifact("kb", "KB article", external_id=f"KB{age}")
+        _backdate(store, rec.run_id, age)
+        ids.append(rec.run_id)
+    before = store.run_details(ids[0])
+
+    summary = apply_retention(store, RetentionPolicy(max_age_days=90))
+    assert summary["archived"] == 2
+    assert summary["vacuum"] == "incremental"
+    assert [r["id"] for r in store.latest_runs()] == [ids[2]]
+    assert list((tmp_path / "run_archive").glob("date=*/runs-*.jsonl.gz"))
+
+    archived = store.run_details(ids[0])
+    assert archived["steps"][0]["result"] == big
+    assert archived["artifacts"][0]["external_id"] == "KB200"
+    assert archived["name"] == before["name"]
+    assert store.get_run(ids[1])["name"] == "age 120"
+    assert store.run_steps(ids[1])[0]["message"] == "dump"
+    assert store.stats()["runs"] == 3  # rollups keep archived history
+
+    with store.Session() as s:
+        assert s.execute(select(func.count(StepEvent.id))).scalar() == 1
+        assert s.execute(select(Blob.refs)).scalar() == 1  # still used by the live run
+    store.engine.dispose()
+
+
+def test_parents_move_with_their_children(tmp_path):
+    store = RunStore(db_path=tmp_path / "runs.db")
+    with store.workflow_run(workflow_id="sweep", name="sweep", agent_id=None, recipe_id=None) as parent:
+        done = store.record_run(
+            workflow_id="sweep", name="room 1", agent_id=None, recipe_id=None, parent_id=parent.run_id
+        )
+        late = store.workflow_run(
+            workflow_id="sweep", name="room 2", agent_id=None, recipe_id=None, parent_id=parent.run_id
+        )
+        child = late.__enter__()
+    for run_id in (parent.run_id, done, child.run_id):
+        _backdate(store, run_id, 200)
+
+    # A child is still running: nothing in the family moves, not even the finished child.
+    assert apply_retention(store, RetentionPolicy(max_age_days=90))["archived"] == 0
+    assert archive_runs(store, [done]) == 0
+    late.__exit__(None, None, None)
+
+    assert apply_retention(store, RetentionPolicy(max_age_days=90))["archived"] == 3
+    assert store.latest_runs() == []
+    assert store.get_run(parent.run_id)["children"]["success"] == 2
+    assert store.get_run(done)["parent_id"] == parent.run_id
+    store.engine.dispose()
+
+
+def test_archiving_every_run_never_reuses_ids(tmp_path):
+    store = RunStore(db_path=tmp_path / "runs.db")
+    first = [store.record_run(workflow_id="wf", name=f"run {i}", agent_id=1, recipe_id=1) for i in range(2)]
+    assert archive_runs(store, first) == 2
+
+    new_id = store.record_run(workflow_id="wf", name="after", agent_id=1, recipe_id=1)
+    assert new_id > max(first)
+    assert archive_runs(store, [new_id]) == 1
+    assert store.get_run(first[0])["name"] == "run 0" and store.get_run(new_id)["name"] == "after"
+    store.engine.dispose()
+
+
+def test_size_policy_converts_legacy_db_and_shrinks_it(tmp_path):
+    db = tmp_path / "legacy.db"
+    shutil.copy(ROOT / "avops.db", db)
+    store = RunStore(db_path=db, blob_threshold=None)
+    for i in range(30):
+        with store.workflow_run(workflow_id="wf", name=f"run {i}", agent_id=1, recipe_id=1,
+                                durability="deferred") as rec:
+            for j in range(20):
+                rec.step("act", f"step {j}", payload={"blob": f"{i}-{j}" * 200})
+    start = live_db_bytes(store)
+
+    summary = apply_retention(store, RetentionPolicy(max_age_days=None, max_db_mb=start / 2 / 2**20,
+                                                     batch_size=5))
+    assert summary["vacuum"] in ("full", "incremental")
+    assert summary["db_bytes"] <= start / 2
+    assert db.stat().st_size < start
+    with store.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+    store.engine.dispose()
@@ -0,0 +1,463 @@
+from __future__ import annotations
+
+import time
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, event, func, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from core.runs_store import (
+    BLOB_REF_KEY, ArchivedRun, Blob, DurationSketch, RunChange, RunRollup, RunStore, StepEvent, WorkflowRun,
+    _fold_rollup, migrate_schema,
+)
+from core.utils.sketch import DDSketch
+
+
+@pytest.fixture()
+def store(tmp_path):
+    s = RunStore(db_path=tmp_path / "runs.db")
+    try:
+        yield s
+    finally:
+        s.engine.dispose()
+
+
+def _run(store: RunStore, **kwargs):
+    return store.workflow_run(
+        workflow_id="wf-1", name="Test", agent_id=1, recipe_id=2, **kwargs
+    )
+
+
+def test_sync_recorder_writes_each_event(store):
+    with _run(store) as rec:
+        rec.step("intake", "one")
+        assert len(store.run_details(rec.run_id)["steps"]) == 1
+        rec.artifact("kb", "Article", external_id="KB1")
+    detail = store.run_details(rec.run_id)
+    assert detail["status"] == "success"
+    assert [a["external_id"] for a in detail["artifacts"]] == ["KB1"]
+
+
+def test_batch_recorder_flushes_on_size_and_exit(store):
+    store.flush_size = 3
+    with _run(store, durability="batch") as rec:
+        for i in range(4):
+            rec.step("act", f"step {i}")
+        assert len(store.run_details(rec.run_id)["steps"]) == 3
+        assert rec.pending == 1
+        rec.artifact("file", "report")
+    detail = store.run_details(rec.run_id)
+    assert [s["message"] for s in detail["steps"]] == [f"step {i}" for i in range(4)]
+    assert len(detail["artifacts"]) == 1
+
+
+def test_deferred_recorder_writes_with_final_status(store):
+    with pytest.raises(RuntimeError):
+        with _run(store, durability="deferred") as rec:
+            rec.step("act", "before failure", level="warn")
+            assert store.run_details(rec.run_id)["steps"] == []
+            raise RuntimeError("boom")
+    detail = store.run_details(rec.run_id)
+    assert detail["status"] == "failed"
+    assert detail["error"] == "RuntimeError: boom"
+    assert [s["message"] for s in detail["steps"]] == ["before failure"]
+
+
+def test_failed_flush_still_finishes_the_run(store):
+    with _run(store, durability="deferred") as rec:
+        rec.step("act", "unserializable", payload={"probe": object()})
+    detail = store.run_details(rec.run_id)
+    assert detail["status"] == "failed" and detail["finished_at"] is not None
+    assert detail["error"].startswith("writing buffered events failed:")
+    assert "not JSON serializable" in detail["error"]
+    assert detail["steps"] == []
+    assert store.latest_runs(status=["running"]) == []
+    assert rec.run_id in {r["id"] for r in store.changes_since(0)["runs"]}
+
+
+def test_unknown_durability_rejected(store):
+    with pytest.raises(ValueError):
+        with _run(store, durability="eventually"):
+            pass
+
+
+def test_stats_sql_aggregates_and_sketch_percentiles(store, tmp_path):
+    now = datetime.now(timezone.utc)
+    with store.Session() as s:
+        for i in range(1, 101):
+            s.add(WorkflowRun(
+                workflow_id="wf-1", name="seed", status="success" if i % 4 else "failed",
+                started_at=now - timedelta(minutes=i * 5), duration_ms=float(i * 10),
+                error=None if i % 4 else f"err {i}",
+            ))
+        s.commit()
+    # A fresh store backfills the hourly sketches for pre-existing runs.
+    reopened = RunStore(db_path=tmp_path / "runs.db")
+    st = reopened.stats()
+    assert st["runs"] == 100
+    assert st["success_rate"] == pytest.approx(75.0)
+    assert st["last_error"] == "err 100"
+    assert st["p95_ms"] == pytest.approx(950.5, rel=0.02)
+
+    windowed = reopened.stats(since=now - timedelta(minutes=101))
+    assert windowed["runs"] == 20
+    assert windowed["p50_ms"] == pytest.approx(105.0, rel=0.05)
+    reopened.engine.dispose()
+
+
+def test_finished_runs_update_sketch(store):
+    with _run(store):
+        pass
+    with _run(store):
+        pass
+    st = store.stats()
+    assert st["runs"] == 2
+    assert st["p99_ms"] > 0
+
+
+def test_rollups_feed_trend_and_stats(store):
+    for _ in range(3):
+        with _run(store):
+            pass
+    with pytest.raises(ValueError):
+        with _run(store):
+            raise ValueError("bad input")
+    with store.Session() as s:
+        rollups = s.execute(select(RunRollup)).scalars().all()
+    assert sorted((r.status, r.runs) for r in rollups) == [("failed", 1), ("success", 3)]
+
+    with _run(store):
+        buckets = store.trend()
+        assert sum(b["runs"] for b in buckets) == 5  # includes the in-flight run
+        assert store.stats()["runs"] == 5
+    assert sum(b["runs"] for b in store.trend(status=["failed"])) == 1
+    assert store.stats()["success_rate"] == pytest.approx(80.0)
+
+
+def test_trend_and_stats_agree_on_a_partial_leading_hour(store):
+    hour = (datetime.now(timezone.utc) - timedelta(hours=3)).replace(minute=0, second=0, microsecond=0)
+    for minutes in (10, 40, 90):
+        store.record_run(
+            workflow_id="wf-1", name="seed", agent_id=1, recipe_id=2,
+            started_at=hour + timedelta(minutes=minutes),
+            finished_at=hour + timedelta(minutes=minutes, seconds=5),
+        )
+    since = hour + timedelta(minutes=30)
+    assert sum(b["runs"] for b in store.trend(since=since)) == store.stats(since=since)["runs"] == 2
+
+
+def test_rollup_fold_rereads_after_a_concurrent_write(store):
+    key = {"bucket": datetime(2026, 1, 1, 9, tzinfo=timezone.utc)}
+    with store.Session() as s:
+        _fold_rollup(s, DurationSketch, key, {"runs": 1}, [100.0])
+        s.commit()
+    other = create_engine(f"sqlite:///{store.db_path}")
+    raced = []
+
+    def race(conn, cursor, statement, *args):
+        # Another process folds a run between this fold's read and its write-back.
+        if statement.startswith("UPDATE duration_sketches") and not raced:
+            raced.append(statement)
+            with sessionmaker(other)() as o:
+                _fold_rollup(o, DurationSketch, key, {"runs": 1}, [300.0])
+                o.commit()
+
+    event.listen(store.engine, "before_cursor_execute", race)
+    try:
+        with store.Session() as s:
+            _fold_rollup(s, DurationSketch, key, {"runs": 1}, [200.0])
+            s.commit()
+    finally:
+        event.remove(store.engine, "before_cursor_execute", race)
+        other.dispose()
+    with store.Session() as s:
+        row = s.execute(select(DurationSketch)).scalars().one()
+    assert raced and row.runs == 3
+    assert DDSketch.from_dict(row.sketch).count == 3
+
+
+def test_recipe_metrics_bulk_matches_per_recipe(store):
+    for i in range(12):
+        try:
+            with store.workflow_run(workflow_id="wf", name="r", agent_id=1, recipe_id=i % 3):
+                if i % 4 == 0:
+                    raise RuntimeError("x")
+        except RuntimeError:
+            pass
+    bulk = store.recipe_metrics_bulk([0, 1, 2, 99], limit=3)
+    for rid in (0, 1, 2):
+        assert bulk[rid] == pytest.approx(store.recipe_metrics(rid, limit=3))
+    assert bulk[99] == {"runs": 0, "success_rate": 0.0, "last_status": "unknown", "avg_ms": 0.0}
+
+    history = store.recipe_metrics_bulk([0, 1], limit=None)  # from run_rollups
+    assert history[0]["runs"] == 4 and history[0]["success_rate"] == pytest.approx(75.0)
+    assert history[1]["last_status"] == store.recipe_metrics(1)["last_status"]
+    for bad in (0, -1):  # would become a negative OFFSET
+        with pytest.raises(ValueError):
+            store.recipe_metrics_bulk([0], limit=bad)
+
+
+def test_change_feed_covers_buffered_steps(store):
+    head = store.changes_since(None)["seq"]
+    with _run(store, durability="deferred") as rec:
+        for i in range(3):
+            rec.step("act", f"step {i}")
+    feed = store.changes_since(head)
+    assert [r["status"] for r in feed["runs"]] == ["success"]
+    assert [s["message"] for s in feed["steps"]] == ["step 0", "step 1", "step 2"]
+
+
+def test_change_feed_waits_for_a_recent_hole(store):
+    with _run(store) as rec:
+        pass
+    head = store.changes_since(None)["seq"]
+
+    def change(seq, **kw):
+        with store.Session() as s:
+            s.add(RunChange(seq=seq, run_id=rec.run_id, **kw))
+            s.commit()
+
+    change(head + 2)  # head + 1 was taken by a transaction that has not committed yet
+    assert store.changes_since(head)["seq"] == head
+    assert store.changes_since(None)["seq"] == head
+    change(head + 1)
+    assert store.changes_since(head)["seq"] == head + 2
+    # An old hole is a rollback (or retention) and is skipped.
+    change(head + 4, created_at=datetime.now(timezone.utc) - timedelta(minutes=5))
+    assert store.changes_since(head + 2)["seq"] == head + 4
+
+
+def test_keyset_pagination(store):
+    ids = []
+    for _ in range(5):
+        with _run(store) as rec:
+            ids.append(rec.run_id)
+    page1 = store.latest_runs(limit=2)
+    page2 = store.latest_runs(limit=2, cursor=page1[-1]["id"])
+    page3 = store.latest_runs(limit=2, cursor=page2[-1]["id"])
+    assert [r["id"] for r in page1 + page2 + page3] == ids[::-1]
+
+    with _run(store, durability="deferred") as rec:
+        for i in range(7):
+            rec.step("act", f"s{i}")
+        rec.artifact("file", "a")
+    first = store.run_steps(rec.run_id, limit=3)
+    rest = store.run_steps(rec.run_id, after_id=first[-1]["id"], limit=10)
+    assert [x["message"] for x in first + rest] == [f"s{i}" for i in range(7)]
+    assert store.run_artifacts(rec.run_id, after_id=None)[0]["title"] == "a"
+    assert store.get_run(rec.run_id)["status"] == "success"
+    assert "steps" not in store.get_run(rec.run_id)
+    assert store.get_run(10_000) == {}
+
+
+# The RunStore tables as first shipped, before any secondary index or later column.
+_LEGACY_DDL = (
+    """CREATE TABLE workflow_runs (
+        id INTEGER NOT NULL, workflow_id VARCHAR(64) NOT NULL, name VARCHAR(255) NOT NULL,
+        agent_id INTEGER, recipe_id INTEGER, "trigger" VARCHAR(32) NOT NULL,
+        status VARCHAR(16) NOT NULL, started_at DATETIME NOT NULL, finished_at DATETIME,
+        duration_ms FLOAT, error VARCHAR(2000), meta JSON NOT NULL, PRIMARY KEY (id))""",
+    """CREATE TABLE step_events (
+        id INTEGER NOT NULL, run_id INTEGER NOT NULL, ts DATETIME NOT NULL,
+        phase VARCHAR(32) NOT NULL, level VARCHAR(16) NOT NULL, status VARCHAR(16) NOT NULL,
+        message VARCHAR(2000) NOT NULL, payload JSON, result JSON, PRIMARY KEY (id),
+        FOREIGN KEY(run_id) REFERENCES workflow_runs (id) ON DELETE CASCADE)""",
+    """CREATE TABLE artifacts (
+        id INTEGER NOT NULL, run_id INTEGER NOT NULL, kind VARCHAR(32) NOT NULL,
+        external_id VARCHAR(255), url VARCHAR(1024), title VARCHAR(255), data JSON,
+        PRIMARY KEY (id), FOREIGN KEY(run_id) REFERENCES workflow_runs (id) ON DELETE CASCADE)""",
+    """INSERT INTO workflow_runs VALUES
+        (1, 'wf-1', 'legacy', 1, 2, 'manual', 'success', '2024-01-01 09:15:00',
+         '2024-01-01 09:15:02', 2000.0, NULL, '{}')""",
+)
+
+
+def test_migration_adds_indexes_to_existing_db(tmp_path):
+    db = tmp_path / "legacy.db"
+    engine = create_engine(f"sqlite:///{db}")
+    with engine.begin() as conn:
+        for ddl in _LEGACY_DDL:
+            conn.exec_driver_sql(ddl)
+    assert not inspect(engine).get_indexes("step_events")
+
+    assert "ix_step_events_run_id" in migrate_schema(engine)
+    assert migrate_schema(engine) == []  # idempotent
+    names = {ix["name"] for ix in inspect(engine).get_indexes("workflow_runs")}
+    assert {"ix_workflow_runs_started_status", "ix_workflow_runs_recipe_id"} <= names
+    engine.dispose()
+
+    reopened = RunStore(db_path=db)
+    assert reopened.stats()["runs"] == 1
+    with reopened.engine.connect() as conn:  # rebuilt with AUTOINCREMENT, rows kept
+        ddl = dict(conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'table'").all())
+    assert all("AUTOINCREMENT" in ddl[t] for t in ("workflow_runs", "step_events", "artifacts"))
+    assert reopened.get_run(1)["name"] == "legacy"
+    with reopened.Session() as s:  # as if retention had archived runs up to id 7
+        s.add(ArchivedRun(run_id=7, started_at=datetime(2024, 1, 1, tzinfo=timezone.utc), path="x.jsonl.gz"))
+        s.commit()
+    reopened.engine.dispose()
+    with engine.begin() as conn:  # back to the old DDL
+        conn.exec_driver_sql("DROP TABLE workflow_runs")
+        conn.exec_driver_sql(_LEGACY_DDL[0])
+    engine.dispose()
+    reopened = RunStore(db_path=db)
+    assert reopened.record_run(workflow_id="wf-1", name="new", agent_id=1, recipe_id=2) == 8
+    assert {"legacy_runs", "legacy_evidence"} <= set(inspect(reopened.engine).get_view_names())
+    reopened.engine.dispose()
+
+
+def test_large_payloads_are_deduplicated_blobs(store):
+    big = {"rooms": [{"id": f"ZR-{i}", "cpu": i % 100, "log": "x" * 40} for i in range(200)]}
+    with _run(store, durability="batch") as rec:
+        rec.step("act", "dump 1", payload={"small": True}, result=big)
+        rec.step("act", "dump 2", result=big)
+        rec.artifact("file", "metrics", data=big)
+
+    with store.Session() as s:
+        assert s.execute(select(func.count(Blob.digest))).scalar() == 1
+        stored = s.execute(select(StepEvent.result)).scalars().all()
+    assert all(r[BLOB_REF_KEY] for r in stored)
+
+    detail = store.run_details(rec.run_id)
+    assert detail["steps"][0]["payload"] == {"small": True}
+    assert detail["steps"][1]["result"] == big
+    assert detail["artifacts"][0]["data"] == big
+    lazy = store.run_steps(rec.run_id, resolve_blobs=False)
+    digest = lazy[0]["result"][BLOB_REF_KEY]
+    assert store.load_blobs([digest]) == {digest: big}
+
+
+def test_sqlite_profiles_enable_wal(tmp_path):
+    store = RunStore(db_path=tmp_path / "runs.db")
+    fast = RunStore(db_path=tmp_path / "fast.db", sqlite_profile="fast")
+    with store.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 2  # FULL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2  # set before WAL
+    with fast.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+    with pytest.raises(ValueError):
+        RunStore(db_path=tmp_path / "x.db", sqlite_profile="turbo")
+    store.close()
+    fast.close()
+
+
+def test_search_ranks_errors_steps_and_artifacts(store):
+    with pytest.raises(RuntimeError):
+        with _run(store) as rec:
+            rec.step("act", "Reloading HDMI EDID on display 3")
+            rec.artifact("ticket", "HDMI EDID reload failed", external_id="INC0012345")
+            raise RuntimeError("HDMI EDID reload failed on Room 4B")
+    with _run(store) as other:
+        other.step("act", "Zoom Rooms healthcheck ok")
+
+    hits = store.search("hdmi edid failed")
+    assert {h["kind"] for h in hits} == {"run", "artifact"}
+    assert all(h["run_id"] == rec.run_id and h["status"] == "failed" for h in hits)
+    assert "[HDMI]" in hits[0]["snippet"]
+    assert store.search("INC0012*")[0]["item_id"] == store.run_artifacts(rec.run_id)[0]["id"]
+    assert {h["kind"] for h in store.search("reloading")} == {"run", "step", "artifact"}  # stemmed
+    assert store.search("zoom", since=datetime.now(timezone.utc) + timedelta(hours=1)) == []
+    assert store.search('"') == []
+
+    store.search_fts = False  # LIKE fallback used on databases without FTS5
+    assert {h["kind"] for h in store.search("edid FAILED")} == {"run", "artifact"}
+    assert store.search("INC_012") == store.search("%") == []  # wildcards are literal
+    store.search_fts = True
+
+    with store.Session() as s:  # edits reach the index too
+        s.get(StepEvent, store.run_steps(rec.run_id)[0]["id"]).message = "Swapped the DSP card"
+        s.commit()
+    assert [h["kind"] for h in store.search("dsp")] == ["step"]
+    assert {h["kind"] for h in store.search("reloading")} == {"run", "artifact"}
+
+    from core.runs_retention import archive_runs
+    archive_runs(store, [rec.run_id])
+    assert store.search("hdmi") == []  # triggers drop archived rows from the index
+
+
+def test_span_times_steps_and_feeds_step_rollups(store):
+    for durability in ("sync", "deferred"):
+        with _run(store, durability=durability) as rec:
+            with rec.span("act", "reboot codec", step_id="reboot", tool="zoom.reboot") as sp:
+                time.sleep(0.02)
+                sp["result"] = {"ok": True}
+            with pytest.raises(TimeoutError):
+                with rec.span("verify", "ping", step_id="ping", tool="icmp"):
+                    raise TimeoutError("no reply")
+            rec.step("act", "untimed")
+    steps = store.run_steps(rec.run_id)
+    assert steps[0]["duration_ms"] >= 20 and steps[0]["result"] == {"ok": True}
+    assert steps[0]["started_at"] < steps[0]["finished_at"]
+    assert (steps[1]["status"], steps[1]["level"]) == ("error", "error")
+    assert steps[2]["duration_ms"] is None
+
+    slow = store.slowest_steps()
+    assert [(r["step_id"], r["tool"], r["steps"]) for r in slow] == [
+        ("reboot", "zoom.reboot", 2), ("ping", "icmp", 2),
+    ]
+    assert slow[0]["recipe_id"] == 2 and slow[0]["p95_ms"] >= 20
+    assert slow[1]["failures"] == 2
+    assert store.slowest_steps(recipe_id=99) == []
+
+    before = store.slowest_steps()
+    store.rebuild_rollups()
+    assert store.slowest_steps() == pytest.approx(before)
+
+
+def test_child_runs_update_parent_and_feed(store):
+    with _run(store) as parent:
+        head = store.changes_since(None)["seq"]
+        with store.workflow_run(workflow_id="wf-1", name="room", agent_id=1, recipe_id=3, parent_id=parent.run_id):
+            pass
+        feed = store.changes_since(head)
+        assert {r["id"] for r in feed["runs"]} == {parent.run_id, parent.run_id + 1}
+    assert store.get_run(parent.run_id)["children"]["success"] == 1
+
+    before = (store.stats()["runs"], store.recipe_metrics_bulk([3], limit=None)[3]["runs"])
+    store.rebuild_rollups()
+    assert (store.stats()["runs"], store.recipe_metrics_bulk([3], limit=None)[3]["runs"]) == before == (1, 1)
+
+
+def test_promoted_meta_filters_use_index_and_backfill(tmp_path, store):
+    for i in range(6):
+        store.record_run(
+            workflow_id="wf-rooms", name=f"check {i}", agent_id=1, recipe_id=2,
+            status="failed" if i == 4 else "success", error="codec offline" if i == 4 else None,
+            meta={"room_id": f"ZR-{i % 2}", "site": "HQ", "severity": None},
+        )
+    rows = store.latest_runs(meta={"room_id": "ZR-0"})
+    assert [r["name"] for r in rows] == ["check 4", "check 2", "check 0"]
+    assert store.latest_runs(meta={"room_id": "ZR-0", "site": "Branch"}) == []
+    stats = store.stats(meta={"room_id": "ZR-0"})
+    assert stats["runs"] == 3 and round(stats["success_rate"]) == 67
+    assert stats["last_error"] == "codec offline"
+    assert store.stats(meta={"room_id": "ZR-1"})["last_error"] == ""
+    assert sum(b["runs"] for b in store.trend(meta={"site": "HQ"}, status=["success"])) == 5
+    with pytest.raises(ValueError):
+        store.latest_runs(meta={"building": "B1"})
+
+    with store.engine.connect() as conn:
+        plan = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM workflow_runs "
+            "WHERE parent_id IS NULL AND room_id = 'ZR-0' ORDER BY id DESC LIMIT 50"
+        ).all()
+    assert "ix_workflow_runs_room_id" in " ".join(str(r[-1]) for r in plan)
+
+    # Databases from before the promoted columns get them filled from meta.
+    with store.engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_workflow_runs_room_id")
+        conn.exec_driver_sql("ALTER TABLE workflow_runs DROP COLUMN room_id")
+    store.engine.dispose()
+    reopened = RunStore(db_path=tmp_path / "runs.db")
+    assert len(reopened.latest_runs(meta={"room_id": "ZR-1"})) == 3
+    reopened.engine.dispose()
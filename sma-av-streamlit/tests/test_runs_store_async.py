@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+pytest.importorskip("aiosqlite")
+
+from core.runs_store import RunStore
+from core.runs_store_async import AsyncRunStore
+
+
+def test_async_workflow_run_matches_sync_store(tmp_path):
+    async def scenario():
+        store = AsyncRunStore(db_path=tmp_path / "runs.db")
+        async with store.workflow_run(workflow_id="wf", name="A", agent_id=1, recipe_id=2) as rec:
+            await rec.step("act", "rebooting codec")
+            async with rec.span("verify", "probe", step_id="probe", tool="icmp"):
+                await asyncio.sleep(0.01)
+            await rec.artifact("ticket", "INC0001", external_id="INC0001")
+        with pytest.raises(RuntimeError):
+            async with store.workflow_run(
+                workflow_id="wf", name="B", agent_id=1, recipe_id=2, durability="deferred"
+            ) as failed:
+                await failed.step("act", "buffered")
+                assert await store.run_steps(failed.run_id) == []
+                raise RuntimeError("codec offline")
+        out = {
+            "latest": await store.latest_runs(limit=10),
+            "details": await store.run_details(rec.run_id),
+            "stats": await store.stats(),
+            "search": await store.search("codec"),
+            "metrics": await store.recipe_metrics_bulk([2]),
+            "slow": await store.slowest_steps(),
+            "failed": await store.run_details(failed.run_id),
+        }
+        await store.close()
+        return out
+
+    out = asyncio.run(scenario())
+    assert [r["status"] for r in out["latest"]] == ["failed", "success"]
+    assert out["failed"]["error"] == "RuntimeError: codec offline"
+    assert [s["message"] for s in out["failed"]["steps"]] == ["buffered"]
+
+    sync = RunStore(db_path=tmp_path / "runs.db")
+    assert out["details"] == sync.run_details(out["details"]["id"])
+    assert out["stats"] == sync.stats()
+    assert out["search"] == sync.search("codec")
+    assert out["metrics"] == sync.recipe_metrics_bulk([2])
+    assert out["slow"] == sync.slowest_steps() and out["slow"][0]["p50_ms"] >= 10
+    sync.close()
+
+
+def test_async_writers_share_sqlite_without_lock_errors(tmp_path):
+    async def one(store, i):
+        async with store.workflow_run(
+            workflow_id="wf", name=f"r{i}", agent_id=1, recipe_id=i % 3, durability="batch"
+        ) as rec:
+            for j in range(5):
+                await rec.step("act", f"step {j}")
+                await asyncio.sleep(0)
+
+    async def scenario():
+        store = AsyncRunStore(db_path=tmp_path / "runs.db")
+        await asyncio.gather(*(one(store, i) for i in range(20)))
+        stats = await store.stats()
+        feed = await store.changes_since(0)
+        await store.close()
+        return stats, feed
+
+    stats, feed = asyncio.run(scenario())
+    assert stats["runs"] == 20 and stats["success_rate"] == 100.0
+    assert len(feed["steps"]) == 100
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runstore_backends import MemoryRunStore, SegmentLogRunStore
+from core.runstore_factory import RunStoreBackend, close_runstores, make_runstore
+from core.runs_store import RunStore
+
+BACKEND_PARAMS = ["sqlite", "memory", "log"]
+if os.getenv("AVOPS_TEST_POSTGRES_URL"):
+    BACKEND_PARAMS.append("postgres")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registry():
+    yield
+    close_runstores()
+
+
+@pytest.fixture(params=BACKEND_PARAMS)
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        yield make_runstore(tmp_path / "runs.db", backend="sqlite")
+    elif request.param == "postgres":
+        yield make_runstore(backend="postgres", url=os.environ["AVOPS_TEST_POSTGRES_URL"])
+    elif request.param == "memory":
+        yield MemoryRunStore()  # not the factory singleton, so tests stay isolated
+    else:
+        yield make_runstore(tmp_path / "log", backend="log")
+
+
+def _record(store, n_ok=3, n_failed=1):
+    ids = []
+    for i in range(n_ok + n_failed):
+        try:
+            with store.workflow_run(
+                workflow_id="wf", name=f"run {i}", agent_id=1, recipe_id=7, meta={"i": i}
+            ) as rec:
+                for j in range(5):
+                    rec.step("act", f"step {j}", payload={"j": j})
+                rec.artifact("ticket", "INC", external_id=f"INC{i}")
+                if i >= n_ok:
+                    raise RuntimeError("device offline")
+        except RuntimeError:
+            pass
+        ids.append(rec.run_id)
+    return ids
+
+
+def test_backend_conformance(store):
+    assert isinstance(store, RunStoreBackend)
+    ids = _record(store)
+
+    latest = store.latest_runs(limit=10)
+    assert [r["id"] for r in latest] == ids[::-1]
+    assert latest[0]["status"] == "failed"
+    assert latest[0]["error"] == "RuntimeError: device offline"
+    assert latest[1]["meta"] == {"i": 2}
+    assert [r["id"] for r in store.latest_runs(limit=2, cursor=ids[2])] == [ids[1], ids[0]]
+    assert [r["id"] for r in store.latest_runs(status=["failed"])] == [ids[3]]
+
+    steps = store.run_steps(ids[0], limit=2)
+    assert [s["message"] for s in steps] == ["step 0", "step 1"]
+    rest = store.run_steps(ids[0], after_id=steps[-1]["id"], limit=10)
+    assert [s["payload"] for s in rest] == [{"j": 2}, {"j": 3}, {"j": 4}]
+    assert store.run_artifacts(ids[0])[0]["external_id"] == "INC0"
+
+    details = store.run_details(ids[1])
+    assert details["name"] == "run 1" and len(details["steps"]) == 5
+    assert store.get_run(ids[1])["finished_at"] is not None
+    assert store.run_details(10_000) == {}
+
+    stats = store.stats()
+    assert stats["runs"] == 4
+    assert stats["success_rate"] == pytest.approx(75.0)
+    assert stats["last_error"] == "RuntimeError: device offline"
+    assert stats["p50_ms"] >= 0.0
+    assert sum(b["runs"] for b in store.trend()) == 4
+
+    metrics = store.recipe_metrics(7)
+    assert metrics["runs"] == 4 and metrics["last_status"] == "failed"
+    hits = store.search("device offline")
+    assert [h["run_id"] for h in hits] == [ids[3]] and hits[0]["kind"] == "run"
+    assert {h["item_id"] for h in store.search("step 3") if h["run_id"] == ids[0]}
+    bulk = store.recipe_metrics_bulk([7, 8])
+    assert bulk[7] == pytest.approx(metrics) and bulk[8]["runs"] == 0
+    with pytest.raises(ValueError):
+        store.recipe_metrics_bulk([7], limit=0)
+
+    rid = store.record_run(
+        workflow_id="wf", name="recorded", agent_id=1, recipe_id=7,
+        steps=[{"phase": "plan", "message": "p", "payload": {"phase": "plan"}}],
+    )
+    recorded = store.run_details(rid)
+    assert recorded["status"] == "success" and recorded["finished_at"]
+    assert recorded["steps"][0]["payload"] == {"phase": "plan"}
+    assert store.stats()["runs"] == 5
+
+    t0 = datetime.now(timezone.utc)
+    store.record_run(
+        workflow_id="wf", name="timed", agent_id=1, recipe_id=7,
+        steps=[
+            {"phase": "act", "message": "reboot", "step_id": "reboot", "tool": "zoom",
+             "started_at": t0, "finished_at": t0 + timedelta(milliseconds=ms)}
+            for ms in (100, 200, 300)
+        ],
+    )
+    slow = store.slowest_steps()
+    assert [(r["recipe_id"], r["step_id"], r["tool"], r["steps"]) for r in slow] == [(7, "reboot", "zoom", 3)]
+    assert slow[0]["avg_ms"] == pytest.approx(200.0)
+    assert slow[0]["p50_ms"] == pytest.approx(200.0, rel=0.02)
+
+
+def test_change_feed(store):
+    head = store.changes_since(None)
+    assert head["runs"] == [] and store.changes_since(head["seq"])["runs"] == []
+
+    with store.workflow_run(workflow_id="wf", name="feed", agent_id=1, recipe_id=1) as rec:
+        rec.step("act", "one")
+        mid = store.changes_since(head["seq"])
+        assert [r["status"] for r in mid["runs"]] == ["running"]
+        assert [s["message"] for s in mid["steps"]] == ["one"]
+        rec.step("act", "two")
+    done = store.changes_since(mid["seq"])
+    assert done["seq"] > mid["seq"]
+    assert [r["status"] for r in done["runs"]] == ["success"]
+    assert [s["message"] for s in done["steps"]] == ["two"]
+    assert store.changes_since(done["seq"]) == {"seq": done["seq"], "runs": [], "steps": [], "more": False}
+
+    page = store.changes_since(head["seq"], limit=1)
+    assert page["more"] and page["seq"] < done["seq"]
+
+
+def test_segment_log_replays_and_rolls(tmp_path):
+    log = SegmentLogRunStore(tmp_path, segment_bytes=512)
+    ids = _record(log)
+    log.close()
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) > 1
+
+    reopened = SegmentLogRunStore(tmp_path, segment_bytes=512)
+    assert [r["id"] for r in reopened.latest_runs()] == ids[::-1]
+    with reopened.workflow_run(workflow_id="wf", name="after", agent_id=None, recipe_id=None) as rec:
+        rec.step("act", "again")
+    assert rec.run_id == ids[-1] + 1
+    assert reopened.run_steps(rec.run_id)[0]["id"] > reopened.run_steps(ids[-1])[-1]["id"]
+    reopened.close()
+
+
+def test_segment_log_cuts_a_torn_tail_on_reopen(tmp_path):
+    log = SegmentLogRunStore(tmp_path)
+    with log.workflow_run(workflow_id="wf", name="one", agent_id=None, recipe_id=None):
+        pass
+    log.close()
+    seg = next(tmp_path.glob("segment-*.jsonl"))
+    with open(seg, "ab") as f:
+        f.write(b'{"op": "run", "id": 9')  # crash halfway through a write
+
+    reopened = SegmentLogRunStore(tmp_path)
+    assert not seg.read_bytes().endswith(b"9")
+    with reopened.workflow_run(workflow_id="wf", name="two", agent_id=None, recipe_id=None):
+        pass
+    reopened.close()
+    again = SegmentLogRunStore(tmp_path)
+    assert [r["name"] for r in again.latest_runs()] == ["two", "one"]
+    again.close()
+
+
+def test_factory_selects_backend_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("AVOPS_RUNSTORE_BACKEND", "memory")
+    assert make_runstore() is make_runstore()
+    monkeypatch.setenv("AVOPS_RUNSTORE_BACKEND", "sqlite")
+    assert isinstance(make_runstore(tmp_path / "x.db"), RunStore)
+    with pytest.raises(ValueError):
+        make_runstore(backend="redis")
+    monkeypatch.delenv("AVOPS_RUNSTORE_URL", raising=False)
+    with pytest.raises(ValueError):
+        make_runstore(backend="postgres")
+
+
+def test_registry_reuses_one_store_per_target(tmp_path):
+    a = make_runstore(tmp_path / "a.db")
+    assert make_runstore(tmp_path / "a.db") is a
+    assert make_runstore(tmp_path / "." / "a.db") is a
+    assert make_runstore(tmp_path / "b.db") is not a
+    with a.workflow_run(workflow_id="wf", name="n", agent_id=None, recipe_id=None):
+        pass
+
+    close_runstores()
+    b = make_runstore(tmp_path / "a.db")
+    assert b is not a
+    assert [r["name"] for r in b.latest_runs()] == ["n"]
+
+
+def test_child_runs_collapse_into_parent(store):
+    with store.workflow_run(workflow_id="wf-rooms", name="Daily Room Health", agent_id=1, recipe_id=None) as parent:
+        for i in range(4):
+            try:
+                with store.workflow_run(
+                    workflow_id="wf-rooms", name=f"ZR-{i}", agent_id=2, recipe_id=5, parent_id=parent.run_id
+                ):
+                    if i == 3:
+                        raise RuntimeError("codec offline")
+            except RuntimeError:
+                pass
+        store.record_run(workflow_id="wf-rooms", name="ZR-4", agent_id=2, recipe_id=5, parent_id=parent.run_id)
+        mid = store.get_run(parent.run_id)["children"]
+        assert (mid["total"], mid["success"], mid["failed"], mid["running"]) == (5, 4, 1, 0)
+
+    top = store.latest_runs(limit=10)
+    assert [r["id"] for r in top] == [parent.run_id]
+    assert top[0]["children"]["total"] == 5 and top[0]["children"]["duration_ms"] >= 0.0
+    children = store.latest_runs(limit=10, parent_id=parent.run_id)
+    assert [r["name"] for r in children] == ["ZR-4", "ZR-3", "ZR-2", "ZR-1", "ZR-0"]
+    assert {r["parent_id"] for r in children} == {parent.run_id} and children[0]["children"] is None
+
+    stats = store.stats()
+    assert stats["runs"] == 1 and stats["success_rate"] == 100.0  # KPIs count the parent only
+    assert stats["last_error"] == ""
+    assert sum(b["runs"] for b in store.trend()) == 1
+    assert store.recipe_metrics(5)["runs"] == 5  # recipe metrics still see every child execution
+
+
+def test_promoted_meta_filters(store):
+    for i, room in enumerate(["ZR-1", "ZR-2", "ZR-1", None]):
+        store.record_run(
+            workflow_id="wf-rooms", name=f"check {i}", agent_id=1, recipe_id=2,
+            meta={"room_id": room, "site": "HQ"} if room else {},
+        )
+    assert [r["name"] for r in store.latest_runs(meta={"room_id": "ZR-1"})] == ["check 2", "check 0"]
+    assert store.stats(meta={"room_id": "ZR-2"})["runs"] == 1
+    assert store.stats(meta={"site": "HQ"})["runs"] == 3
+    assert sum(b["runs"] for b in store.trend(meta={"room_id": "ZR-1"})) == 2
+    with pytest.raises(ValueError):
+        store.stats(meta={"building": "B1"})
+    with pytest.raises(ValueError):
+        store.latest_runs(meta={"room_id": ""})  # would otherwise match every room
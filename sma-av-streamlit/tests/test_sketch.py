@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.utils.sketch import DDSketch
+
+
+def _exact(xs, q):
+    xs = sorted(xs)
+    return xs[int(q * (len(xs) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    xs = [rng.lognormvariate(6, 1.5) for _ in range(20000)]
+    sk = DDSketch(relative_accuracy=0.01).extend(xs)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        assert sk.quantile(q) == pytest.approx(_exact(xs, q), rel=0.011)
+    assert sk.quantile(0) == min(xs) and sk.quantile(1) == max(xs)
+
+
+def test_merge_and_roundtrip_match_single_sketch():
+    xs = [float(i) for i in range(1, 1001)]
+    whole = DDSketch().extend(xs)
+    left = DDSketch().extend(xs[:300])
+    right = DDSketch.from_dict(DDSketch().extend(xs[300:]).to_dict())
+    merged = left.merge(right)
+    assert merged.count == whole.count
+    assert merged.quantile(0.95) == whole.quantile(0.95)
+    with pytest.raises(ValueError):
+        merged.merge(DDSketch(relative_accuracy=0.05))
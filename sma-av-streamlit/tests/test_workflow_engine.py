@@ -65,3 +65,99 @@ def test_execute_recipe_run_creates_evidence(db_session):
     assert len(refreshed.evidence) == 4
     phases = {ev.payload.get("phase") for ev in refreshed.evidence}
     assert phases == {"intake", "plan", "act", "verify"}
+
+
+def test_execute_recorded_run_writes_one_transaction(db_session, tmp_path):
+    from sqlalchemy import event
+
+    from core.runs_store import RunStore
+    from core.workflow.engine import execute_recorded_run
+
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Test Recipe", yaml_path="backup_room_failover.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+    store = RunStore(db_path=tmp_path / "runs.db")
+    commits = []
+    event.listen(store.engine, "commit", lambda conn: commits.append(1))
+
+    run = execute_recorded_run(db_session, store, agent_id=agent.id, recipe_id=recipe.id, name="wf")
+
+    assert len(commits) == 1
+    assert db_session.query(Run).count() == 0  # nothing written to the app database
+    legacy = execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id)
+    assert [e.payload for e in run.evidence] == [e.payload for e in legacy.evidence]
+    assert run.status == "completed"
+
+    detail = store.run_details(run.id)
+    assert detail["status"] == "success"
+    assert [s["payload"] for s in detail["steps"]] == [e.payload for e in run.evidence]
+    with store.engine.connect() as conn:
+        row = conn.exec_driver_sql("SELECT status FROM legacy_runs WHERE id = ?", (run.id,)).one()
+        assert row.status == "completed"
+        n = conn.exec_driver_sql("SELECT COUNT(*) FROM legacy_evidence WHERE run_id = ?", (run.id,)).scalar()
+        assert n == 4
+
+    with pytest.raises(ValueError, match="Agent 42 not found"):
+        execute_recorded_run(db_session, store, agent_id=42, recipe_id=recipe.id)
+    failed = store.latest_runs(limit=1)[0]
+    assert failed["status"] == "failed" and "Agent 42" in failed["error"]
+    store.engine.dispose()
+
+    class LockedStore:
+        def record_run(self, **kwargs):
+            raise RuntimeError("database is locked")
+
+    with pytest.raises(ValueError, match="Agent 42 not found"):  # not masked by the failed write
+        execute_recorded_run(db_session, LockedStore(), agent_id=42, recipe_id=recipe.id)
+
+
+def test_batch_mode_matches_per_phase_commits_in_one_transaction(db_session, monkeypatch):
+    from sqlalchemy import event
+
+    import core.workflow.engine as engine_mod
+
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Test Recipe", yaml_path="backup_room_failover.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+    commits = []
+    event.listen(db_session.get_bind(), "commit", lambda conn: commits.append(1))
+
+    legacy = execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id)
+    legacy_commits, commits[:] = len(commits), []
+    run = execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id, batch=True)
+
+    assert len(commits) == 1 < legacy_commits
+    assert (run.status, run.agent_id, run.recipe_id) == (legacy.status, legacy.agent_id, legacy.recipe_id)
+    assert [e.payload for e in run.evidence] == [e.payload for e in legacy.evidence]
+    assert [e.payload for e in db_session.get(Run, run.id).evidence] == [e.payload for e in legacy.evidence]
+
+    def _phases(recipe_dict):
+        yield "intake", "intake steps: 1"
+        raise RuntimeError("plan exploded")
+
+    monkeypatch.setattr(engine_mod, "run_workflow_phases", _phases)
+    commits[:] = []
+    with pytest.raises(RuntimeError, match="plan exploded"):
+        execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id, batch=True)
+    failed = db_session.query(Run).order_by(Run.id.desc()).first()
+    assert len(commits) == 1 and failed.status == "failed"
+    assert [e.payload["phase"] for e in failed.evidence] == ["intake"]
+
+    def _interrupted(recipe_dict):
+        yield "intake", "intake steps: 1"
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(engine_mod, "run_workflow_phases", _interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id, batch=True)
+    assert db_session.query(Run).order_by(Run.id.desc()).first().status == "failed"
+
+    def _broken_attach(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(engine_mod, "run_workflow_phases", _phases)
+    monkeypatch.setattr(engine_mod, "attach_json_batch", _broken_attach)
+    with pytest.raises(RuntimeError, match="plan exploded"):  # not masked by the failed write
+        execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id, batch=True)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import core.workflow.interpreter as interp
+from core.runs_store import RunStore
+from core.workflow.graph import GraphError, run_graph, substitute
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(interp, "RECIPES_DIR", str(ROOT / "recipes"))
+    monkeypatch.setattr("core.recipes.service.RECIPES_DIR", str(ROOT / "recipes"))
+    s = RunStore(db_path=tmp_path / "runs.db")
+    yield s
+    s.close()
+
+
+def _sweep(rooms, **run):
+    return {
+        "id": "wf-sweep", "name": "Sweep", "params": {"roomIds": rooms},
+        "graph": [
+            {"id": "rooms", "run": {
+                "type": "foreach", "items": "params.roomIds", **run,
+                "do": {"agent": "agent-zoom-room-doctor-v1", "recipe": "zoom-room-healthcheck-v1",
+                       "with": {"roomId": "${item}"}},
+            }},
+            {"id": "done", "terminal": True},
+        ],
+    }
+
+
+def test_daily_room_health_fans_out_as_child_runs(store):
+    result = run_graph("daily-room-health.json", store)
+    node = result["nodes"]["for-each-room"]
+    assert result["status"] == "success"
+    assert [it["item"] for it in node["items"]] == ["ZR-101", "ZR-102", "ZR-201"]
+    assert (node["total"], node["succeeded"], node["failed"]) == (3, 3, 0)
+
+    parent = store.latest_runs(limit=10)
+    assert len(parent) == 1 and parent[0]["children"]["total"] == 3
+    assert parent[0]["children"]["success"] == 3
+    child = store.latest_runs(parent_id=result["run_id"], meta={"room_id": "ZR-102"})
+    assert [c["name"] for c in child] == ["for-each-room: ZR-102"]
+    assert {s["step_id"] for s in store.run_details(child[0]["id"])["steps"]} >= {"get-status", "notify"}
+
+
+def test_foreach_runs_items_concurrently_and_isolates_failures(store):
+    started = threading.Barrier(3, timeout=5)
+
+    def local(action, params):
+        if action == "evaluate_thresholds":
+            started.wait()
+            if params["metrics"].get("room") == "ZR-BAD":
+                raise RuntimeError("probe crashed")
+        return {"ok": True, "breaches": []}
+
+    def zoom(action, params):
+        return {"status": "offline", "metrics": {"room": params["roomId"]}}
+
+    tools = {"local": local, "mcp-zoom": zoom}
+    result = run_graph(_sweep(["ZR-1", "ZR-BAD", "ZR-3"], concurrency=3), store, tools=tools)
+    node = result["nodes"]["rooms"]
+    assert result["status"] == "partial" and node["status"] == "partial"
+    assert [it["status"] for it in node["items"]] == ["success", "failed", "success"]
+    assert "probe crashed" in node["items"][1]["error"]
+    assert result["error"] == "rooms: 1 of 3 items failed"
+    parent = store.latest_runs(limit=1)[0]
+    assert (parent["status"], parent["error"]) == ("partial", result["error"])
+    assert parent["children"]["failed"] == 1
+
+    strict = run_graph(_sweep(["ZR-1", "ZR-BAD", "ZR-3"], max_failed=0, concurrency=3), store, tools=tools)
+    assert strict["status"] == "failed" and strict["error"].startswith("rooms: 1 of 3 items failed")
+
+
+def test_fail_fast_skips_items_that_have_not_started(store):
+    def zoom(action, params):
+        if params["roomId"] == "ZR-2":
+            return {"status": "offline", "metrics": None}
+        return {"status": "offline", "metrics": {}}
+
+    def local(action, params):
+        if params["metrics"] is None:
+            raise RuntimeError("no metrics")
+        return {"ok": True}
+
+    rooms = [f"ZR-{i}" for i in range(1, 7)]
+    result = run_graph(
+        _sweep(rooms, on_item_failure="fail_fast", concurrency=1), store,
+        tools={"local": local, "mcp-zoom": zoom},
+    )
+    node = result["nodes"]["rooms"]
+    assert result["status"] == "failed" and node["status"] == "failed"
+    assert [it["status"] for it in node["items"]][:2] == ["success", "failed"]
+    assert node["skipped"] >= 1 and all(it["run_id"] is None for it in node["items"] if it["status"] == "skipped")
+
+
+def test_substitution_verify_and_validation(store):
+    ctx = {"params": {"n": 2, "room": "ZR-1"}, "item": {"id": 7}}
+    assert substitute({"a": "${params.n}", "b": "room ${params.room}/${item.id}", "c": ["${missing}"]}, ctx) == {
+        "a": 2, "b": "room ZR-1/7", "c": [None],
+    }
+
+    llm = {"classify_incident": {"sev": "P2", "category": "room"}, "propose_immediate_steps": {"steps": []}}
+    result = run_graph(
+        "support-first-response.json", store,
+        params={"reporter": "ops@example.com", "summary": "No audio"},
+        tools={"local-llm": lambda action, params: llm[action]}, trigger="event",
+    )
+    assert result["status"] == "success"
+    assert result["nodes"]["verify"]["outputs"]["triage_summary"]["incident"] == "INC0009999"
+
+    with pytest.raises(GraphError, match="unknown recipe"):
+        run_graph({"id": "g", "graph": [{"id": "a", "run": {"recipe": "nope"}}]}, store)
+    with pytest.raises(GraphError, match="next 'zz'"):
+        run_graph({"id": "g", "graph": [{"id": "a", "terminal": True, "next": "zz"}]}, store)
+    verify = {"type": "verify_outputs", "expect": []}
+    with pytest.raises(GraphError, match="loops back to node 'a'"):
+        run_graph({"id": "g", "graph": [
+            {"id": "a", "run": verify}, {"id": "b", "run": verify, "next": "a"}, {"id": "done", "terminal": True},
+        ]}, store)
+    assert store.latest_runs(limit=10)[0]["name"] == "Support — First Response"
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import core.workflow.interpreter as interp
+from core.workflow.interpreter import RecipeCompileError, compile_recipe, compile_template, load_plan
+
+
+def _recipe(name: str):
+    return yaml.safe_load((ROOT / "recipes" / name).read_text(encoding="utf-8"))
+
+
+def test_healthcheck_runs_tools_saves_and_when(monkeypatch):
+    plan = compile_recipe(_recipe("zoom-room-healthcheck.yaml"))
+    calls = []
+
+    def zoom(action, params):
+        calls.append((action, params))
+        if action == "get_room_status":
+            return {"status": "offline", "metrics": {"cpu_percent": 95, "packet_loss": 0.1}}
+        raise AssertionError("synthetic join must be skipped for an offline room")
+
+    # Nothing is parsed at run time.
+    monkeypatch.setattr(interp.ast, "parse", lambda *a, **k: pytest.fail("re-parsed at run time"))
+    result = plan.run({"roomId": "ZR-101"}, tools={"mcp-zoom": zoom})
+
+    assert calls == [("get_room_status", {"roomId": "ZR-101"})]
+    assert result["status"] == "success"
+    assert [(s["id"], s["status"]) for s in result["steps"]] == [
+        ("get-status", "ok"), ("synthetic-join", "skipped"), ("evaluate", "ok"),
+        ("notify", "simulated"), ("file-task", "simulated"),
+    ]
+    assert result["saves"]["breaches"] == [{"metric": "cpu_percent", "value": 95, "threshold": 85}]
+    assert result["outputs"]["health"]["ok"] is False
+    text = result["steps"][3]["params"]["text"]
+    assert text.startswith("🩺 Zoom Room ZR-101 health: Issues") and '"cpu_percent": 95' in text
+    assert result["steps"][4]["params"]["short_description"] == "Room ZR-101 health threshold breach"
+
+
+def test_triage_defaults_verify_and_failures():
+    plan = compile_recipe(_recipe("incident-triage.yaml"))
+    llm = {"classify_incident": {"sev": "P5", "category": "room"}, "propose_immediate_steps": {"steps": []}}
+    result = plan.run(
+        {"reporter": "ops@example.com", "summary": "No audio"},
+        tools={"local-llm": lambda action, params: llm[action]},
+    )
+    assert "Details: n/a" in result["steps"][0]["params"]["context"]
+    assert result["steps"][2]["params"]["urgency"] == "medium"
+    assert result["saves"]["snow_incident"] == "INC0009999"  # simulated fallback
+    assert [v["ok"] for v in result["verify"]] == [False, True]
+    assert result["status"] == "failed" and result["error"].startswith("verify failed: s.sev in")
+
+    missing = plan.run({"reporter": "ops@example.com", "summary": "No audio"})
+    assert missing["status"] == "failed" and missing["error"].startswith("classify: LookupError")
+    assert len(missing["steps"]) == 1
+    with pytest.raises(ValueError, match="needs input 'summary'"):
+        plan.run({"reporter": "ops@example.com"})
+
+
+def test_independent_steps_run_concurrently_in_recipe_order():
+    recipe = _recipe("incident-triage.yaml")
+    plan = compile_recipe(recipe)
+    assert [st.deps for st in plan.steps] == [(), (0,), (0,), (0,), (2, 3)]
+
+    # ack-slack and create-incident only depend on classify: both must be in flight at once.
+    both = threading.Barrier(2, timeout=5)
+    llm = {"classify_incident": {"sev": "P2", "category": "room"}, "propose_immediate_steps": {"steps": []}}
+
+    def slack(action, params):
+        if "Acknowledged" in params["text"]:
+            both.wait()
+        return {}
+
+    def servicenow(action, params):
+        both.wait()
+        return {"number": "INC1", "sys_id": "x"}
+
+    tools = {"local-llm": lambda action, params: llm[action], "mcp-slack": slack, "mcp-servicenow": servicenow}
+    result = plan.run({"reporter": "ops@example.com", "summary": "No audio"}, tools=tools)
+    assert result["status"] == "success"
+    assert [s["id"] for s in result["steps"]] == [
+        "classify", "ack-slack", "create-incident", "suggest-fixes", "post-update",
+    ]
+    assert all(s["status"] == "ok" for s in result["steps"])
+
+    seq = compile_recipe({**recipe, "sequential": True})
+    assert not seq.parallel
+    pinned = compile_recipe({**recipe, "steps": [
+        {**st, "sequential": True} if st["id"] == "ack-slack" else st for st in recipe["steps"]
+    ]})
+    assert [st.deps for st in pinned.steps][1:3] == [(0,), (0, 1)]
+
+
+def test_templates_are_safe_and_typed():
+    assert compile_template("{{ inputs.n }}")({"n": 3}, {}) == 3
+    assert compile_template("n={{inputs.n}}, m={{ s.m | default('x') }}")({"n": 3}, {}) == "n=3, m=x"
+    assert compile_template("{{ s.rooms[1].id | upper }}")({}, {"rooms": [{}, {"id": "zr-2"}]}) == "ZR-2"
+    for bad in ("{{ __import__('os') }}", "{{ open('x') }}", "{{ s.__class__ }}x{{ y }}", "{{ s | eval }}"):
+        with pytest.raises(RecipeCompileError):
+            compile_template(bad)
+    with pytest.raises(RecipeCompileError, match="step bad"):
+        compile_recipe({"steps": [{"id": "bad", "action": "x", "saves": {"v": "status"}}]})
+    for step in ({"params": {"room": "{{ s.room ) }}"}}, {"when": "s.ok and"}):
+        with pytest.raises(RecipeCompileError, match="step broken: Invalid expression"):
+            compile_recipe({"steps": [{"id": "broken", "action": "x", **step}]})
+
+
+def test_verify_and_outputs_errors_fail_the_run():
+    recipe = {
+        "steps": [{"id": "count", "action": "echo", "using": "local", "saves": {"n": "$.n"}}],
+        "verify": [{"assert": "s.n + 1 > 0"}],
+        "outputs": {"next": "{{ s.n + 1 }}"},
+    }
+    result = compile_recipe(recipe).run(tools={"local": lambda action, params: {"n": None}})
+    assert [(st["id"], st["status"]) for st in result["steps"]] == [("count", "ok")]
+    assert result["verify"][0]["ok"] is False and result["verify"][0]["error"].startswith("TypeError")
+    assert result["status"] == "failed" and result["error"] == "verify failed: s.n + 1 > 0"
+
+    del recipe["verify"]
+    result = compile_recipe(recipe).run(tools={"local": lambda action, params: {"n": None}})
+    assert result["status"] == "failed" and result["error"].startswith("outputs: TypeError")
+    assert result["outputs"] is None and len(result["steps"]) == 1
+
+
+def test_load_plan_compiles_each_file_once(monkeypatch):
+    interp._plans.clear()
+    compiled = []
+    real = interp.compile_recipe
+    monkeypatch.setattr(interp, "compile_recipe", lambda r: compiled.append(r) or real(r))
+    monkeypatch.setattr(interp, "RECIPES_DIR", str(ROOT / "recipes"))
+    monkeypatch.setattr("core.recipes.service.RECIPES_DIR", str(ROOT / "recipes"))
+    first = load_plan("zoom-room-healthcheck.yaml")
+    assert load_plan("zoom-room-healthcheck.yaml") is first and len(compiled) == 1
+
+
+def test_recorded_run_interprets_steps(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from core.db.models import Agent, Base, Recipe
+    from core.runs_store import RunStore
+    from core.workflow.engine import execute_recorded_run
+
+    monkeypatch.setattr(interp, "RECIPES_DIR", str(ROOT / "recipes"))
+    monkeypatch.setattr("core.recipes.service.RECIPES_DIR", str(ROOT / "recipes"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    agent = Agent(name="Ops", domain="av", config_json={})
+    recipe = Recipe(name="Health", yaml_path="zoom-room-healthcheck.yaml")
+    db.add_all([agent, recipe]); db.commit()
+    store = RunStore(db_path=tmp_path / "runs.db")
+
+    run = execute_recorded_run(db, store, agent_id=agent.id, recipe_id=recipe.id, inputs={"roomId": "ZR-7"})
+    steps = store.run_details(run.id)["steps"]
+    assert run.status == "completed"
+    assert [(s["step_id"], s["tool"], s["status"]) for s in steps][:3] == [
+        ("get-status", "mcp-zoom", "simulated"), ("synthetic-join", "mcp-zoom", "simulated"),
+        ("evaluate", "local", "ok"),
+    ]
+    assert all(s["duration_ms"] is not None for s in steps)
+    assert {r["step_id"] for r in store.slowest_steps(limit=10)} >= {"get-status", "evaluate"}
+    store.close()
+    db.close()
+    engine.dispose()
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.db.models import Agent, Base, Recipe, ScheduleState, WorkflowDef, WorkflowSlot
+from core.db.seed import add_missing_columns
+from core.runstore_backends import MemoryRunStore
+from core.workflow.cron import CronError, CronSchedule
+from core.workflow.scheduler import Scheduler, Trigger, plan_slots
+from core.workflow.service import create_workflow
+
+
+@pytest.fixture()
+def app_db(tmp_path, monkeypatch):
+    monkeypatch.setattr("core.recipes.service.RECIPES_DIR", str(ROOT / "recipes"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    with Session() as db:
+        db.add_all([Agent(name="Ops", domain="av", config_json={}),
+                    Recipe(name="Failover", yaml_path="backup_room_failover.yaml")])
+        db.commit()
+    yield Session
+    engine.dispose()
+
+
+def test_cron_fields_timezones_and_dst():
+    weekdays = CronSchedule.parse("*/15 9-17 * * mon-fri")
+    assert weekdays.next_after(datetime(2026, 10, 17, 10, 0)) == datetime(2026, 10, 19, 9, 0)  # Sat -> Mon
+    assert weekdays.next_after(datetime(2026, 10, 19, 9, 0)) == datetime(2026, 10, 19, 9, 15)
+    friday_13 = CronSchedule.parse("0 0 13 * 5")  # either day field matches
+    assert friday_13.next_after(datetime(2026, 1, 3)) == datetime(2026, 1, 9)
+
+    ny = CronSchedule.parse("30 2 * * *", tz="America/New_York")
+    assert ny.next_after(datetime(2026, 3, 7, 12)) == datetime(2026, 3, 9, 6, 30)  # 02:30 skipped on Mar 8
+    fall = CronSchedule.parse("30 1 * * *", tz="America/New_York")
+    first = fall.next_after(datetime(2026, 10, 31, 12))
+    assert first == datetime(2026, 11, 1, 5, 30) and fall.next_after(first) == datetime(2026, 11, 2, 6, 30)
+    for bad, tz in (("0 6 * *", None), ("61 * * * *", None), ("0 6 * * *", "Mars/Base")):
+        with pytest.raises(CronError):
+            CronSchedule.parse(bad, tz)
+
+
+def test_misfire_policies():
+    hourly = CronSchedule.parse("@hourly")
+    due, now = datetime(2026, 1, 1, 6), datetime(2026, 1, 1, 9, 30)
+    missed = [datetime(2026, 1, 1, h) for h in (6, 7, 8, 9)]
+    assert plan_slots(Trigger(cron=hourly, misfire="run_all"), due, now) == (missed, datetime(2026, 1, 1, 10))
+    assert plan_slots(Trigger(cron=hourly), due, now) == (missed[-1:], datetime(2026, 1, 1, 10))
+    assert plan_slots(Trigger(cron=hourly, misfire="skip"), due, now) == ([], datetime(2026, 1, 1, 10))
+    on_time = datetime(2026, 1, 1, 9, 1)
+    assert plan_slots(Trigger(cron=hourly, misfire="skip"), missed[-1], on_time)[0] == [missed[-1]]
+    every_10 = Trigger(interval=timedelta(minutes=10), misfire="run_all")
+    slots, nxt = plan_slots(every_10, datetime(2026, 1, 1, 9), datetime(2026, 1, 1, 9, 25))
+    assert len(slots) == 3 and nxt == datetime(2026, 1, 1, 9, 30)  # keeps its phase
+
+
+def test_run_pending_runs_due_slots_once(app_db):
+    store = MemoryRunStore()
+    with app_db() as db:
+        wf = create_workflow(db, "Morning", 1, 1, trigger_type="cron", cron="0 6 * * *",
+                             timezone="Europe/Berlin", misfire_policy="run_all")
+        assert wf.next_run_at.hour in (4, 5)  # 06:00 Berlin in UTC
+        wf.next_run_at = datetime(2026, 1, 1, 5)
+        db.commit()
+
+        db.add(WorkflowSlot(job_key="graph:daily-room-health.json", slot_at=datetime(2026, 1, 1, 5),
+                            status="pending", attempts=0))
+        db.commit()
+
+    sched = Scheduler(session_factory=app_db, store=store, graphs=False)
+    now = datetime(2026, 1, 3, 7)  # 3 missed mornings
+    ran = sched.run_pending(now=now)
+    assert [slot for _, slot in ran] == [datetime(2026, 1, d, 5) for d in (1, 2, 3)]
+    assert sched.run_pending(now=now) == []
+    with app_db() as db:  # graph slots are left to a scheduler that loads graphs
+        assert db.query(WorkflowSlot).filter_by(job_key="graph:daily-room-health.json").one().status == "pending"
+    runs = store.latest_runs(limit=10)
+    assert len(runs) == 3 and {r["trigger"] for r in runs} == {"schedule"}
+    assert sorted(r["meta"]["scheduled_for"] for r in runs)[0] == "2026-01-01T05:00:00"
+    with app_db() as db:
+        assert db.get(WorkflowDef, wf.id).next_run_at == datetime(2026, 1, 4, 5)
+
+
+def test_daemon_dispatches_due_workflows_and_graphs(app_db):
+    store = MemoryRunStore()
+    with app_db() as db:
+        wf = create_workflow(db, "Every minute", 1, 1, trigger_type="interval", trigger_value=1)
+        wf.next_run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.add(ScheduleState(key="graph:daily-room-health.json", next_run_at=datetime.utcnow()))
+        db.commit()
+
+    sched = Scheduler(session_factory=app_db, store=store, workers=2, refresh_s=0.2)
+    sched.start()
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline and len(store.latest_runs(limit=10)) < 2:
+            time.sleep(0.05)
+    finally:
+        sched.stop(timeout=10)
+    names = sorted(r["name"] for r in store.latest_runs(limit=10))
+    assert names == ["Daily Room Health Survey", "Every minute"]
+    with app_db() as db:
+        assert db.get(WorkflowDef, wf.id).next_run_at > datetime.utcnow()
+        assert db.get(ScheduleState, "graph:daily-room-health.json").next_run_at > datetime.utcnow()
+        assert db.get(ScheduleState, "graph:kb-continuous-curation.json") is not None  # first slot persisted
+
+
+def test_daemon_survives_a_failed_pass(app_db, monkeypatch):
+    store = MemoryRunStore()
+    with app_db() as db:
+        wf = create_workflow(db, "Every minute", 1, 1, trigger_type="interval", trigger_value=1)
+        wf.next_run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+    sched = Scheduler(session_factory=app_db, store=store, graphs=False, poll_s=0.05)
+    load_jobs, calls = sched.load_jobs, []
+
+    def flaky(db):
+        calls.append(1)
+        if len(calls) <= 2:
+            raise RuntimeError("database is locked")
+        return load_jobs(db)
+
+    monkeypatch.setattr(sched, "load_jobs", flaky)
+    sched.start()
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline and not store.latest_runs(limit=1):
+            time.sleep(0.05)
+    finally:
+        sched.stop(timeout=10)
+    assert sched._thread is not None and not sched._thread.is_alive()
+    assert [r["name"] for r in store.latest_runs(limit=10)] == ["Every minute"] and len(calls) >= 3
+
+
+def test_competing_schedulers_dispatch_each_slot_once(app_db):
+    store = MemoryRunStore()
+    with app_db() as db:
+        wf = create_workflow(db, "Minutely", 1, 1, trigger_type="cron", cron="* * * * *", misfire_policy="run_all")
+        wf.next_run_at = datetime(2026, 1, 1, 9, 0)
+        db.commit()
+    now = datetime(2026, 1, 1, 9, 19, 30)  # 20 missed slots
+    nodes = [Scheduler(session_factory=app_db, store=store, graphs=False, owner=f"node-{i}") for i in range(4)]
+    ran = {}
+    threads = [threading.Thread(target=lambda n=n: ran.__setitem__(n.owner, n.run_pending(now=now))) for n in nodes]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join(30)
+
+    slots = [slot for node_ran in ran.values() for _, slot in node_ran]
+    assert sorted(slots) == [datetime(2026, 1, 1, 9, m) for m in range(20)]
+    scheduled = [r["meta"]["scheduled_for"] for r in store.latest_runs(limit=50)]
+    assert len(scheduled) == 20 == len(set(scheduled))
+    with app_db() as db:
+        rows = db.query(WorkflowSlot).all()
+        assert len(rows) == 20 and {r.status for r in rows} == {"done"} and {r.attempts for r in rows} == {1}
+        assert all(r.run_id is not None for r in rows)
+
+
+def test_heartbeat_keeps_the_lease_and_expired_leases_are_recovered(app_db, monkeypatch):
+    clock = [datetime(2026, 1, 1, 9, 0, 30)]
+    with app_db() as db:
+        wf = create_workflow(db, "Hourly", 1, 1, trigger_type="interval", trigger_value=60)
+        wf.next_run_at = datetime(2026, 1, 1, 9, 0)
+        db.commit()
+    lease = timedelta(seconds=0.3)
+    a = Scheduler(session_factory=app_db, store=MemoryRunStore(), graphs=False, owner="a", lease=lease,
+                  max_attempts=2, clock=lambda: clock[0])
+    b = Scheduler(session_factory=app_db, store=MemoryRunStore(), graphs=False, owner="b", lease=lease,
+                  max_attempts=2, clock=datetime.utcnow)
+    with app_db() as db:
+        a.load_jobs(db)
+        a.enqueue(db, f"wf:{wf.id}", clock[0])
+        (slot_id, key, slot), = a.claim(db, 5)
+        assert b.claim(db, 5, clock[0]) == []  # leased to a
+
+        # a dies: once the lease runs out b takes the slot over, and a can no longer finish it.
+        later = clock[0] + timedelta(seconds=1)
+        assert b.claim(db, 5, later) == [(slot_id, key, slot)]
+        assert not a._renew(slot_id, status="done")
+        # b dies too: the slot has used its attempts and is given up.
+        assert b.claim(db, 5, later + timedelta(seconds=1)) == []
+        db.expire_all()
+        row = db.get(WorkflowSlot, slot_id)
+        assert (row.status, row.owner, row.attempts) == ("failed", "b", 2)
+
+    # A long run keeps its lease alive through heartbeats.
+    def slow_run(db, wf_id, **kw):
+        time.sleep(1.0)
+        return type("R", (), {"id": 99})()
+
+    monkeypatch.setattr("core.workflow.scheduler.run_now", slow_run)
+    with app_db() as db:
+        db.get(WorkflowDef, wf.id).next_run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+    a.clock = datetime.utcnow
+    worker = threading.Thread(target=a.run_pending)
+    worker.start()
+    time.sleep(0.6)  # two lease lengths into the run
+    with app_db() as db:
+        assert b.claim(db, 5) == []
+    worker.join(10)
+    with app_db() as db:
+        latest = db.query(WorkflowSlot).order_by(WorkflowSlot.id.desc()).first()
+        assert (latest.status, latest.owner, latest.run_id) == ("done", "a", 99)
+
+
+def test_add_missing_columns_upgrades_old_databases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE workflow_defs (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL)"))
+    Base.metadata.create_all(engine)
+    assert set(add_missing_columns(engine)) >= {"workflow_defs.cron", "workflow_defs.timezone"}
+    assert add_missing_columns(engine) == []
+    engine.dispose()